@@ -11,6 +11,12 @@ public class DeploymentConfig implements Serializable {
 
   private int maxConcurrentQueries = 100;
 
+  /** 0 for no limit. */
+  private int maxQueuedRequests = 0;
+
+  /** 0 for no limit. */
+  private double queueTimeoutS = 0;
+
   private Object userConfig;
 
   private double gracefulShutdownWaitLoopS = 2;
@@ -40,6 +46,26 @@ public class DeploymentConfig implements Serializable {
     return this;
   }
 
+  public int getMaxQueuedRequests() {
+    return maxQueuedRequests;
+  }
+
+  public DeploymentConfig setMaxQueuedRequests(int maxQueuedRequests) {
+    Preconditions.checkArgument(maxQueuedRequests >= 0, "max_queued_requests must be >= 0");
+    this.maxQueuedRequests = maxQueuedRequests;
+    return this;
+  }
+
+  public double getQueueTimeoutS() {
+    return queueTimeoutS;
+  }
+
+  public DeploymentConfig setQueueTimeoutS(double queueTimeoutS) {
+    Preconditions.checkArgument(queueTimeoutS >= 0, "queue_timeout_s must be >= 0");
+    this.queueTimeoutS = queueTimeoutS;
+    return this;
+  }
+
   public Object getUserConfig() {
     return userConfig;
   }
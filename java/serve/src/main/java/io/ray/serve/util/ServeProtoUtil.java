@@ -49,6 +49,8 @@ public class ServeProtoUtil {
     if (pbDeploymentConfig.getMaxConcurrentQueries() != 0) {
       deploymentConfig.setMaxConcurrentQueries(pbDeploymentConfig.getMaxConcurrentQueries());
     }
+    deploymentConfig.setMaxQueuedRequests(pbDeploymentConfig.getMaxQueuedRequests());
+    deploymentConfig.setQueueTimeoutS(pbDeploymentConfig.getQueueTimeoutS());
     if (pbDeploymentConfig.getGracefulShutdownWaitLoopS() != 0) {
       deploymentConfig.setGracefulShutdownWaitLoopS(
           pbDeploymentConfig.getGracefulShutdownWaitLoopS());
@@ -25,6 +25,8 @@ public class ServeProtoUtilTest {
     Assert.assertEquals(deploymentConfig.getGracefulShutdownTimeoutS(), 20);
     Assert.assertEquals(deploymentConfig.getGracefulShutdownWaitLoopS(), 2);
     Assert.assertEquals(deploymentConfig.getMaxConcurrentQueries(), 100);
+    Assert.assertEquals(deploymentConfig.getMaxQueuedRequests(), 0);
+    Assert.assertEquals(deploymentConfig.getQueueTimeoutS(), 0);
     Assert.assertNull(deploymentConfig.getUserConfig());
     Assert.assertEquals(deploymentConfig.isCrossLanguage(), false);
   }
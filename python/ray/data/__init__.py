@@ -5,6 +5,7 @@ from ray.data.read_api import from_items, range, range_arrow, \
     read_numpy, read_text
 from ray.data.datasource import Datasource, ReadTask
 from ray.data.dataset import Dataset
+from ray.data.impl.compute import ActorPoolStrategy
 from ray.data.impl.progress_bar import set_progress_bars
 
 # Module-level cached global functions (for impl/compute). It cannot be defined
@@ -13,6 +14,7 @@ _cached_fn = None
 _cached_cls = None
 
 __all__ = [
+    "ActorPoolStrategy",
     "Dataset",
     "Datasource",
     "ReadTask",
@@ -1,5 +1,6 @@
+import time
 from typing import TypeVar, List, Generic, Iterator, Tuple, Any, Union, \
-    Optional, TYPE_CHECKING
+    Optional, Dict, TYPE_CHECKING
 
 import numpy as np
 
@@ -34,6 +35,56 @@ BlockPartition = List[Tuple[ObjectRef[Block], "BlockMetadata"]]
 BlockPartitionMetadata = "BlockMetadata"
 
 
+@DeveloperAPI
+class BlockExecStats:
+    """Execution stats of the task that produced a block.
+
+    Attributes:
+        wall_time_s: The wall-clock time of the task, in seconds.
+        cpu_time_s: The CPU time of the task process, in seconds.
+        input_rows: The number of rows input to the task, or None.
+        input_bytes: The size in bytes of the task input, or None.
+    """
+
+    def __init__(self):
+        self.wall_time_s: Optional[float] = None
+        self.cpu_time_s: Optional[float] = None
+        self.input_rows: Optional[int] = None
+        self.input_bytes: Optional[int] = None
+
+    @staticmethod
+    def builder() -> "_BlockExecStatsBuilder":
+        """Start measuring the execution of a task."""
+        return _BlockExecStatsBuilder()
+
+
+class _BlockExecStatsBuilder:
+    """Helper class for building block exec stats.
+
+    The timers start when the builder is created.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.input_rows = None
+        self.input_bytes = None
+
+    def add_input(self, block: Block) -> None:
+        """Record a block as input to the task."""
+        accessor = BlockAccessor.for_block(block)
+        self.input_rows = (self.input_rows or 0) + accessor.num_rows()
+        self.input_bytes = (self.input_bytes or 0) + accessor.size_bytes()
+
+    def build(self) -> BlockExecStats:
+        stats = BlockExecStats()
+        stats.wall_time_s = time.perf_counter() - self.start_time
+        stats.cpu_time_s = time.process_time() - self.start_cpu
+        stats.input_rows = self.input_rows
+        stats.input_bytes = self.input_bytes
+        return stats
+
+
 @DeveloperAPI
 class BlockMetadata:
     """Metadata about the block.
@@ -44,17 +95,24 @@ class BlockMetadata:
         schema: The pyarrow schema or types of the block elements, or None.
         input_files: The list of file paths used to generate this block, or
             the empty list if indeterminate.
+        exec_stats: Execution stats of the task that produced this block, or
+            None.
     """
 
-    def __init__(self, *, num_rows: Optional[int], size_bytes: Optional[int],
+    def __init__(self,
+                 *,
+                 num_rows: Optional[int],
+                 size_bytes: Optional[int],
                  schema: Union[type, "pyarrow.lib.Schema"],
-                 input_files: List[str]):
+                 input_files: List[str],
+                 exec_stats: Optional[BlockExecStats] = None):
         if input_files is None:
             input_files = []
         self.num_rows: Optional[int] = num_rows
         self.size_bytes: Optional[int] = size_bytes
         self.schema: Optional[Any] = schema
         self.input_files: List[str] = input_files
+        self.exec_stats: Optional[BlockExecStats] = exec_stats
 
 
 @DeveloperAPI
@@ -107,10 +165,23 @@ class BlockAccessor(Generic[T]):
         """
         raise NotImplementedError
 
+    def to_numpy_batch(self) -> Union[np.ndarray, Dict[str, np.ndarray]]:
+        """Convert this block into a batch of NumPy ndarrays.
+
+        Returns:
+            A dict of column name to ndarray for tabular blocks, or a single
+            ndarray otherwise.
+        """
+        raise NotImplementedError
+
     def to_arrow(self) -> "pyarrow.Table":
         """Convert this block into an Arrow table."""
         raise NotImplementedError
 
+    def to_block(self) -> Block:
+        """Return the base block that this accessor wraps."""
+        raise NotImplementedError
+
     def size_bytes(self) -> int:
         """Return the approximate size in bytes of this block."""
         raise NotImplementedError
@@ -119,13 +190,17 @@ class BlockAccessor(Generic[T]):
         """Return the Python type or pyarrow schema of this block."""
         raise NotImplementedError
 
-    def get_metadata(self, input_files: List[str]) -> BlockMetadata:
+    def get_metadata(self,
+                     input_files: List[str],
+                     exec_stats: Optional[BlockExecStats] = None
+                     ) -> BlockMetadata:
         """Create a metadata object from this block."""
         return BlockMetadata(
             num_rows=self.num_rows(),
             size_bytes=self.size_bytes(),
             schema=self.schema(),
-            input_files=input_files)
+            input_files=input_files,
+            exec_stats=exec_stats)
 
     def zip(self, other: "Block[T]") -> "Block[T]":
         """Zip this block with another block of the same type and size."""
@@ -170,6 +245,15 @@ class BlockAccessor(Generic[T]):
         """Combine rows with the same key into an accumulator."""
         raise NotImplementedError
 
+    def hash_combine(self, key: "GroupKeyT", aggs: Tuple["AggregateFn"],
+                     num_partitions: int) -> List[Block[U]]:
+        """Combine rows with the same key into accumulators, and partition
+        the accumulators by the hash of their key.
+
+        Unlike ``combine()``, this doesn't require the block to be sorted.
+        """
+        raise NotImplementedError
+
     @staticmethod
     def merge_sorted_blocks(
             blocks: List["Block[T]"], key: Any,
@@ -177,6 +261,18 @@ class BlockAccessor(Generic[T]):
         """Return a sorted block by merging a list of sorted blocks."""
         raise NotImplementedError
 
+    @staticmethod
+    def iter_merge_sorted_blocks(blocks: List["Block[T]"], key: Any,
+                                 descending: bool,
+                                 max_block_size: int) -> Iterator[Block[T]]:
+        """Merge a list of sorted blocks into a stream of sorted blocks.
+
+        Unlike ``merge_sorted_blocks()``, the inputs are merged incrementally
+        and each yielded block is bounded by approximately
+        ``max_block_size`` bytes.
+        """
+        raise NotImplementedError
+
     @staticmethod
     def aggregate_combined_blocks(
             blocks: List[Block], key: "GroupKeyT",
@@ -1,4 +1,6 @@
 from typing import Optional
+import os
+import tempfile
 import threading
 
 import ray
@@ -8,6 +10,70 @@ from ray.util.annotations import DeveloperAPI
 _default_context: "Optional[DatasetContext]" = None
 _context_lock = threading.Lock()
 
+# The max target block size in bytes for reads and transformations.
+DEFAULT_TARGET_MAX_BLOCK_SIZE = 500 * 1024 * 1024
+
+# Whether reads, transforms and shuffle reduces split their output into
+# multiple blocks of at most about the target max block size.
+DEFAULT_BLOCK_SPLITTING_ENABLED = os.environ.get(
+    "RAY_DATASET_BLOCK_SPLITTING", "0") == "1"
+
+# Whether to use the push-based shuffle for random_shuffle() and
+# repartition(shuffle=True). The pull-based simple shuffle is used otherwise.
+DEFAULT_USE_PUSH_BASED_SHUFFLE = os.environ.get(
+    "RAY_DATASET_PUSH_BASED_SHUFFLE", "0") == "1"
+
+# Whether to use the external sort for sort(), which sizes the number of merge
+# tasks by the data size and merges sorted partitions in a streaming fashion.
+DEFAULT_USE_EXTERNAL_SORT = os.environ.get(
+    "RAY_DATASET_EXTERNAL_SORT", "0") == "1"
+
+# Whether to schedule the map tasks of Dataset transforms on the nodes that
+# hold their input blocks.
+DEFAULT_LOCALITY_AWARE_SCHEDULING = os.environ.get(
+    "RAY_DATASET_LOCALITY_AWARE_SCHEDULING", "0") == "1"
+
+# The max number of files that each file-based read task reads concurrently.
+DEFAULT_READ_THREADS_PER_TASK = int(
+    os.environ.get("RAY_DATASET_READ_THREADS_PER_TASK", "4"))
+
+# Whether DatasetPipeline.iter_batches() streams individual blocks through
+# the per-record stages of the pipeline, rather than executing whole windows.
+DEFAULT_USE_STREAMING_PIPELINE_EXECUTOR = os.environ.get(
+    "RAY_DATASET_STREAMING_PIPELINE", "0") == "1"
+
+# The max number of tasks in flight per stage of a streaming pipeline, or None
+# to use the number of CPUs in the cluster.
+DEFAULT_PIPELINE_MAX_TASKS_PER_STAGE = None
+
+# The max bytes of blocks buffered by a streaming pipeline in the object
+# store, or None to use a fraction of the cluster's object store memory.
+DEFAULT_PIPELINE_OBJECT_STORE_MEMORY_LIMIT = None
+
+# The local directory of the disk cache of Dataset.cache(storage="disk").
+DEFAULT_CACHE_DIR = os.environ.get(
+    "RAY_DATASET_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "ray", "dataset_cache"))
+
+# The max bytes of the disk cache, beyond which the least recently used
+# datasets are evicted.
+DEFAULT_CACHE_MAX_DISK_BYTES = int(
+    os.environ.get("RAY_DATASET_CACHE_MAX_DISK_BYTES", 10 * 1024**3))
+
+# The max bytes of blocks pinned by the memory cache of
+# Dataset.cache(storage="memory"), or None to use a fraction of the
+# cluster's object store memory.
+DEFAULT_CACHE_MAX_MEMORY_BYTES = None
+
+# The max number of write tasks in flight for file-based Dataset.write_*().
+DEFAULT_WRITE_MAX_CONCURRENT_TASKS = int(
+    os.environ.get("RAY_DATASET_WRITE_MAX_CONCURRENT_TASKS", "64"))
+
+# The target size in bytes of the files written by file-based
+# Dataset.write_*(), into which smaller blocks are coalesced, or None to
+# write one file per block.
+DEFAULT_WRITE_TARGET_FILE_SIZE = None
+
 
 @DeveloperAPI
 class DatasetContext:
@@ -18,10 +84,34 @@ class DatasetContext:
     """
 
     def __init__(self, block_owner: ray.actor.ActorHandle,
-                 target_max_block_size: int):
+                 target_max_block_size: int, block_splitting_enabled: bool,
+                 use_push_based_shuffle: bool,
+                 use_external_sort: bool, locality_aware_scheduling: bool,
+                 read_threads_per_task: int,
+                 use_streaming_pipeline_executor: bool,
+                 pipeline_max_tasks_per_stage: Optional[int],
+                 pipeline_object_store_memory_limit: Optional[int],
+                 cache_dir: str, cache_max_disk_bytes: int,
+                 cache_max_memory_bytes: Optional[int],
+                 write_max_concurrent_tasks: int,
+                 write_target_file_size: Optional[int]):
         """Private constructor (use get_current() instead)."""
         self.block_owner = block_owner
         self.target_max_block_size = target_max_block_size
+        self.block_splitting_enabled = block_splitting_enabled
+        self.use_push_based_shuffle = use_push_based_shuffle
+        self.use_external_sort = use_external_sort
+        self.locality_aware_scheduling = locality_aware_scheduling
+        self.read_threads_per_task = read_threads_per_task
+        self.use_streaming_pipeline_executor = use_streaming_pipeline_executor
+        self.pipeline_max_tasks_per_stage = pipeline_max_tasks_per_stage
+        self.pipeline_object_store_memory_limit = (
+            pipeline_object_store_memory_limit)
+        self.cache_dir = cache_dir
+        self.cache_max_disk_bytes = cache_max_disk_bytes
+        self.cache_max_memory_bytes = cache_max_memory_bytes
+        self.write_max_concurrent_tasks = write_max_concurrent_tasks
+        self.write_target_file_size = write_target_file_size
 
     @staticmethod
     def get_current() -> "DatasetContext":
@@ -35,7 +125,27 @@ class DatasetContext:
         with _context_lock:
 
             if _default_context is None:
-                _default_context = DatasetContext(None, 500 * 1024 * 1024)
+                _default_context = DatasetContext(
+                    block_owner=None,
+                    target_max_block_size=DEFAULT_TARGET_MAX_BLOCK_SIZE,
+                    block_splitting_enabled=DEFAULT_BLOCK_SPLITTING_ENABLED,
+                    use_push_based_shuffle=DEFAULT_USE_PUSH_BASED_SHUFFLE,
+                    use_external_sort=DEFAULT_USE_EXTERNAL_SORT,
+                    locality_aware_scheduling=(
+                        DEFAULT_LOCALITY_AWARE_SCHEDULING),
+                    read_threads_per_task=DEFAULT_READ_THREADS_PER_TASK,
+                    use_streaming_pipeline_executor=(
+                        DEFAULT_USE_STREAMING_PIPELINE_EXECUTOR),
+                    pipeline_max_tasks_per_stage=(
+                        DEFAULT_PIPELINE_MAX_TASKS_PER_STAGE),
+                    pipeline_object_store_memory_limit=(
+                        DEFAULT_PIPELINE_OBJECT_STORE_MEMORY_LIMIT),
+                    cache_dir=DEFAULT_CACHE_DIR,
+                    cache_max_disk_bytes=DEFAULT_CACHE_MAX_DISK_BYTES,
+                    cache_max_memory_bytes=DEFAULT_CACHE_MAX_MEMORY_BYTES,
+                    write_max_concurrent_tasks=(
+                        DEFAULT_WRITE_MAX_CONCURRENT_TASKS),
+                    write_target_file_size=DEFAULT_WRITE_TARGET_FILE_SIZE)
 
             if _default_context.block_owner is None:
                 owner = _DesignatedBlockOwner.options(
@@ -34,17 +34,25 @@ from ray.data.aggregate import AggregateFn, Sum, Max, Min, \
     Mean, Std
 from ray.data.impl.remote_fn import cached_remote_fn
 from ray.data.impl.batcher import Batcher
-from ray.data.impl.compute import get_compute, cache_wrapper, \
-    CallableClass
+from ray.data.impl.compute import ComputeStrategy, get_compute, \
+    cache_wrapper, CallableClass
 from ray.data.impl.progress_bar import ProgressBar
-from ray.data.impl.shuffle import simple_shuffle, _shuffle_reduce
+from ray.data.impl.shuffle import shuffle_impl, _shuffle_reduce
 from ray.data.impl.sort import sort_impl
 from ray.data.impl.block_list import BlockList
+from ray.data.impl.cache import Lineage, get_cached, put_cached, \
+    read_disk_cache, write_disk_cache
 from ray.data.impl.lazy_block_list import LazyBlockList
+from ray.data.impl.plan import ExecutionPlan, OneToOneStage
+from ray.data.impl.stats import DatasetStats, _get_object_store_summary
 from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
+from ray.data.impl.output_buffer import BlockOutputBuffer, \
+    get_target_max_block_size
+from ray.data.impl.util import _map_in_background
 
 # An output type of iter_batches() determined by the batch_format parameter.
-BatchType = Union["pandas.DataFrame", "pyarrow.Table", np.ndarray, list]
+BatchType = Union["pandas.DataFrame", "pyarrow.Table", np.ndarray,
+                  Dict[str, np.ndarray], list]
 
 logger = logging.getLogger(__name__)
 
@@ -68,28 +76,48 @@ class Dataset(Generic[T]):
 
     Dataset supports parallel transformations such as .map(), .map_batches(),
     and simple repartition, but currently not aggregations and joins.
+
+    Transformations such as .map(), .map_batches(), .flat_map() and .filter()
+    are lazy: they're applied when the dataset is consumed, fused with any
+    adjacent task-based transforms that request the same resources.
     """
 
-    def __init__(self, blocks: BlockList, epoch: int):
+    def __init__(self,
+                 blocks: Union[BlockList, ExecutionPlan],
+                 epoch: int,
+                 stats: Optional[DatasetStats] = None,
+                 *,
+                 _lineage: Optional[Lineage] = None):
         """Construct a Dataset (internal API).
 
         The constructor is not part of the Dataset API. Use the ``ray.data.*``
         read methods to construct a dataset.
         """
-        self._blocks: BlockList = blocks
+        if isinstance(blocks, ExecutionPlan):
+            self._plan: ExecutionPlan = blocks
+        else:
+            assert isinstance(blocks, BlockList), blocks
+            self._plan: ExecutionPlan = ExecutionPlan(
+                blocks,
+                stats or DatasetStats(stages={}),
+                lineage=_lineage)
         self._uuid = uuid4().hex
         self._epoch = epoch
-        assert isinstance(self._blocks, BlockList), self._blocks
+
+    @property
+    def _blocks(self) -> BlockList:
+        # Execute any pending transforms before the blocks are consumed.
+        return self._plan.execute()
 
     def map(self,
             fn: Union[CallableClass, Callable[[T], U]],
             *,
-            compute: Optional[str] = None,
+            compute: Union[str, ComputeStrategy] = None,
             **ray_remote_args) -> "Dataset[U]":
         """Apply the given function to each record of this dataset.
 
-        This is a blocking operation. Note that mapping individual records
-        can be quite slow. Consider using `.map_batches()` for performance.
+        This is a lazy operation. Note that mapping individual records can be
+        quite slow. Consider using `.map_batches()` for performance.
 
         Examples:
             >>> # Transform python objects.
@@ -117,38 +145,45 @@ class Dataset(Generic[T]):
             fn: The function to apply to each record, or a class type
                 that can be instantiated to create such a callable.
             compute: The compute strategy, either "tasks" (default) to use Ray
-                tasks, or "actors" to use an autoscaling Ray actor pool.
+                tasks, "actors" to use an autoscaling Ray actor pool, or an
+                ``ActorPoolStrategy`` to configure the actor pool size.
             ray_remote_args: Additional resource requirements to request from
                 ray (e.g., num_gpus=1 to request GPUs for the map tasks).
         """
 
+        lineage = ("map", fn)
         fn = cache_wrapper(fn)
         context = DatasetContext.get_current()
 
-        def transform(block: Block) -> Block:
+        def transform(block: Block) -> Iterable[Block]:
             DatasetContext._set_current(context)
             block = BlockAccessor.for_block(block)
-            builder = DelegatingArrowBlockBuilder()
+            output_buffer = BlockOutputBuffer(
+                None, get_target_max_block_size(context))
             for row in block.iter_rows():
-                builder.add(fn(row))
-            return builder.build()
+                output_buffer.add(fn(row))
+                if output_buffer.has_next():
+                    yield output_buffer.next()
+            output_buffer.finalize()
+            if output_buffer.has_next():
+                yield output_buffer.next()
 
         compute = get_compute(compute)
+        stage = OneToOneStage("map", transform, compute, ray_remote_args,
+                              lineage)
 
-        return Dataset(
-            compute.apply(transform, ray_remote_args, self._blocks),
-            self._epoch)
+        return Dataset(self._plan.with_stage(stage), self._epoch)
 
     def map_batches(self,
                     fn: Union[CallableClass, Callable[[BatchType], BatchType]],
                     *,
                     batch_size: int = None,
-                    compute: Optional[str] = None,
+                    compute: Union[str, ComputeStrategy] = None,
                     batch_format: str = "native",
                     **ray_remote_args) -> "Dataset[Any]":
         """Apply the given function to batches of records of this dataset.
 
-        This is a blocking operation.
+        This is a lazy operation.
 
         Examples:
             >>> # Transform batches in parallel.
@@ -177,7 +212,8 @@ class Dataset(Generic[T]):
             batch_size: Request a specific batch size, or leave unspecified
                 to use entire blocks as batches.
             compute: The compute strategy, either "tasks" (default) to use Ray
-                tasks, or "actors" to use an autoscaling Ray actor pool.
+                tasks, "actors" to use an autoscaling Ray actor pool, or an
+                ``ActorPoolStrategy`` to configure the actor pool size.
             batch_format: Specify "native" to use the native block format,
                 "pandas" to select ``pandas.DataFrame`` as the batch format,
                 or "pyarrow" to select ``pyarrow.Table``.
@@ -189,10 +225,11 @@ class Dataset(Generic[T]):
         import pyarrow as pa
         import pandas as pd
 
+        lineage = ("map_batches", fn, batch_size, batch_format)
         fn = cache_wrapper(fn)
         context = DatasetContext.get_current()
 
-        def transform(block: Block) -> Block:
+        def transform(block: Block) -> Iterable[Block]:
             DatasetContext._set_current(context)
             block = BlockAccessor.for_block(block)
             total_rows = block.num_rows()
@@ -200,7 +237,8 @@ class Dataset(Generic[T]):
             if max_batch_size is None:
                 max_batch_size = max(total_rows, 1)
 
-            builder = DelegatingArrowBlockBuilder()
+            output_buffer = BlockOutputBuffer(
+                None, get_target_max_block_size(context))
 
             for start in range(0, total_rows, max_batch_size):
                 # Build a block for each batch.
@@ -227,25 +265,29 @@ class Dataset(Generic[T]):
                                      f"{applied}, which is not allowed. "
                                      "The return type must be either list, "
                                      "pandas.DataFrame, or pyarrow.Table")
-                builder.add_block(applied)
+                output_buffer.add_block(applied)
+                if output_buffer.has_next():
+                    yield output_buffer.next()
 
-            return builder.build()
+            output_buffer.finalize()
+            if output_buffer.has_next():
+                yield output_buffer.next()
 
         compute = get_compute(compute)
+        stage = OneToOneStage("map_batches", transform, compute,
+                              ray_remote_args, lineage)
 
-        return Dataset(
-            compute.apply(transform, ray_remote_args, self._blocks),
-            self._epoch)
+        return Dataset(self._plan.with_stage(stage), self._epoch)
 
     def flat_map(self,
                  fn: Union[CallableClass, Callable[[T], Iterable[U]]],
                  *,
-                 compute: Optional[str] = None,
+                 compute: Union[str, ComputeStrategy] = None,
                  **ray_remote_args) -> "Dataset[U]":
         """Apply the given function to each record and then flatten results.
 
-        This is a blocking operation. Consider using ``.map_batches()`` for
-        better performance (the batch size can be altered in map_batches).
+        This is a lazy operation. Consider using ``.map_batches()`` for better
+        performance (the batch size can be altered in map_batches).
 
         Examples:
             >>> ds.flat_map(lambda x: [x, x ** 2, x ** 3])
@@ -256,38 +298,45 @@ class Dataset(Generic[T]):
             fn: The function to apply to each record, or a class type
                 that can be instantiated to create such a callable.
             compute: The compute strategy, either "tasks" (default) to use Ray
-                tasks, or "actors" to use an autoscaling Ray actor pool.
+                tasks, "actors" to use an autoscaling Ray actor pool, or an
+                ``ActorPoolStrategy`` to configure the actor pool size.
             ray_remote_args: Additional resource requirements to request from
                 ray (e.g., num_gpus=1 to request GPUs for the map tasks).
         """
 
+        lineage = ("flat_map", fn)
         fn = cache_wrapper(fn)
         context = DatasetContext.get_current()
 
-        def transform(block: Block) -> Block:
+        def transform(block: Block) -> Iterable[Block]:
             DatasetContext._set_current(context)
             block = BlockAccessor.for_block(block)
-            builder = DelegatingArrowBlockBuilder()
+            output_buffer = BlockOutputBuffer(
+                None, get_target_max_block_size(context))
             for row in block.iter_rows():
                 for r2 in fn(row):
-                    builder.add(r2)
-            return builder.build()
+                    output_buffer.add(r2)
+                    if output_buffer.has_next():
+                        yield output_buffer.next()
+            output_buffer.finalize()
+            if output_buffer.has_next():
+                yield output_buffer.next()
 
         compute = get_compute(compute)
+        stage = OneToOneStage("flat_map", transform, compute, ray_remote_args,
+                              lineage)
 
-        return Dataset(
-            compute.apply(transform, ray_remote_args, self._blocks),
-            self._epoch)
+        return Dataset(self._plan.with_stage(stage), self._epoch)
 
     def filter(self,
                fn: Union[CallableClass, Callable[[T], bool]],
                *,
-               compute: Optional[str] = None,
+               compute: Union[str, ComputeStrategy] = None,
                **ray_remote_args) -> "Dataset[T]":
         """Filter out records that do not satisfy the given predicate.
 
-        This is a blocking operation. Consider using ``.map_batches()`` for
-        better performance (you can implement filter by dropping records).
+        This is a lazy operation. Consider using ``.map_batches()`` for better
+        performance (you can implement filter by dropping records).
 
         Examples:
             >>> ds.filter(lambda x: x % 2 == 0)
@@ -298,28 +347,31 @@ class Dataset(Generic[T]):
             fn: The predicate to apply to each record, or a class type
                 that can be instantiated to create such a callable.
             compute: The compute strategy, either "tasks" (default) to use Ray
-                tasks, or "actors" to use an autoscaling Ray actor pool.
+                tasks, "actors" to use an autoscaling Ray actor pool, or an
+                ``ActorPoolStrategy`` to configure the actor pool size.
             ray_remote_args: Additional resource requirements to request from
                 ray (e.g., num_gpus=1 to request GPUs for the map tasks).
         """
 
+        lineage = ("filter", fn)
         fn = cache_wrapper(fn)
         context = DatasetContext.get_current()
 
-        def transform(block: Block) -> Block:
+        def transform(block: Block) -> Iterable[Block]:
             DatasetContext._set_current(context)
             block = BlockAccessor.for_block(block)
             builder = block.builder()
             for row in block.iter_rows():
                 if fn(row):
                     builder.add(row)
-            return builder.build()
+            # The output of a filter is no larger than its input.
+            return [builder.build()]
 
         compute = get_compute(compute)
+        stage = OneToOneStage("filter", transform, compute, ray_remote_args,
+                              lineage)
 
-        return Dataset(
-            compute.apply(transform, ray_remote_args, self._blocks),
-            self._epoch)
+        return Dataset(self._plan.with_stage(stage), self._epoch)
 
     def repartition(self, num_blocks: int, *,
                     shuffle: bool = False) -> "Dataset[T]":
@@ -348,8 +400,10 @@ class Dataset(Generic[T]):
         """
 
         if shuffle:
-            new_blocks = simple_shuffle(self._blocks, num_blocks)
-            return Dataset(new_blocks, self._epoch)
+            new_blocks, stages = shuffle_impl(self._blocks, num_blocks)
+            return Dataset(new_blocks, self._epoch,
+                           DatasetStats(
+                               stages=stages, parent=self._plan.stats()))
 
         # Compute the (n-1) indices needed for an equal split of the data.
         count = self.count()
@@ -395,7 +449,11 @@ class Dataset(Generic[T]):
             new_blocks += empty_blocks
             new_metadata += empty_metadata
 
-        return Dataset(BlockList(new_blocks, new_metadata), self._epoch)
+        return Dataset(
+            BlockList(new_blocks, new_metadata), self._epoch,
+            DatasetStats(
+                stages={"repartition": new_metadata},
+                parent=self._plan.stats()))
 
     def random_shuffle(
             self,
@@ -432,13 +490,14 @@ class Dataset(Generic[T]):
 
         if num_blocks is None:
             num_blocks = self._blocks.executed_num_blocks()  # Blocking.
-        new_blocks = simple_shuffle(
+        new_blocks, stages = shuffle_impl(
             self._move_blocks() if _move else self._blocks,
             num_blocks,
             random_shuffle=True,
             random_seed=seed,
             _spread_resource_prefix=_spread_resource_prefix)
-        return Dataset(new_blocks, self._epoch)
+        return Dataset(new_blocks, self._epoch,
+                       DatasetStats(stages=stages, parent=self._plan.stats()))
 
     def split(self,
               n: int,
@@ -1271,7 +1330,8 @@ class Dataset(Generic[T]):
             return ret
 
     def sort(self,
-             key: Union[None, str, List[str], Callable[[T], Any]] = None,
+             key: Union[None, str, List[str], List[Tuple[str, str]],
+                        Callable[[T], Any]] = None,
              descending: bool = False) -> "Dataset[T]":
         """Sort the dataset by the specified key column or key function.
         (experimental support)
@@ -1288,14 +1348,16 @@ class Dataset(Generic[T]):
             >>> # Sort by a key function.
             >>> ds.sort(lambda record: record["field1"] % 100)
 
-            >>> # Sort by multiple columns (not yet supported).
+            >>> # Sort by multiple columns.
             >>> ds.sort([("field1", "ascending"), ("field2", "descending")])
 
         Time complexity: O(dataset size * log(dataset size / parallelism))
 
         Args:
             key:
-                - For Arrow tables, key must be a single column name.
+                - For Arrow tables, key can be a column name, a list of
+                  column names, or a list of (column name, order) pairs where
+                  order is either "ascending" or "descending".
                 - For datasets of Python objects, key can be either a lambda
                   function that returns a comparison key to sort by, or None
                   to sort by the original value.
@@ -1307,7 +1369,9 @@ class Dataset(Generic[T]):
         # Handle empty dataset.
         if self.num_blocks() == 0:
             return self
-        return Dataset(sort_impl(self._blocks, key, descending), self._epoch)
+        new_blocks, stages = sort_impl(self._blocks, key, descending)
+        return Dataset(new_blocks, self._epoch,
+                       DatasetStats(stages=stages, parent=self._plan.stats()))
 
     def zip(self, other: "Dataset[U]") -> "Dataset[(T, U)]":
         """Zip this dataset with the elements of another.
@@ -1493,7 +1557,7 @@ class Dataset(Generic[T]):
         Returns:
             The number of blocks of this dataset.
         """
-        return self._blocks.initial_num_blocks()
+        return self._plan.initial_num_blocks()
 
     def size_bytes(self) -> int:
         """Return the in-memory size of the dataset.
@@ -1525,6 +1589,29 @@ class Dataset(Generic[T]):
                 files.add(f)
         return list(files)
 
+    def stats(self) -> str:
+        """Return a string summarizing the execution stats of this dataset.
+
+        The summary covers each stage that produced the dataset (e.g., read,
+        map_batches, shuffle map and reduce), with the number of tasks, their
+        wall and CPU time, and the number of input and output rows and bytes,
+        followed by the cluster-wide object store stats (including spilling).
+        This executes any pending transforms of the dataset.
+
+        Examples:
+            >>> ds = ray.data.range(1000).map_batches(fn).random_shuffle()
+            >>> print(ds.stats())
+
+        Returns:
+            A human-readable summary of the dataset execution stats.
+        """
+        self._plan.execute()
+        summary = self._plan.stats().summary_string()
+        store_summary = _get_object_store_summary()
+        if store_summary:
+            summary += "\n" + store_summary
+        return summary
+
     def write_parquet(
             self,
             path: str,
@@ -1792,13 +1879,19 @@ class Dataset(Generic[T]):
                      prefetch_blocks: int = 0,
                      batch_size: int = None,
                      batch_format: str = "native",
-                     drop_last: bool = False) -> Iterator[BatchType]:
+                     drop_last: bool = False,
+                     prefetch_batches: int = 0) -> Iterator[BatchType]:
         """Return a local batched iterator over the dataset.
 
         Examples:
             >>> for batch in ray.data.range(1000000).iter_batches():
             ...     print(batch)
 
+            >>> # Format the next 4 batches in the background.
+            >>> for df in ds.iter_batches(
+            ...         batch_format="pandas", prefetch_batches=4):
+            ...     train(df)
+
         Time complexity: O(1)
 
         Args:
@@ -1807,70 +1900,28 @@ class Dataset(Generic[T]):
             batch_size: Record batch size, or None to let the system pick.
             batch_format: The format in which to return each batch.
                 Specify "native" to use the current block format, "pandas" to
-                select ``pandas.DataFrame`` or "pyarrow" to select
-                ``pyarrow.Table``. Default is "native".
+                select ``pandas.DataFrame``, "pyarrow" to select
+                ``pyarrow.Table``, or "numpy" to select a dict of column name
+                to ``np.ndarray`` (a single ``np.ndarray`` for simple
+                datasets). Numpy batches of tensor and primitive columns are
+                zero-copy views over the blocks where possible. Default is
+                "native".
             drop_last: Whether to drop the last batch if it's incomplete.
+            prefetch_batches: The number of batches to fetch and format ahead
+                of the consumer on a background thread pool of as many
+                threads. If 0, the batches are fetched and formatted
+                on the consumer thread.
 
         Returns:
             A list of iterators over record batches.
         """
-
-        def sliding_window(iterable: Iterable, n: int):
-            """Creates an iterator consisting of n-width sliding windows over
-            iterable. The sliding windows are constructed lazily such that an
-            element on the base iterator (iterable) isn't consumed until the
-            first sliding window containing that element is reached.
-
-            Args:
-                iterable: The iterable on which the sliding window will be
-                    created.
-                n: The width of the sliding window.
-
-            Returns:
-                An iterator of n-width windows over iterable.
-            """
-            iters = itertools.tee(iter(iterable), n)
-            for i in range(1, n):
-                for it in iters[i:]:
-                    next(it, None)
-            return zip(*iters)
-
-        def format_batch(batch: Block, format: str) -> BatchType:
-            if batch_format == "native":
-                return batch
-            elif batch_format == "pandas":
-                batch = BlockAccessor.for_block(batch)
-                return batch.to_pandas()
-            elif batch_format == "pyarrow":
-                batch = BlockAccessor.for_block(batch)
-                return batch.to_arrow()
-            else:
-                raise ValueError(
-                    f"The given batch format: {batch_format} "
-                    f"is invalid. Supported batch type: {BatchType}")
-
-        batcher = Batcher(batch_size=batch_size)
-
-        def batch_block(block: ObjectRef[Block]):
-            block = ray.get(block)
-            batcher.add(block)
-            while batcher.has_batch():
-                yield format_batch(batcher.next_batch(), batch_format)
-
-        block_window = []  # Handle empty sliding window gracefully.
-        for block_window in sliding_window(self._blocks.iter_blocks(),
-                                           prefetch_blocks + 1):
-            block_window = list(block_window)
-            ray.wait(block_window, num_returns=1, fetch_local=True)
-            yield from batch_block(block_window[0])
-
-        # Consume remainder of final block window.
-        for block in block_window[1:]:
-            yield from batch_block(block)
-
-        # Yield any remainder batches.
-        if batcher.has_any() and not drop_last:
-            yield format_batch(batcher.next_batch(), batch_format)
+        yield from _iter_batches(
+            self._blocks.iter_blocks(),
+            prefetch_blocks=prefetch_blocks,
+            batch_size=batch_size,
+            batch_format=batch_format,
+            drop_last=drop_last,
+            prefetch_batches=prefetch_batches)
 
     def to_torch(self,
                  *,
@@ -1880,7 +1931,8 @@ class Dataset(Generic[T]):
                  feature_column_dtypes: Optional[List["torch.dtype"]] = None,
                  batch_size: int = 1,
                  prefetch_blocks: int = 0,
-                 drop_last: bool = False) -> \
+                 drop_last: bool = False,
+                 prefetch_batches: int = 0) -> \
             "torch.utils.data.IterableDataset":
         """Return a Torch IterableDataset over this dataset.
 
@@ -1895,6 +1947,13 @@ class Dataset(Generic[T]):
         and the label tensor will be of shape (N, 1), where N is the
         ``batch_size`` used by the DataLoader, and n is the number of features.
 
+        Tensor columns (see ``ray.data.extensions.TensorArray``) are read as
+        zero-copy views over the blocks where possible. If the only feature
+        column is a tensor column, the features tensor has the shape
+        (N, *tensor_shape) of that column, otherwise tensor columns are
+        flattened into the (N, n) features tensor. A tensor label column
+        keeps its shape (N, *tensor_shape).
+
         Note that you probably want to call ``.split()`` on this dataset if
         there are to be multiple Torch workers consuming the data.
 
@@ -1921,6 +1980,8 @@ class Dataset(Generic[T]):
                 if the dataset size is not divisible by the batch size. If
                 False and the size of dataset is not divisible by the batch
                 size, then the last batch will be smaller. Defaults to False.
+            prefetch_batches (int): The number of batches to fetch ahead of
+                the training loop on a background thread pool. Defaults to 0.
 
         Returns:
             A torch IterableDataset.
@@ -1939,32 +2000,44 @@ class Dataset(Generic[T]):
                                  "match!")
 
         def make_generator():
+            # Convert the numpy views of the columns to tensors directly,
+            # which avoids the conversion of each batch to pandas.
             for batch in self.iter_batches(
                     batch_size=batch_size,
-                    batch_format="pandas",
+                    batch_format="numpy",
                     prefetch_blocks=prefetch_blocks,
-                    drop_last=drop_last):
-                label_vals = batch.pop(label_column).values
+                    drop_last=drop_last,
+                    prefetch_batches=prefetch_batches):
+                label_vals = batch.pop(label_column)
                 label_tensor = torch.as_tensor(
                     label_vals, dtype=label_column_dtype)
-                label_tensor = label_tensor.view(-1, 1)
+                if label_tensor.dim() == 1:
+                    label_tensor = label_tensor.view(-1, 1)
 
-                feature_tensors = []
                 if feature_columns:
-                    batch = batch[feature_columns]
+                    columns = feature_columns
+                else:
+                    columns = list(batch.keys())
 
                 if feature_column_dtypes:
                     dtypes = feature_column_dtypes
                 else:
-                    dtypes = [None] * len(batch.columns)
+                    dtypes = [None] * len(columns)
 
-                for col, dtype in zip(batch.columns, dtypes):
-                    col_vals = batch[col].values
-                    t = torch.as_tensor(col_vals, dtype=dtype)
-                    t = t.view(-1, 1)
+                feature_tensors = []
+                for col, dtype in zip(columns, dtypes):
+                    t = torch.as_tensor(batch[col], dtype=dtype)
                     feature_tensors.append(t)
 
-                features_tensor = torch.cat(feature_tensors, dim=1)
+                if len(feature_tensors) == 1 and feature_tensors[0].dim() > 1:
+                    # Keep the shape of a single tensor feature column.
+                    features_tensor = feature_tensors[0]
+                else:
+                    feature_tensors = [
+                        t.view(-1, 1) if t.dim() == 1 else t.flatten(1)
+                        for t in feature_tensors
+                    ]
+                    features_tensor = torch.cat(feature_tensors, dim=1)
                 yield (features_tensor, label_tensor)
 
         return TorchIterableDataset(make_generator)
@@ -1975,7 +2048,8 @@ class Dataset(Generic[T]):
               output_signature: Tuple["tf.TypeSpec", "tf.TypeSpec"],
               feature_columns: Optional[List[str]] = None,
               prefetch_blocks: int = 0,
-              batch_size: int = 1) -> "tf.data.Dataset":
+              batch_size: int = 1,
+              prefetch_batches: int = 0) -> "tf.data.Dataset":
         """Return a TF Dataset over this dataset.
 
         The TF Dataset will be created from the generator returned by the
@@ -2006,6 +2080,8 @@ class Dataset(Generic[T]):
             prefetch_blocks: The number of blocks to prefetch ahead of the
                 current block during the scan.
             batch_size: Record batch size. Defaults to 1.
+            prefetch_batches: The number of batches to fetch ahead of the
+                training loop on a background thread pool. Defaults to 0.
 
         Returns:
             A tf.data.Dataset.
@@ -2022,7 +2098,8 @@ class Dataset(Generic[T]):
             for batch in self.iter_batches(
                     prefetch_blocks=prefetch_blocks,
                     batch_size=batch_size,
-                    batch_format="pandas"):
+                    batch_format="pandas",
+                    prefetch_batches=prefetch_batches):
                 target_col = batch.pop(label_column)
                 if feature_columns:
                     batch = batch[feature_columns]
@@ -2218,6 +2295,75 @@ class Dataset(Generic[T]):
         block_to_arrow = cached_remote_fn(_block_to_arrow)
         return [block_to_arrow.remote(block) for block in blocks]
 
+    def cache(self, storage: str = "memory") -> "Dataset[T]":
+        """Materialize this dataset and cache it for reuse.
+
+        Cached datasets are keyed by their lineage, i.e., the datasource and
+        arguments they were read with and the functions of the transforms
+        applied since. Calling ``.cache()`` on a dataset with the same lineage
+        returns the cached blocks instead of recomputing them.
+
+        With ``storage="memory"``, the blocks are pinned in the object store
+        and reused within this driver process. With ``storage="disk"``, the
+        blocks are written to ``DatasetContext.cache_dir`` on the local disk
+        of the driver node, in the Arrow IPC format for Arrow datasets, so
+        that later jobs on the node can read them back. Both caches evict
+        the least recently used datasets once they exceed their budget in
+        the ``DatasetContext``.
+
+        Note that the lineage key doesn't reflect changes to the contents of
+        the files read, nor to the code of functions imported by the
+        transforms. Clear the cache directory when either changes. Lineage
+        keys are the same across jobs, but not across Python versions.
+
+        Examples:
+            >>> # Read and preprocess once, then train for several epochs.
+            >>> ds = ray.data.read_parquet(...).map_batches(preprocess)
+            >>> ds = ds.cache(storage="disk")
+
+        Time complexity: O(dataset size / parallelism)
+
+        Args:
+            storage: Either "memory" (default) or "disk".
+
+        Returns:
+            A materialized dataset with the same lineage as this dataset.
+        """
+        if storage not in ["memory", "disk"]:
+            raise ValueError(
+                "The cache storage must be one of 'memory' or 'disk', got: "
+                "{}".format(storage))
+        key = self._plan.lineage_key
+        if key is None and storage == "disk":
+            raise ValueError(
+                "This dataset can't be cached on disk, since its lineage is "
+                "unknown. Only datasets read with ray.data.read_*() and "
+                "transformed with .map(), .map_batches(), .flat_map() or "
+                ".filter() can be cached on disk, as long as their arguments "
+                "don't reference large objects or other datasets.")
+
+        if key is not None:
+            if storage == "memory":
+                cached = get_cached(key)
+            else:
+                cached = read_disk_cache(key)
+            if cached is not None:
+                blocks, stats = cached
+                return Dataset(
+                    blocks, self._epoch, stats, _lineage=self._plan.lineage)
+
+        blocks_with_metadata = list(self._blocks.iter_blocks_with_metadata())
+        blocks = BlockList([b for b, _ in blocks_with_metadata],
+                           [m for _, m in blocks_with_metadata])
+        stats = self._plan.stats()
+        if key is not None:
+            if storage == "memory":
+                put_cached(key, blocks, stats)
+            else:
+                write_disk_cache(key, blocks)
+        return Dataset(
+            blocks, self._epoch, stats, _lineage=self._plan.lineage)
+
     def repeat(self, times: int = None) -> "DatasetPipeline[T]":
         """Convert this into a DatasetPipeline by looping over this dataset.
 
@@ -2464,6 +2610,83 @@ class Dataset(Generic[T]):
         self._epoch = epoch
 
 
+def _iter_batches(blocks: Iterator[ObjectRef[Block]],
+                  *,
+                  prefetch_blocks: int,
+                  batch_size: Optional[int],
+                  batch_format: str,
+                  drop_last: bool,
+                  prefetch_batches: int = 0) -> Iterator[BatchType]:
+    """Iterate over batches of the given blocks, see Dataset.iter_batches()."""
+
+    def sliding_window(iterable: Iterable, n: int):
+        """Creates an iterator consisting of n-width sliding windows over
+        iterable. The sliding windows are constructed lazily such that an
+        element on the base iterator (iterable) isn't consumed until the
+        first sliding window containing that element is reached.
+
+        Args:
+            iterable: The iterable on which the sliding window will be
+                created.
+            n: The width of the sliding window.
+
+        Returns:
+            An iterator of n-width windows over iterable.
+        """
+        iters = itertools.tee(iter(iterable), n)
+        for i in range(1, n):
+            for it in iters[i:]:
+                next(it, None)
+        return zip(*iters)
+
+    def format_batch(batch: Block) -> BatchType:
+        if batch_format == "native":
+            return batch
+        elif batch_format == "pandas":
+            batch = BlockAccessor.for_block(batch)
+            return batch.to_pandas()
+        elif batch_format == "pyarrow":
+            batch = BlockAccessor.for_block(batch)
+            return batch.to_arrow()
+        elif batch_format == "numpy":
+            batch = BlockAccessor.for_block(batch)
+            return batch.to_numpy_batch()
+        else:
+            raise ValueError(
+                f"The given batch format: {batch_format} "
+                f"is invalid. Supported batch type: {BatchType}")
+
+    batcher = Batcher(batch_size=batch_size)
+
+    def batch_block(block: ObjectRef[Block]):
+        block = ray.get(block)
+        batcher.add(block)
+        yield from batcher.iter_batches()
+
+    def iter_unformatted_batches() -> Iterator[Block]:
+        block_window = []  # Handle empty sliding window gracefully.
+        for block_window in sliding_window(blocks, prefetch_blocks + 1):
+            block_window = list(block_window)
+            ray.wait(block_window, num_returns=1, fetch_local=True)
+            yield from batch_block(block_window[0])
+
+        # Consume remainder of final block window.
+        for block in block_window[1:]:
+            yield from batch_block(block)
+
+        # Yield any remainder batches.
+        if batcher.has_any() and not drop_last:
+            yield batcher.next_batch()
+
+    if prefetch_batches > 0:
+        # Fetch and format the batches on a background thread pool.
+        yield from _map_in_background(
+            format_batch, iter_unformatted_batches(), prefetch_batches)
+    else:
+        for batch in iter_unformatted_batches():
+            yield format_batch(batch)
+
+
 def _get_num_rows(block: Block) -> int:
     block = BlockAccessor.for_block(block)
     return block.num_rows()
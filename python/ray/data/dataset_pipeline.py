@@ -5,9 +5,10 @@ from typing import Any, Callable, List, Iterator, Iterable, Generic, Union, \
 
 import ray
 from ray.data.context import DatasetContext
-from ray.data.dataset import Dataset, T, U, BatchType
+from ray.data.dataset import Dataset, T, U, BatchType, _iter_batches
 from ray.data.impl.pipeline_executor import PipelineExecutor, \
-    PipelineSplitExecutorCoordinator
+    PipelineSplitExecutorCoordinator, PerRecordWindowFn, \
+    StreamingPipelineExecutor, get_streaming_stages
 from ray.data.impl import progress_bar
 from ray.util.annotations import PublicAPI, DeveloperAPI
 
@@ -76,7 +77,8 @@ class DatasetPipeline(Generic[T]):
                      prefetch_blocks: int = 0,
                      batch_size: int = None,
                      batch_format: str = "pandas",
-                     drop_last: bool = False) -> Iterator[BatchType]:
+                     drop_last: bool = False,
+                     prefetch_batches: int = 0) -> Iterator[BatchType]:
         """Return a local batched iterator over the data in the pipeline.
 
         Examples:
@@ -90,13 +92,41 @@ class DatasetPipeline(Generic[T]):
                 current block during the scan.
             batch_size: Record batch size, or None to let the system pick.
             batch_format: The format in which to return each batch.
-                Specify "pandas" to select ``pandas.DataFrame`` or "pyarrow" to
-                select ``pyarrow.Table``. Default is "pandas".
+                Specify "pandas" to select ``pandas.DataFrame``, "pyarrow" to
+                select ``pyarrow.Table``, or "numpy" to select a dict of column
+                name to ``np.ndarray``. Default is "pandas".
             drop_last: Whether to drop the last batch if it's incomplete.
+            prefetch_batches: The number of batches to fetch and format ahead
+                of the consumer on a background thread pool of as many
+                threads. If 0, the batches are fetched and formatted
+                on the consumer thread.
+
+        If ``use_streaming_pipeline_executor`` is set in the DatasetContext
+        and the pipeline only consists of task-based per-record transforms,
+        the blocks are streamed through all stages of the pipeline, rather
+        than executing the pipeline window by window. This bounds the memory
+        used by the pipeline regardless of the window size, and applies
+        backpressure to the pipeline if the consumer falls behind.
 
         Returns:
             A list of iterators over record batches.
         """
+        context = DatasetContext.get_current()
+        if context.use_streaming_pipeline_executor:
+            stages = get_streaming_stages(self._stages)
+            if stages is not None:
+                if self._executed[0]:
+                    raise RuntimeError(
+                        "Pipeline cannot be read multiple times.")
+                self._executed[0] = True
+                executor = StreamingPipelineExecutor(self, stages)
+                return _iter_batches(
+                    (block for block, _ in executor),
+                    prefetch_blocks=prefetch_blocks,
+                    batch_size=batch_size,
+                    batch_format=batch_format,
+                    drop_last=drop_last,
+                    prefetch_batches=prefetch_batches)
 
         def gen_batches() -> Iterator[BatchType]:
             for ds in self.iter_datasets():
@@ -104,7 +134,8 @@ class DatasetPipeline(Generic[T]):
                         prefetch_blocks=prefetch_blocks,
                         batch_size=batch_size,
                         batch_format=batch_format,
-                        drop_last=drop_last):
+                        drop_last=drop_last,
+                        prefetch_batches=prefetch_batches):
                     yield batch
 
         return gen_batches()
@@ -604,7 +635,7 @@ for method in PER_DATASET_OPS:
 
         def impl(self, *args, **kwargs) -> "DatasetPipeline[U]":
             return self.foreach_window(
-                lambda ds: getattr(ds, method)(*args, **kwargs))
+                PerRecordWindowFn(method, args, kwargs))
 
         impl.__name__ = delegate.__name__
         impl.__doc__ = """
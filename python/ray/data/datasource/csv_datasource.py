@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Any, Dict, Callable
+from typing import TYPE_CHECKING, Any, Dict, Callable, Iterator
 
 if TYPE_CHECKING:
     import pyarrow
@@ -35,5 +35,31 @@ class CSVDatasource(FileBasedDatasource):
         write_options = writer_args.pop("write_options", None)
         csv.write_csv(block.to_arrow(), f, write_options, **writer_args)
 
+    def _write_blocks(self,
+                      f: "pyarrow.NativeFile",
+                      blocks: Iterator[BlockAccessor],
+                      writer_args_fn: Callable[[], Dict[str, Any]] = (
+                          lambda: {}),
+                      **writer_args):
+        from pyarrow import csv
+
+        writer_args = _resolve_kwargs(writer_args_fn, **writer_args)
+        write_options = writer_args.pop("write_options", None)
+        writer = schema = None
+        try:
+            # Stream the blocks to the file, writing the header only once.
+            for block in blocks:
+                table = block.to_arrow()
+                if writer is None:
+                    writer = csv.CSVWriter(f, table.schema, write_options,
+                                           **writer_args)
+                    schema = table.schema
+                elif not table.schema.equals(schema):
+                    table = table.cast(schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
     def _file_format(self):
         return "csv"
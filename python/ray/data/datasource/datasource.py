@@ -6,7 +6,7 @@ import numpy as np
 import ray
 from ray.types import ObjectRef
 from ray.data.block import Block, BlockAccessor, BlockMetadata, T, \
-    BlockPartition, BlockPartitionMetadata
+    BlockPartition, BlockPartitionMetadata, BlockExecStats
 from ray.data.context import DatasetContext
 from ray.data.impl.arrow_block import ArrowRow
 from ray.util.annotations import DeveloperAPI
@@ -117,6 +117,7 @@ class ReadTask(Callable[[], BlockPartition]):
 
     def __call__(self) -> BlockPartition:
         context = DatasetContext.get_current()
+        stats = BlockExecStats.builder()
         result = self._read_fn()
         if not hasattr(result, "__iter__"):
             DeprecationWarning(
@@ -126,7 +127,10 @@ class ReadTask(Callable[[], BlockPartition]):
         partition: BlockPartition = []
         for block in result:
             metadata = BlockAccessor.for_block(block).get_metadata(
-                input_files=self._metadata.input_files)
+                input_files=self._metadata.input_files,
+                exec_stats=stats.build())
+            # Attribute the time until the next block to that block.
+            stats = BlockExecStats.builder()
             assert context.block_owner
             partition.append((ray.put(block, _owner=context.block_owner),
                               metadata))
@@ -1,18 +1,24 @@
 import logging
+import math
 from typing import Callable, Optional, List, Tuple, Union, Any, Dict, \
-    TYPE_CHECKING
+    Iterator, TYPE_CHECKING
 import urllib.parse
 
 if TYPE_CHECKING:
     import pyarrow
 
+import ray
 from ray.types import ObjectRef
 from ray.data.block import Block, BlockAccessor
-from ray.data.impl.arrow_block import (ArrowRow, DelegatingArrowBlockBuilder)
+from ray.data.context import DatasetContext
+from ray.data.impl.arrow_block import ArrowRow, DelegatingArrowBlockBuilder
 from ray.data.impl.block_list import BlockMetadata
+from ray.data.impl.output_buffer import BlockOutputBuffer, \
+    get_target_max_block_size
 from ray.data.datasource.datasource import Datasource, ReadTask, WriteResult
 from ray.util.annotations import DeveloperAPI
-from ray.data.impl.util import _check_pyarrow_version
+from ray.data.impl.util import _check_pyarrow_version, _map_concurrently, \
+    _split_by_size
 from ray.data.impl.remote_fn import cached_remote_fn
 
 logger = logging.getLogger(__name__)
@@ -121,13 +127,15 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
         """
         _check_pyarrow_version()
         import pyarrow as pa
-        import numpy as np
 
         paths, filesystem = _resolve_paths_and_filesystem(paths, filesystem)
         paths, file_infos = _expand_paths(paths, filesystem)
         file_sizes = [file_info.size for file_info in file_infos]
 
         read_file = self._read_file
+        context = DatasetContext.get_current()
+        num_threads = context.read_threads_per_task
+        target_max_block_size = get_target_max_block_size(context)
 
         filesystem = _wrap_s3_serialization_workaround(filesystem)
 
@@ -140,25 +148,36 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
             logger.debug(f"Reading {len(read_paths)} files.")
             if isinstance(fs, _S3FileSystemWrapper):
                 fs = fs.unwrap()
-            builder = DelegatingArrowBlockBuilder()
-            for read_path in read_paths:
-                with fs.open_input_stream(read_path, **open_stream_args) as f:
-                    data = read_file(f, read_path, **reader_args)
-                    if isinstance(data, pa.Table):
-                        builder.add_block(data)
-                    else:
-                        builder.add(data)
-            block = builder.build()
-            if _block_udf is not None:
-                block = _block_udf(block)
-            return block
 
+            def read_path(path: str):
+                with fs.open_input_stream(path, **open_stream_args) as f:
+                    return read_file(f, path, **reader_args)
+
+            output_buffer = BlockOutputBuffer(_block_udf,
+                                              target_max_block_size)
+            for data in _map_concurrently(read_path, read_paths,
+                                          min(num_threads, len(read_paths))):
+                if isinstance(data, pa.Table):
+                    output_buffer.add_block(data)
+                else:
+                    output_buffer.add(data)
+                if output_buffer.has_next():
+                    yield output_buffer.next()
+            output_buffer.finalize()
+            if output_buffer.has_next():
+                yield output_buffer.next()
+
+        # Files of unknown size are assumed to be of the average known size.
+        known_sizes = [s for s in file_sizes if s is not None]
+        default_size = (sum(known_sizes) // len(known_sizes)
+                        if known_sizes else 1)
+        split_sizes = [
+            s if s is not None else default_size for s in file_sizes
+        ]
         read_tasks = []
-        for read_paths, file_sizes in zip(
-                np.array_split(paths, parallelism),
-                np.array_split(file_sizes, parallelism)):
-            if len(read_paths) <= 0:
-                continue
+        for indices in _split_by_size(split_sizes, parallelism):
+            read_paths = [paths[i] for i in indices]
+            read_sizes = [file_sizes[i] for i in indices]
 
             if self._rows_per_file() is None:
                 num_rows = None
@@ -166,13 +185,12 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
                 num_rows = len(read_paths) * self._rows_per_file()
             meta = BlockMetadata(
                 num_rows=num_rows,
-                size_bytes=sum(file_sizes),
+                size_bytes=(None if None in read_sizes else sum(read_sizes)),
                 schema=schema,
                 input_files=read_paths)
             read_task = ReadTask(
-                lambda read_paths=read_paths: [
-                    read_files(read_paths, filesystem)], meta
-            )
+                lambda read_paths=read_paths: read_files(
+                    read_paths, filesystem), meta)
             read_tasks.append(read_task)
 
         return read_tasks
@@ -202,7 +220,13 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
                  write_args_fn: Callable[[], Dict[str, Any]] = lambda: {},
                  _block_udf: Optional[Callable[[Block], Block]] = None,
                  **write_args) -> List[ObjectRef[WriteResult]]:
-        """Creates and returns write tasks for a file-based datasource."""
+        """Creates and returns write tasks for a file-based datasource.
+
+        Consecutive blocks are coalesced into files of about the
+        ``write_target_file_size`` of the ``DatasetContext``, if set. At most
+        ``write_max_concurrent_tasks`` write tasks are in flight at a time,
+        so this blocks until the last write tasks have been launched.
+        """
         path, filesystem = _resolve_paths_and_filesystem(path, filesystem)
         path = path[0]
         if try_create_dir:
@@ -210,41 +234,65 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
         filesystem = _wrap_s3_serialization_workaround(filesystem)
 
         _write_block_to_file = self._write_block
+        _write_blocks_to_file = self._write_blocks
 
         if open_stream_args is None:
             open_stream_args = {}
 
-        def write_block(write_path: str, block: Block):
+        def write_blocks(write_path: str, block_refs: List[ObjectRef[Block]]):
             logger.debug(f"Writing {write_path} file.")
             fs = filesystem
             if isinstance(fs, _S3FileSystemWrapper):
                 fs = fs.unwrap()
-            if _block_udf is not None:
-                block = _block_udf(block)
-
-            with fs.open_output_stream(write_path, **open_stream_args) as f:
-                _write_block_to_file(
-                    f,
-                    BlockAccessor.for_block(block),
-                    writer_args_fn=write_args_fn,
-                    **write_args)
 
-        write_block = cached_remote_fn(write_block)
+            def iter_blocks() -> Iterator[BlockAccessor]:
+                # Fetch the blocks one at a time, so that only a single
+                # block is held in memory while writing.
+                for block_ref in block_refs:
+                    block = ray.get(block_ref)
+                    if _block_udf is not None:
+                        block = _block_udf(block)
+                    yield BlockAccessor.for_block(block)
 
+            with fs.open_output_stream(write_path, **open_stream_args) as f:
+                if len(block_refs) == 1:
+                    _write_block_to_file(
+                        f,
+                        next(iter_blocks()),
+                        writer_args_fn=write_args_fn,
+                        **write_args)
+                else:
+                    _write_blocks_to_file(
+                        f,
+                        iter_blocks(),
+                        writer_args_fn=write_args_fn,
+                        **write_args)
+
+        write_blocks = cached_remote_fn(write_blocks)
+
+        context = DatasetContext.get_current()
         file_format = self._file_format()
         write_tasks = []
+        in_flight = []
         if not block_path_provider:
             block_path_provider = DefaultBlockWritePathProvider()
-        for block_idx, block in enumerate(blocks):
+        for file_idx, block_idxs in enumerate(
+                _coalesce_blocks(metadata, context.write_target_file_size)):
+            block_refs = [blocks[i] for i in block_idxs]
             write_path = block_path_provider(
                 path,
                 filesystem=filesystem,
                 dataset_uuid=dataset_uuid,
-                block=block,
-                block_index=block_idx,
+                block=block_refs[0],
+                block_index=file_idx,
                 file_format=file_format)
-            write_task = write_block.remote(write_path, block)
+            # Bound the number of concurrent writers, to avoid overwhelming
+            # the filesystem client with requests.
+            if len(in_flight) >= context.write_max_concurrent_tasks:
+                _, in_flight = ray.wait(in_flight, num_returns=1)
+            write_task = write_blocks.remote(write_path, block_refs)
             write_tasks.append(write_task)
+            in_flight.append(write_task)
 
         return write_tasks
 
@@ -260,6 +308,27 @@ class FileBasedDatasource(Datasource[Union[ArrowRow, Any]]):
         raise NotImplementedError(
             "Subclasses of FileBasedDatasource must implement _write_files().")
 
+    def _write_blocks(self,
+                      f: "pyarrow.NativeFile",
+                      blocks: Iterator[BlockAccessor],
+                      writer_args_fn: Callable[[], Dict[str, Any]] = (
+                          lambda: {}),
+                      **writer_args):
+        """Writes multiple blocks coalesced into a single file.
+
+        By default, the blocks are concatenated and written with
+        ``_write_block()``. Subclasses can override this to stream the blocks
+        to the file one at a time.
+        """
+        builder = DelegatingArrowBlockBuilder()
+        for block in blocks:
+            builder.add_block(block.to_block())
+        self._write_block(
+            f,
+            BlockAccessor.for_block(builder.build()),
+            writer_args_fn=writer_args_fn,
+            **writer_args)
+
     def _file_format(self):
         """Returns the file format string, to be used as the file extension
         when writing files.
@@ -473,3 +542,21 @@ def _resolve_kwargs(kwargs_fn: Callable[[], Dict[str, Any]],
         kwarg_overrides = kwargs_fn()
         kwargs.update(kwarg_overrides)
     return kwargs
+
+
+def _coalesce_blocks(metadata: List[BlockMetadata],
+                     target_file_size: Optional[int]) -> List[List[int]]:
+    """Group consecutive blocks into files of about the target size.
+
+    Returns:
+        The indices of the blocks written to each file, in order.
+    """
+    if target_file_size is None or not metadata:
+        return [[i] for i in range(len(metadata))]
+    # Blocks of unknown size are assumed to fill a file of their own.
+    sizes = [
+        m.size_bytes if m.size_bytes is not None else target_file_size
+        for m in metadata
+    ]
+    num_files = max(1, math.ceil(sum(sizes) / target_file_size))
+    return _split_by_size(sizes, min(num_files, len(sizes)))
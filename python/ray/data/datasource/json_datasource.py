@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Any, Dict, Callable
+from typing import TYPE_CHECKING, Any, Dict, Callable, Iterator
 
 if TYPE_CHECKING:
     import pyarrow
@@ -34,5 +34,26 @@ class JSONDatasource(FileBasedDatasource):
         lines = writer_args.pop("lines", True)
         block.to_pandas().to_json(f, orient=orient, lines=lines, **writer_args)
 
+    def _write_blocks(self,
+                      f: "pyarrow.NativeFile",
+                      blocks: Iterator[BlockAccessor],
+                      writer_args_fn: Callable[[], Dict[str, Any]] = (
+                          lambda: {}),
+                      **writer_args):
+        writer_args = _resolve_kwargs(writer_args_fn, **writer_args)
+        orient = writer_args.pop("orient", "records")
+        lines = writer_args.pop("lines", True)
+        if orient != "records" or not lines:
+            # Only JSON lines files can be written one block at a time.
+            super()._write_blocks(
+                f, blocks, orient=orient, lines=lines, **writer_args)
+            return
+        for block in blocks:
+            text = block.to_pandas().to_json(
+                orient=orient, lines=lines, **writer_args)
+            if text and not text.endswith("\n"):
+                text += "\n"
+            f.write(text.encode("utf-8"))
+
     def _file_format(self):
         return "json"
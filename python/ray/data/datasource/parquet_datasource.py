@@ -1,11 +1,13 @@
 import logging
 import itertools
-from typing import Any, Callable, Dict, Optional, List, Union, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterator, Optional, List, Tuple, \
+    Union, TYPE_CHECKING
 
 import numpy as np
 
 if TYPE_CHECKING:
     import pyarrow
+    import pyarrow.dataset
 
 from ray.types import ObjectRef
 from ray.data.block import Block, BlockAccessor
@@ -15,13 +17,17 @@ from ray.data.datasource.file_based_datasource import (
 from ray.data.impl.block_list import BlockMetadata
 from ray.data.impl.progress_bar import ProgressBar
 from ray.data.impl.remote_fn import cached_remote_fn
-from ray.data.impl.util import _check_pyarrow_version
+from ray.data.impl.util import _check_pyarrow_version, _split_by_size
 
 logger = logging.getLogger(__name__)
 
 PIECES_PER_META_FETCH = 6
 PARALLELIZE_META_FETCH_THRESHOLD = 24
 
+# The footer metadata of a Parquet file fragment, and the IDs of its row
+# groups that may match the read filter.
+PieceMetadataT = Tuple["pyarrow.parquet.FileMetaData", List[int]]
+
 
 class ParquetDatasource(FileBasedDatasource):
     """Parquet datasource, for reading and writing Parquet files.
@@ -39,9 +45,15 @@ class ParquetDatasource(FileBasedDatasource):
             filesystem: Optional["pyarrow.fs.FileSystem"] = None,
             columns: Optional[List[str]] = None,
             schema: Optional[Union[type, "pyarrow.lib.Schema"]] = None,
+            filter: Optional["pyarrow.dataset.Expression"] = None,
             _block_udf: Optional[Callable[[Block], Block]] = None,
             **reader_args) -> List[ReadTask]:
         """Creates and returns read tasks for a Parquet file-based datasource.
+
+        If the footer metadata of all files is available, the read tasks are
+        split by row group, such that each task reads approximately the same
+        number of compressed bytes. Row groups whose statistics don't match
+        the given filter are skipped.
         """
         # NOTE: We override the base class FileBasedDatasource.prepare_read
         # method in order to leverage pyarrow's ParquetDataset abstraction,
@@ -69,15 +81,20 @@ class ParquetDatasource(FileBasedDatasource):
             schema = pa.schema([schema.field(column) for column in columns],
                                schema.metadata)
 
-        def read_pieces(serialized_pieces: List[str]) -> pa.Table:
+        def read_pieces(serialized_pieces: List[Tuple[bytes, Optional[
+                List[int]]]]) -> pa.Table:
             # Implicitly trigger S3 subsystem initialization by importing
             # pyarrow.fs.
             import pyarrow.fs  # noqa: F401
 
-            # Deserialize after loading the filesystem class.
-            pieces: List["pyarrow._dataset.ParquetFileFragment"] = [
-                cloudpickle.loads(p) for p in serialized_pieces
-            ]
+            # Deserialize after loading the filesystem class, and restrict
+            # each piece to the given row groups (or read the whole piece).
+            pieces: List["pyarrow._dataset.ParquetFileFragment"] = []
+            for p, row_groups in serialized_pieces:
+                piece = cloudpickle.loads(p)
+                if row_groups is not None:
+                    piece = piece.subset(row_group_ids=row_groups)
+                pieces.append(piece)
 
             # Ensure that we're reading at least one dataset fragment.
             assert len(pieces) > 0
@@ -92,6 +109,7 @@ class ParquetDatasource(FileBasedDatasource):
                     use_threads=use_threads,
                     columns=columns,
                     schema=schema,
+                    filter=filter,
                     **reader_args)
                 part = _get_partition_keys(piece.partition_expression)
                 if part:
@@ -130,20 +148,46 @@ class ParquetDatasource(FileBasedDatasource):
         read_tasks = []
         serialized_pieces = [cloudpickle.dumps(p) for p in pq_ds.pieces]
         if len(pq_ds.pieces) > PARALLELIZE_META_FETCH_THRESHOLD:
-            metadata = _fetch_metadata_remotely(serialized_pieces)
+            metadata = _fetch_metadata_remotely(serialized_pieces, filter,
+                                                pq_ds.schema)
         else:
-            metadata = _fetch_metadata(pq_ds.pieces)
-        for piece_data in np.array_split(
-                list(zip(pq_ds.pieces, serialized_pieces, metadata)),
-                parallelism):
-            if len(piece_data) == 0:
-                continue
-            pieces, serialized_pieces, metadata = zip(*piece_data)
-            meta = _build_block_metadata(pieces, metadata, inferred_schema)
+            metadata = _fetch_metadata(pq_ds.pieces, filter, pq_ds.schema)
+
+        if len(metadata) < len(pq_ds.pieces):
+            # The footer metadata isn't available, so split the read tasks by
+            # file fragment instead of by row group.
+            for piece_data in np.array_split(
+                    list(zip(pq_ds.pieces, serialized_pieces)), parallelism):
+                if len(piece_data) == 0:
+                    continue
+                pieces, serialized_pieces_ = zip(*piece_data)
+                pieces_ = [(p, None) for p in serialized_pieces_]
+                meta = BlockMetadata(
+                    num_rows=None,
+                    size_bytes=None,
+                    schema=inferred_schema,
+                    input_files=[p.path for p in pieces])
+                read_tasks.append(
+                    ReadTask(lambda pieces_=pieces_: [read_pieces(pieces_)],
+                             meta))
+            return read_tasks
+
+        splits = _split_row_groups(metadata, parallelism, columns)
+        if not splits and pq_ds.pieces:
+            # All row groups were filtered out. Read an empty table from the
+            # first piece, so that the dataset still has a schema.
+            splits = [[(0, [])]]
+        for split in splits:
+            pieces_ = [(serialized_pieces[i], None
+                        if len(row_groups) == metadata[i][0].num_row_groups
+                        else row_groups) for i, row_groups in split]
+            meta = _build_row_group_block_metadata(
+                [pq_ds.pieces[i] for i, _ in split],
+                [(metadata[i][0], row_groups) for i, row_groups in split],
+                inferred_schema,
+                has_filter=filter is not None)
             read_tasks.append(
-                ReadTask(
-                    lambda pieces_=serialized_pieces: [read_pieces(pieces_)],
-                    meta))
+                ReadTask(lambda pieces_=pieces_: [read_pieces(pieces_)], meta))
 
         return read_tasks
 
@@ -157,13 +201,39 @@ class ParquetDatasource(FileBasedDatasource):
         writer_args = _resolve_kwargs(writer_args_fn, **writer_args)
         pq.write_table(block.to_arrow(), f, **writer_args)
 
+    def _write_blocks(self,
+                      f: "pyarrow.NativeFile",
+                      blocks: Iterator[BlockAccessor],
+                      writer_args_fn: Callable[[], Dict[str, Any]] = (
+                          lambda: {}),
+                      **writer_args):
+        import pyarrow.parquet as pq
+
+        writer_args = _resolve_kwargs(writer_args_fn, **writer_args)
+        row_group_size = writer_args.pop("row_group_size", None)
+        writer = schema = None
+        try:
+            # Write each block as its own row groups, so that the blocks are
+            # streamed to the file rather than concatenated in memory.
+            for block in blocks:
+                table = block.to_arrow()
+                if writer is None:
+                    writer = pq.ParquetWriter(f, table.schema, **writer_args)
+                    schema = table.schema
+                elif not table.schema.equals(schema):
+                    table = table.cast(schema)
+                writer.write_table(table, row_group_size=row_group_size)
+        finally:
+            if writer is not None:
+                writer.close()
+
     def _file_format(self) -> str:
         return "parquet"
 
 
 def _fetch_metadata_remotely(
-        pieces: List[bytes]
-) -> List[ObjectRef["pyarrow.parquet.FileMetaData"]]:
+        pieces: List[bytes], filter: Optional["pyarrow.dataset.Expression"],
+        schema: "pyarrow.lib.Schema") -> List[ObjectRef[PieceMetadataT]]:
     remote_fetch_metadata = cached_remote_fn(
         _fetch_metadata_serialization_wrapper)
     metas = []
@@ -172,13 +242,14 @@ def _fetch_metadata_remotely(
     for pieces_ in np.array_split(pieces, parallelism):
         if len(pieces_) == 0:
             continue
-        metas.append(remote_fetch_metadata.remote(pieces_))
+        metas.append(remote_fetch_metadata.remote(pieces_, filter, schema))
     metas = meta_fetch_bar.fetch_until_complete(metas)
     return list(itertools.chain.from_iterable(metas))
 
 
 def _fetch_metadata_serialization_wrapper(
-        pieces: List[bytes]) -> List["pyarrow.parquet.FileMetaData"]:
+        pieces: List[bytes], filter: Optional["pyarrow.dataset.Expression"],
+        schema: "pyarrow.lib.Schema") -> List[PieceMetadataT]:
     # Implicitly trigger S3 subsystem initialization by importing
     # pyarrow.fs.
     import pyarrow.fs  # noqa: F401
@@ -189,42 +260,95 @@ def _fetch_metadata_serialization_wrapper(
         cloudpickle.loads(p) for p in pieces
     ]
 
-    return _fetch_metadata(pieces)
+    return _fetch_metadata(pieces, filter, schema)
+
 
+def _fetch_metadata(pieces: List["pyarrow.dataset.ParquetFileFragment"],
+                    filter: Optional["pyarrow.dataset.Expression"] = None,
+                    schema: Optional["pyarrow.lib.Schema"] = None
+                    ) -> List[PieceMetadataT]:
+    """Fetch the footer metadata of the pieces, and prune their row groups.
 
-def _fetch_metadata(pieces: List["pyarrow.dataset.ParquetFileFragment"]
-                    ) -> List["pyarrow.parquet.FileMetaData"]:
+    The row groups are pruned using the given filter and the row group
+    statistics of the footer (or the partition values of the piece).
+    """
     piece_metadata = []
     for p in pieces:
         try:
-            piece_metadata.append(p.metadata)
+            metadata = p.metadata
         except AttributeError:
             break
+        if filter is None:
+            row_groups = list(range(metadata.num_row_groups))
+        else:
+            row_groups = [
+                rg.id for rg in p.subset(filter=filter, schema=schema)
+                .row_groups
+            ]
+        piece_metadata.append((metadata, row_groups))
     return piece_metadata
 
 
-def _build_block_metadata(
+def _split_row_groups(metadata: List[PieceMetadataT], parallelism: int,
+                      columns: Optional[List[str]]
+                      ) -> List[List[Tuple[int, List[int]]]]:
+    """Split the row groups of the pieces into up to ``parallelism`` reads.
+
+    The row groups are split into contiguous ranges of approximately equal
+    compressed size (of the columns read), so that large files are read by
+    multiple tasks.
+
+    Returns:
+        For each read task, a list of (piece index, row group IDs) pairs.
+    """
+    row_groups = []
+    for i, (file_metadata, row_group_ids) in enumerate(metadata):
+        for rg in row_group_ids:
+            row_groups.append((i, rg))
+    sizes = [
+        _compressed_size(metadata[i][0].row_group(rg), columns)
+        for i, rg in row_groups
+    ]
+    splits = []
+    for indices in _split_by_size(sizes, parallelism):
+        split = []
+        for n in indices:
+            i, rg = row_groups[n]
+            if split and split[-1][0] == i:
+                split[-1][1].append(rg)
+            else:
+                split.append((i, [rg]))
+        splits.append(split)
+    return splits
+
+
+def _compressed_size(row_group: "pyarrow.parquet.RowGroupMetaData",
+                     columns: Optional[List[str]]) -> int:
+    size = 0
+    for j in range(row_group.num_columns):
+        column = row_group.column(j)
+        if columns and column.path_in_schema.split(".")[0] not in columns:
+            continue
+        size += column.total_compressed_size
+    return size
+
+
+def _build_row_group_block_metadata(
         pieces: List["pyarrow.dataset.ParquetFileFragment"],
-        metadata: List["pyarrow.parquet.FileMetaData"],
-        schema: Optional[Union[type, "pyarrow.lib.Schema"]]) -> BlockMetadata:
-    input_files = [p.path for p in pieces]
-    if len(metadata) == len(pieces):
-        # Piece metadata was available, construct a normal
-        # BlockMetadata.
-        block_metadata = BlockMetadata(
-            num_rows=sum(m.num_rows for m in metadata),
-            size_bytes=sum(
-                sum(
-                    m.row_group(i).total_byte_size
-                    for i in range(m.num_row_groups)) for m in metadata),
-            schema=schema,
-            input_files=input_files)
-    else:
-        # Piece metadata was not available, construct an empty
-        # BlockMetadata.
-        block_metadata = BlockMetadata(
-            num_rows=None,
-            size_bytes=None,
-            schema=schema,
-            input_files=input_files)
-    return block_metadata
+        metadata: List[PieceMetadataT],
+        schema: Optional[Union[type, "pyarrow.lib.Schema"]],
+        has_filter: bool) -> BlockMetadata:
+    num_rows = 0
+    size_bytes = 0
+    for file_metadata, row_groups in metadata:
+        for rg in row_groups:
+            row_group = file_metadata.row_group(rg)
+            num_rows += row_group.num_rows
+            size_bytes += row_group.total_byte_size
+    return BlockMetadata(
+        # A filter also drops rows within the row groups that survive
+        # pruning, so the number of rows is only known after the read.
+        num_rows=None if has_filter else num_rows,
+        size_bytes=size_bytes,
+        schema=schema,
+        input_files=[p.path for p in pieces])
@@ -9,14 +9,19 @@ from ray.data.aggregate import AggregateFn, Count, Sum, Max, Min, \
 from ray.data.impl.block_list import BlockList
 from ray.data.impl.remote_fn import cached_remote_fn
 from ray.data.impl.progress_bar import ProgressBar
+from ray.data.impl.stats import DatasetStats
 from ray.data.block import Block, BlockAccessor, BlockMetadata, \
-    T, U, KeyType
+    BlockExecStats, T, U, KeyType
 
 GroupKeyBaseT = Union[Callable[[T], KeyType], str]
 GroupKeyT = Optional[Union[GroupKeyBaseT, List[GroupKeyBaseT]]]
 
 AggregateOnTs = Union[AggregateOnT, List[AggregateOnT]]
 
+# Aggregations whose accumulators are of constant size, so that combining the
+# rows of each block by key shrinks it to (at most) a row per key.
+COMBINABLE_AGGS = (Count, Sum, Min, Max, Mean, Std)
+
 
 @PublicAPI(stability="beta")
 class GroupedDataset(Generic[T]):
@@ -76,6 +81,10 @@ class GroupedDataset(Generic[T]):
         if self._dataset.num_blocks() == 0:
             return self._dataset
 
+        if self._key is not None and all(
+                isinstance(agg, COMBINABLE_AGGS) for agg in aggs):
+            return self._hash_aggregate(aggs)
+
         blocks = list(self._dataset._blocks.iter_blocks())
         num_mappers = len(blocks)
         num_reducers = num_mappers
@@ -114,6 +123,63 @@ class GroupedDataset(Generic[T]):
         metadata = ray.get(metadata)
         return Dataset(BlockList(blocks, metadata), self._dataset._epoch)
 
+    def _hash_aggregate(self, aggs: Tuple[AggregateFn]) -> Dataset[U]:
+        """Aggregate by hash-partitioning the combined blocks.
+
+        Each map task combines the rows of its block by key, without sorting
+        the block, and hash-partitions the accumulators among the reducers,
+        which merge and finalize them. Since the accumulators of combinable
+        aggregations are small, the output is then sorted by key, which is
+        much cheaper than sorting the input dataset.
+        """
+        blocks = list(self._dataset._blocks.iter_blocks())
+        num_mappers = len(blocks)
+        num_reducers = num_mappers
+
+        # The last output of each map task is its metadata.
+        hash_partition_and_combine_block = cached_remote_fn(
+            _hash_partition_and_combine_block).options(
+                num_returns=num_reducers + 1)
+        aggregate_hash_partitions = cached_remote_fn(
+            _aggregate_hash_partitions, num_returns=2)
+
+        map_results = np.empty((num_mappers, num_reducers), dtype=object)
+        map_metadata = []
+        for i, block in enumerate(blocks):
+            out = hash_partition_and_combine_block.remote(
+                block, self._key, aggs, num_reducers)
+            map_results[i, :] = out[:-1]
+            map_metadata.append(out[-1])
+        map_bar = ProgressBar("GroupBy Map", len(map_results))
+        map_metadata = map_bar.fetch_until_complete(map_metadata)
+        map_bar.close()
+
+        blocks = []
+        metadata = []
+        for j in range(num_reducers):
+            block, meta = aggregate_hash_partitions.remote(
+                self._key, aggs, *map_results[:, j].tolist())
+            blocks.append(block)
+            metadata.append(meta)
+        reduce_bar = ProgressBar("GroupBy Reduce", len(blocks))
+        reduce_bar.block_until_complete(blocks)
+        reduce_bar.close()
+
+        metadata = ray.get(metadata)
+        stages = {"groupby_map": map_metadata, "groupby_reduce": metadata}
+        blocks = BlockList(blocks, metadata)
+        if num_reducers > 1:
+            # Each reducer's output is sorted, but the keys are interleaved
+            # across the reducers.
+            blocks, sort_stages = sort.sort_impl(
+                blocks, self._key
+                if isinstance(self._key, str) else lambda r: r[0])
+            stages.update(sort_stages)
+        return Dataset(blocks, self._dataset._epoch,
+                       DatasetStats(
+                           stages=stages,
+                           parent=self._dataset._plan.stats()))
+
     def _aggregate_on(self, agg_cls: type, on: Optional[AggregateOnTs], *args,
                       **kwargs):
         """Helper for aggregating on a particular subset of the dataset.
@@ -437,6 +503,32 @@ def _partition_and_combine_block(block: Block[T], boundaries: List[KeyType],
     return [BlockAccessor.for_block(p).combine(key, aggs) for p in partitions]
 
 
+def _hash_partition_and_combine_block(
+        block: Block[T], key: GroupKeyT, aggs: Tuple[AggregateFn],
+        num_reducers: int) -> List[Union[Block, BlockMetadata]]:
+    """Combine rows with the same key and hash-partition them by key."""
+    stats = BlockExecStats.builder()
+    stats.add_input(block)
+    accessor = BlockAccessor.for_block(block)
+    partitions = accessor.hash_combine(key, aggs, num_reducers)
+    return partitions + [
+        accessor.get_metadata(input_files=None, exec_stats=stats.build())
+    ]
+
+
+def _aggregate_hash_partitions(
+        key: GroupKeyT, aggs: Tuple[AggregateFn],
+        *blocks: Tuple[Block, ...]) -> Tuple[Block[U], BlockMetadata]:
+    """Aggregate the partially combined blocks of a hash partition."""
+    stats = BlockExecStats.builder()
+    for block in blocks:
+        stats.add_input(block)
+    block, metadata = BlockAccessor.for_block(
+        blocks[0]).aggregate_combined_blocks(list(blocks), key, aggs)
+    metadata.exec_stats = stats.build()
+    return block, metadata
+
+
 def _aggregate_combined_blocks(
         num_reducers: int, key: GroupKeyT, aggs: Tuple[AggregateFn],
         *blocks: Tuple[Block, ...]) -> Tuple[Block[U], BlockMetadata]:
@@ -2,7 +2,7 @@ import collections
 import random
 import heapq
 from typing import Iterator, List, Union, Tuple, Any, TypeVar, Optional, \
-    TYPE_CHECKING
+    Dict, TYPE_CHECKING
 
 import numpy as np
 
@@ -14,6 +14,7 @@ except ImportError:
 from ray.data.block import Block, BlockAccessor, BlockMetadata
 from ray.data.impl.block_builder import BlockBuilder
 from ray.data.impl.simple_block import SimpleBlockBuilder
+from ray.data.impl.util import _accumulate_by_key, _hash_key
 from ray.data.aggregate import AggregateFn
 from ray.data.impl.size_estimator import SizeEstimator
 
@@ -232,16 +233,20 @@ class ArrowBlockAccessor(BlockAccessor):
             raise ValueError(
                 "Cannot find column {}, available columns: {}".format(
                     column, self._table.column_names))
-        array = self._table[column]
-        if array.num_chunks > 1:
-            # TODO(ekl) combine fails since we can't concat ArrowTensorType?
-            array = array.combine_chunks()
-        assert array.num_chunks == 1, array
-        return self._table[column].chunk(0).to_numpy()
+        return _column_to_numpy(self._table[column])
+
+    def to_numpy_batch(self) -> Dict[str, np.ndarray]:
+        return {
+            column: _column_to_numpy(self._table[column])
+            for column in self._table.column_names
+        }
 
     def to_arrow(self) -> "pyarrow.Table":
         return self._table
 
+    def to_block(self) -> "pyarrow.Table":
+        return self._table
+
     def num_rows(self) -> int:
         return self._table.num_rows
 
@@ -290,10 +295,6 @@ class ArrowBlockAccessor(BlockAccessor):
 
     def sort_and_partition(self, boundaries: List[T], key: SortKeyT,
                            descending: bool) -> List["Block[T]"]:
-        if len(key) > 1:
-            raise NotImplementedError(
-                "sorting by multiple columns is not supported yet")
-
         if self._table.num_rows == 0:
             # If the pyarrow table is empty we may not have schema
             # so calling sort_indices() will raise an error.
@@ -309,30 +310,11 @@ class ArrowBlockAccessor(BlockAccessor):
         if len(boundaries) == 0:
             return [table]
 
-        # For each boundary value, count the number of items that are less
-        # than it. Since the block is sorted, these counts partition the items
+        # For each boundary value, count the number of items that sort before
+        # it. Since the block is sorted, these counts partition the items
         # such that boundaries[i] <= x < boundaries[i + 1] for each x in
-        # partition[i]. If `descending` is true, `boundaries` would also be
-        # in descending order and we only need to count the number of items
-        # *greater than* the boundary value instead.
-        col, _ = key[0]
-        comp_fn = pac.greater if descending else pac.less
-
-        # TODO(ekl) this is O(n^2) but in practice it's much faster than the
-        # O(n) algorithm, could be optimized.
-        boundary_indices = [
-            pac.sum(comp_fn(table[col], b)).as_py() for b in boundaries
-        ]
-        ### Compute the boundary indices in O(n) time via scan.  # noqa
-        # boundary_indices = []
-        # remaining = boundaries.copy()
-        # values = table[col]
-        # for i, x in enumerate(values):
-        #     while remaining and not comp_fn(x, remaining[0]).as_py():
-        #         remaining.pop(0)
-        #         boundary_indices.append(i)
-        # for _ in remaining:
-        #     boundary_indices.append(len(values))
+        # partition[i] (in the sort order given by `key`).
+        boundary_indices = _find_partition_indices(table, boundaries, key)
 
         ret = []
         prev_i = 0
@@ -389,25 +371,54 @@ class ArrowBlockAccessor(BlockAccessor):
                         accumulators[i] = aggs[i].accumulate(
                             accumulators[i], r)
 
-                # Build the row.
-                row = {}
-                if key is not None:
-                    row[key] = next_key
-
-                count = collections.defaultdict(int)
-                for agg, accumulator in zip(aggs, accumulators):
-                    name = agg.name
-                    # Check for conflicts with existing aggregation name.
-                    if count[name] > 0:
-                        name = self._munge_conflict(name, count[name])
-                    count[name] += 1
-                    row[name] = accumulator
-
-                builder.add(row)
+                builder.add(
+                    self._combined_row(key, next_key, aggs, accumulators))
             except StopIteration:
                 break
         return builder.build()
 
+    def hash_combine(self, key: GroupKeyT, aggs: Tuple[AggregateFn],
+                     num_partitions: int) -> List[Block[ArrowRow]]:
+        """Combine rows with the same key into accumulators, and partition
+        the accumulators by the hash of their key.
+
+        Unlike ``combine()``, this doesn't require the block to be sorted.
+
+        Args:
+            key: The column name of key.
+            aggs: The aggregations to do.
+            num_partitions: The number of partitions to return.
+
+        Returns:
+            A list of ``num_partitions`` blocks of [k, v_1, ..., v_n] columns
+            sorted by k, where k is the groupby key and v_i is the partially
+            combined accumulator for the ith given aggregation.
+        """
+        accumulators = _accumulate_by_key(self.iter_rows(),
+                                          lambda r: r[key], aggs)
+        builders = [ArrowBlockBuilder() for _ in range(num_partitions)]
+        for k in sorted(accumulators):
+            builders[_hash_key(k) % num_partitions].add(
+                self._combined_row(key, k, aggs, accumulators[k]))
+        return [builder.build() for builder in builders]
+
+    @staticmethod
+    def _combined_row(key: GroupKeyT, k: Any, aggs: Tuple[AggregateFn],
+                      accumulators: List[Any]) -> dict:
+        row = {}
+        if key is not None:
+            row[key] = k
+
+        count = collections.defaultdict(int)
+        for agg, accumulator in zip(aggs, accumulators):
+            name = agg.name
+            # Check for conflicts with existing aggregation name.
+            if count[name] > 0:
+                name = ArrowBlockAccessor._munge_conflict(name, count[name])
+            count[name] += 1
+            row[name] = accumulator
+        return row
+
     @staticmethod
     def _munge_conflict(name, count):
         return f"{name}_{count+1}"
@@ -425,6 +436,94 @@ class ArrowBlockAccessor(BlockAccessor):
             ret = ret.take(indices)
         return ret, ArrowBlockAccessor(ret).get_metadata(None)
 
+    @staticmethod
+    def iter_merge_sorted_blocks(
+            blocks: List[Block[T]], key: SortKeyT, _descending: bool,
+            max_block_size: int) -> Iterator[Block[T]]:
+        """Merge sorted blocks in bounded-size chunks.
+
+        Each step slices a chunk of rows off the front of every input and
+        computes a bound: the smallest (or largest, if descending) last key
+        among the chunks of inputs that have more rows left. All chunk rows
+        on the near side of the bound can't be preceded by any unconsumed row,
+        so they are sorted together and emitted.
+
+        Args:
+            blocks: A list of blocks sorted by the given key.
+            key: The list of (column, order) pairs the blocks are sorted by.
+            max_block_size: The approximate max size in bytes of each output
+                block.
+
+        Returns:
+            An iterator over the merged blocks, in sorted order.
+        """
+        import pyarrow.compute as pac
+
+        blocks = [b for b in blocks if b.num_rows > 0]
+        if len(blocks) == 0:
+            return
+
+        col, order = key[0]
+        descending = order == "descending"
+        # Rows that tie with the bound on the first column may still need to
+        # be ordered by later columns, so exclude them for multi-column keys.
+        strict = len(key) > 1
+        offsets = [0] * len(blocks)
+        # Size the chunks so that a merge step is about one output block.
+        chunk_rows = [
+            max(1, int(max_block_size / len(blocks) / (b.nbytes / b.num_rows)))
+            for b in blocks
+        ]
+        builder = ArrowBlockBuilder()
+        while True:
+            active = [
+                i for i, b in enumerate(blocks) if offsets[i] < b.num_rows
+            ]
+            if not active:
+                break
+            chunks = {
+                i: blocks[i].slice(offsets[i], chunk_rows[i])
+                for i in active
+            }
+            keys = {i: chunks[i].column(col).to_numpy() for i in active}
+            limited = [
+                i for i in active
+                if offsets[i] + chunks[i].num_rows < blocks[i].num_rows
+            ]
+            if limited:
+                last_keys = [keys[i][-1] for i in limited]
+                bound = max(last_keys) if descending else min(last_keys)
+                takes = {}
+                for i in active:
+                    if descending:
+                        mask = keys[i] > bound if strict else keys[i] >= bound
+                    else:
+                        mask = keys[i] < bound if strict else keys[i] <= bound
+                    # Since the chunk is sorted, the matching rows are a
+                    # prefix of the chunk.
+                    takes[i] = int(np.count_nonzero(mask))
+                if not any(takes.values()):
+                    # All chunk rows tie with the bound, so grow the chunks
+                    # until they reach a different key or the end of input.
+                    for i in limited:
+                        chunk_rows[i] *= 2
+                    continue
+            else:
+                takes = {i: chunks[i].num_rows for i in active}
+
+            merged = pyarrow.concat_tables(
+                [chunks[i].slice(0, takes[i]) for i in active if takes[i]],
+                promote=True)
+            merged = merged.take(pac.sort_indices(merged, sort_keys=key))
+            for i in active:
+                offsets[i] += takes[i]
+            builder.add_block(merged)
+            if builder.get_estimated_memory_usage() >= max_block_size:
+                yield builder.build()
+                builder = ArrowBlockBuilder()
+        if builder.num_rows() > 0:
+            yield builder.build()
+
     @staticmethod
     def aggregate_combined_blocks(
             blocks: List[Block[ArrowRow]], key: GroupKeyT,
@@ -512,6 +611,55 @@ class ArrowBlockAccessor(BlockAccessor):
         return ret, ArrowBlockAccessor(ret).get_metadata(None)
 
 
+def _find_partition_indices(table: "pyarrow.Table", boundaries: List[T],
+                            key: SortKeyT) -> np.ndarray:
+    """Find the partition offsets of a table sorted by the given key.
+
+    Args:
+        table: A table sorted by ``key``.
+        boundaries: The partition boundaries, in the sort order of ``key``.
+            These are scalars for a single sort column, or tuples with one
+            value per sort column otherwise.
+        key: The list of (column, order) pairs the table is sorted by.
+
+    Returns:
+        For each boundary, the number of rows that sort strictly before it.
+    """
+    if len(key) == 1:
+        col, order = key[0]
+        values = table.column(col).to_numpy()
+        if order == "descending":
+            # Count the items greater than each boundary by searching the
+            # ascending view of the values.
+            return len(values) - np.searchsorted(
+                values[::-1], boundaries, side="right")
+        return np.searchsorted(values, boundaries, side="left")
+
+    # For multi-column keys (possibly of mixed order), sort the boundaries
+    # together with the rows, placing each boundary before the rows equal to
+    # it. The number of rows preceding the ith boundary is then its position
+    # in the merged order minus i.
+    import pyarrow.compute as pac
+
+    names = [col for col, _ in key]
+    num_boundaries = len(boundaries)
+    marker = "__partition_marker"
+    boundary_table = pyarrow.Table.from_arrays(
+        [
+            pyarrow.array([b[i] for b in boundaries],
+                          type=table.schema.field(col).type)
+            for i, col in enumerate(names)
+        ] + [pyarrow.array(np.zeros(num_boundaries, dtype=np.int8))],
+        names=names + [marker])
+    row_table = table.select(names).append_column(
+        marker, pyarrow.array(np.ones(table.num_rows, dtype=np.int8)))
+    merged = pyarrow.concat_tables([boundary_table, row_table])
+    order = pac.sort_indices(
+        merged, sort_keys=list(key) + [(marker, "ascending")]).to_numpy()
+    positions = np.flatnonzero(order < num_boundaries)
+    return positions - np.arange(num_boundaries)
+
+
 def _copy_table(table: "pyarrow.Table") -> "pyarrow.Table":
     """Copy the provided Arrow table."""
     import pyarrow as pa
@@ -531,3 +679,26 @@ def _copy_table(table: "pyarrow.Table") -> "pyarrow.Table":
             arr = col.combine_chunks()
         new_cols.append(arr)
     return pa.Table.from_arrays(new_cols, schema=table.schema)
+
+
+def _column_to_numpy(column: "pyarrow.ChunkedArray") -> np.ndarray:
+    """Convert an Arrow column into an ndarray.
+
+    Columns of a single chunk are returned as zero-copy views over the Arrow
+    buffers where possible, which includes tensor columns. Columns of
+    multiple chunks are concatenated into a new ndarray.
+    """
+    from ray.data.extensions.tensor_extension import ArrowTensorType
+
+    if isinstance(column.type, ArrowTensorType):
+        if column.num_chunks == 1:
+            return column.chunk(0).to_numpy()
+        if column.num_chunks == 0:
+            dtype = column.type.storage_type.value_type.to_pandas_dtype()
+            return np.empty((0, ) + column.type.shape, dtype=dtype)
+        # Arrow can't concatenate extension arrays, so concatenate the
+        # tensors of each chunk instead.
+        return np.concatenate([chunk.to_numpy() for chunk in column.chunks])
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
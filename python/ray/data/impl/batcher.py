@@ -1,4 +1,5 @@
-from typing import Optional
+import collections
+from typing import Iterator, Optional
 
 from ray.data.block import Block, BlockAccessor
 from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
@@ -7,18 +8,21 @@ from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
 class Batcher:
     """Chunks blocks into batches.
 
-    Implementation Note: When there are multiple batches per block,
-    this batcher will slice off and return each batch and add the
-    remaining block back to the buffer instead of optimally slicing and
-    returning all batches from the block at once. This will result in
-    extra (and nested) block slicing. However, since slices are
-    zero-copy views, we sacrifice what should be a small performance
-    hit for better readability.
+    The batcher keeps a running count of the buffered rows and a cursor into
+    the head block of the buffer, so checking for a batch is O(1) and each
+    batch is sliced directly out of the buffered blocks. Batches that fall
+    within a single block are returned as zero-copy slices of that block; only
+    batches that span multiple blocks are copied into a new block.
     """
 
     def __init__(self, batch_size: Optional[int]):
         self._batch_size = batch_size
-        self._buffer = []
+        # Accessors for the buffered blocks, in order.
+        self._buffer = collections.deque()
+        # The number of rows of the head block that were already returned.
+        self._head_offset = 0
+        # The number of buffered rows that weren't yet returned.
+        self._num_rows = 0
 
     def add(self, block: Block):
         """Add a block to the block buffer.
@@ -26,55 +30,83 @@ class Batcher:
         Args:
             block: Block to add to the block buffer.
         """
-        self._buffer.append(block)
+        accessor = BlockAccessor.for_block(block)
+        self._buffer.append(accessor)
+        self._num_rows += accessor.num_rows()
 
     def has_batch(self) -> bool:
         """Whether this Batcher has any full batches.
         """
-        return self._buffer and (self._batch_size is None or sum(
-            BlockAccessor.for_block(b).num_rows()
-            for b in self._buffer) >= self._batch_size)
+        if self._batch_size is None:
+            return len(self._buffer) > 0
+        return self._num_rows >= self._batch_size
 
     def has_any(self) -> bool:
         """Whether this Batcher has any data.
         """
-        return any(
-            BlockAccessor.for_block(b).num_rows() > 0 for b in self._buffer)
+        return self._num_rows > 0
 
     def next_batch(self) -> Block:
         """Get the next batch from the block buffer.
 
+        This returns a full batch if available, and otherwise the remaining
+        rows of the buffer.
+
         Returns:
             A batch represented as a Block.
         """
         # If no batch size, short-circuit.
         if self._batch_size is None:
             assert len(self._buffer) == 1
-            block = self._buffer[0]
-            self._buffer = []
-            return block
+            accessor = self._buffer.popleft()
+            self._num_rows = 0
+            return accessor.to_block()
+
+        needed = min(self._batch_size, self._num_rows)
+        head = self._buffer[0]
+        head_start = self._head_offset
+        head_remaining = head.num_rows() - head_start
+        if head_remaining >= needed:
+            # Fast path: the batch is a zero-copy slice of the head block.
+            self._advance(needed)
+            return self._slice(head, head_start, head_start + needed)
+
         output = DelegatingArrowBlockBuilder()
-        leftover = []
-        needed = self._batch_size
-        for block in self._buffer:
-            accessor = BlockAccessor.for_block(block)
-            if needed <= 0:
-                # We already have a full batch, so add this block to
-                # the leftovers.
-                leftover.append(block)
-            elif accessor.num_rows() <= needed:
-                # We need this entire block to fill out a batch.
-                output.add_block(block)
-                needed -= accessor.num_rows()
-            else:
-                # We only need part of the block to fill out a batch.
-                output.add_block(accessor.slice(0, needed, copy=False))
-                # Add the rest of the block to the leftovers.
-                leftover.append(
-                    accessor.slice(needed, accessor.num_rows(), copy=False))
-                needed = 0
-
-        # Move the leftovers into the block buffer so they're the first
-        # blocks consumed on the next batch extraction.
-        self._buffer = leftover
+        while needed > 0:
+            head = self._buffer[0]
+            head_start = self._head_offset
+            count = min(needed, head.num_rows() - head_start)
+            if count > 0:
+                output.add_block(
+                    self._slice(head, head_start, head_start + count))
+            self._advance(count)
+            needed -= count
         return output.build()
+
+    def iter_batches(self) -> Iterator[Block]:
+        """Iterate over all full batches in the block buffer.
+
+        Returns:
+            An iterator over the batches, each represented as a Block.
+        """
+        while self.has_batch():
+            yield self.next_batch()
+
+    def _advance(self, count: int) -> None:
+        """Advance the cursor by the given number of rows of the head block.
+
+        Fully consumed blocks are dropped from the buffer.
+        """
+        self._head_offset += count
+        self._num_rows -= count
+        while (self._buffer
+               and self._head_offset == self._buffer[0].num_rows()):
+            self._buffer.popleft()
+            self._head_offset = 0
+
+    @staticmethod
+    def _slice(accessor: BlockAccessor, start: int, end: int) -> Block:
+        if start == 0 and end == accessor.num_rows():
+            # Return the whole block as-is.
+            return accessor.to_block()
+        return accessor.slice(start, end, copy=False)
@@ -0,0 +1,400 @@
+"""
+Caching of materialized Datasets, for ``Dataset.cache()``.
+
+Cached datasets are keyed by their lineage: the datasource and arguments they
+were read with, and the functions of the transforms applied since. The memory
+cache pins the blocks of cached datasets in the object store, for reuse within
+the driver process. The disk cache writes the blocks to a directory per
+dataset on the local disk of the driver node, in the Arrow IPC file format for
+Arrow blocks, so that later jobs on the node can read them back instead of
+recomputing the dataset. Lineage keys are hashed from the code and state of
+the lineage rather than from its pickles, which differ across processes, so
+that they're stable across jobs.
+
+Both caches evict the least recently used datasets once they exceed their
+size budget in the ``DatasetContext``.
+"""
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import sys
+import threading
+import types
+import uuid
+from typing import Any, List, Optional, Set, Tuple
+
+import ray
+from ray.data.block import Block, BlockAccessor, BlockMetadata, \
+    BlockExecStats
+from ray.data.context import DatasetContext
+from ray.data.impl.block_list import BlockList
+from ray.data.impl.progress_bar import ProgressBar
+from ray.data.impl.remote_fn import cached_remote_fn
+from ray.data.impl.stats import DatasetStats
+
+logger = logging.getLogger(__name__)
+
+# The fraction of the cluster's object store memory that the memory cache
+# pins by default.
+MEMORY_CACHE_OBJECT_STORE_MEMORY_FRACTION = 0.25
+
+# The name of the file that holds the block metadata of a disk cache entry.
+# The entry is complete once this file exists, and its mtime is the last
+# access time of the entry.
+_METADATA_FILE = "metadata.pkl"
+
+# Objects larger than this are considered too expensive to hash into lineage
+# keys, which makes their datasets uncacheable.
+_MAX_HASHED_OBJECT_BYTES = 1024 * 1024
+
+# Lineage key -> (blocks, stats, size in bytes), in LRU order.
+_memory_cache: ("collections.OrderedDict["
+                "str, Tuple[BlockList, DatasetStats, int]]") = (
+                    collections.OrderedDict())
+_memory_cache_lock = threading.Lock()
+
+
+def clear_memory_cache() -> None:
+    """Drop all datasets from the memory cache."""
+    with _memory_cache_lock:
+        _memory_cache.clear()
+
+
+# The cached blocks belong to the Ray session they were created in, so clear
+# the memory cache after Ray reinits.
+ray.worker._post_init_hooks.append(clear_memory_cache)
+
+
+class Lineage:
+    """The items that a dataset was read and transformed with.
+
+    The items are only hashed into the lineage key once it's used by
+    ``Dataset.cache()``, since hashing functions and their globals can be
+    expensive.
+    """
+
+    def __init__(self, items: Tuple[Any, ...]):
+        self.items = items
+        self._key: Optional[str] = None
+        self._hashed = False
+
+    def extend(self, items: Tuple[Any, ...]) -> "Lineage":
+        """Return the lineage of a transform of this dataset."""
+        return Lineage(self.items + items)
+
+    @property
+    def key(self) -> Optional[str]:
+        """The lineage key, or None if the items can't be hashed."""
+        if not self._hashed:
+            self._key = lineage_token(*self.items)
+            self._hashed = True
+        return self._key
+
+
+def lineage_token(*args: Any) -> Optional[str]:
+    """Hash the given items of a dataset's lineage into a token.
+
+    Functions and classes defined in ``__main__`` or locally are hashed by
+    their bytecode, constants, defaults, closures and referenced globals,
+    other functions and classes by their qualified name, and other objects by
+    the state they pickle, recursively. Unlike pickles, this is the same in
+    every process, so tokens are stable across jobs. Bytecode differs across
+    Python versions, so tokens do too, which makes the disk cache miss rather
+    than share entries between interpreters.
+
+    Objects larger than _MAX_HASHED_OBJECT_BYTES, datasets and object refs
+    aren't hashed, since that would be expensive, execute the datasets, or
+    depend on the session.
+
+    Returns:
+        The token, or None if the items can't be represented.
+    """
+    try:
+        state = _stable_state(args, set())
+    except Exception:
+        return None
+    return hashlib.sha256(repr(state).encode()).hexdigest()
+
+
+def _stable_state(obj: Any, ancestors: Set[int]) -> Any:
+    """Convert obj into a tree of builtin values with a deterministic repr."""
+    if obj is None or isinstance(obj, (bool, int, float, complex)):
+        return obj
+    if sys.getsizeof(obj) > _MAX_HASHED_OBJECT_BYTES:
+        raise ValueError("Object too large to hash: {}".format(type(obj)))
+    if isinstance(obj, (str, bytes)):
+        return obj
+    if isinstance(obj, types.ModuleType):
+        return ("module", obj.__name__)
+    if isinstance(obj, (types.BuiltinFunctionType, type)) and \
+            not _defined_by_value(obj):
+        return ("global", getattr(obj, "__module__", None), obj.__qualname__,
+                _stable_state(getattr(obj, "__self__", None), ancestors)
+                if not isinstance(obj, type) else None)
+    if isinstance(obj, types.FunctionType) and not _defined_by_value(obj):
+        return ("global", obj.__module__, obj.__qualname__)
+    if id(obj) in ancestors:
+        # A reference cycle, e.g., a recursive function.
+        return ("cycle", )
+    ancestors.add(id(obj))
+    try:
+        return _stable_state_of_container(obj, ancestors)
+    finally:
+        ancestors.remove(id(obj))
+
+
+def _stable_state_of_container(obj: Any, ancestors: Set[int]) -> Any:
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,
+                [_stable_state(item, ancestors) for item in obj])
+    if isinstance(obj, (set, frozenset)):
+        return (type(obj).__name__,
+                sorted(repr(_stable_state(item, ancestors)) for item in obj))
+    if isinstance(obj, dict):
+        return (type(obj).__name__,
+                sorted((repr(_stable_state(k, ancestors)),
+                        _stable_state(v, ancestors)) for k, v in obj.items()))
+    if isinstance(obj, type):
+        # A class defined by value, whose methods may have changed.
+        return ("class", obj.__qualname__,
+                [_stable_state(base, ancestors) for base in obj.__bases__],
+                _stable_state({
+                    k: v
+                    for k, v in vars(obj).items()
+                    if k not in ("__dict__", "__weakref__")
+                }, ancestors))
+    if isinstance(obj, types.FunctionType):
+        code = obj.__code__
+        referenced = {
+            name: obj.__globals__[name]
+            for name in _code_names(code) if name in obj.__globals__
+        }
+        closure = [cell.cell_contents for cell in obj.__closure__ or ()]
+        return ("function", obj.__qualname__,
+                _stable_state(code, ancestors),
+                _stable_state(obj.__defaults__, ancestors),
+                _stable_state(obj.__kwdefaults__, ancestors),
+                _stable_state(closure, ancestors),
+                _stable_state(referenced, ancestors))
+    if isinstance(obj, types.CodeType):
+        return ("code", obj.co_code, obj.co_names,
+                _stable_state(obj.co_consts, ancestors))
+    if isinstance(obj, (staticmethod, classmethod)):
+        return (type(obj).__name__, _stable_state(obj.__func__, ancestors))
+    if isinstance(obj, property):
+        return ("property",
+                _stable_state([obj.fget, obj.fset, obj.fdel], ancestors))
+    if isinstance(obj, types.MethodType):
+        return ("method", _stable_state(obj.__self__, ancestors),
+                _stable_state(obj.__func__, ancestors))
+    # Delayed import since the plan depends on this module.
+    from ray.data.impl.plan import ExecutionPlan
+    if isinstance(obj, (ExecutionPlan, ray.ObjectRef)):
+        raise ValueError("Can't hash the contents of {}".format(type(obj)))
+    reduced = obj.__reduce_ex__(4)
+    if isinstance(reduced, str):
+        # A global singleton.
+        return ("global", type(obj).__module__, reduced)
+    reduced = list(reduced)
+    # The list and dict items, if any, are returned as iterators.
+    for i in range(3, len(reduced)):
+        if reduced[i] is not None:
+            reduced[i] = list(reduced[i])
+    return ("object", _stable_state(reduced, ancestors))
+
+
+def _defined_by_value(obj: Any) -> bool:
+    # Like cloudpickle, functions and classes that can't be imported are
+    # represented by their code rather than by reference.
+    return getattr(obj, "__module__", None) == "__main__" or \
+        "<locals>" in getattr(obj, "__qualname__", "") or \
+        getattr(obj, "__name__", None) == "<lambda>"
+
+
+def _code_names(code: types.CodeType) -> List[str]:
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_code_names(const))
+    return names
+
+
+def get_cached(key: str) -> Optional[Tuple[BlockList, DatasetStats]]:
+    """Get the blocks of a dataset from the memory cache, or None."""
+    with _memory_cache_lock:
+        if key not in _memory_cache:
+            return None
+        _memory_cache.move_to_end(key)
+        blocks, stats, _ = _memory_cache[key]
+        return blocks.copy(), stats
+
+
+def put_cached(key: str, blocks: BlockList, stats: DatasetStats) -> None:
+    """Add the blocks of a dataset to the memory cache."""
+    context = DatasetContext.get_current()
+    limit = context.cache_max_memory_bytes
+    if limit is None:
+        limit = int(
+            ray.cluster_resources().get("object_store_memory", 0) *
+            MEMORY_CACHE_OBJECT_STORE_MEMORY_FRACTION)
+    size = sum(m.size_bytes or 0 for m in blocks.get_metadata())
+    if size > limit:
+        logger.warning(
+            "Not caching the dataset in memory, since its size of %d bytes "
+            "exceeds the memory cache limit of %d bytes.", size, limit)
+        return
+    with _memory_cache_lock:
+        _memory_cache[key] = (blocks.copy(), stats, size)
+        _memory_cache.move_to_end(key)
+        total = sum(s for _, _, s in _memory_cache.values())
+        while total > limit:
+            _, (_, _, evicted) = _memory_cache.popitem(last=False)
+            total -= evicted
+
+
+def read_disk_cache(key: str) -> Optional[Tuple[BlockList, DatasetStats]]:
+    """Read the blocks of a dataset from the disk cache, or return None."""
+    context = DatasetContext.get_current()
+    path = os.path.join(context.cache_dir, key)
+    metadata_path = os.path.join(path, _METADATA_FILE)
+    try:
+        with open(metadata_path, "rb") as f:
+            entries: List[Tuple[str, BlockMetadata]] = pickle.load(f)
+        # Mark the entry as recently used.
+        os.utime(metadata_path)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+    read_block = cached_remote_fn(_read_cached_block).options(
+        num_returns=2, resources=_local_node_resources())
+    refs = [
+        read_block.remote(os.path.join(path, filename))
+        for filename, _ in entries
+    ]
+    read_bar = ProgressBar("Cache Read", len(refs))
+    try:
+        metadata = read_bar.fetch_until_complete([m for _, m in refs])
+    except ray.exceptions.RayTaskError:
+        # The entry was evicted by another job while being read.
+        logger.warning("Failed to read dataset %s from the disk cache.", key)
+        return None
+    finally:
+        read_bar.close()
+    blocks = BlockList([b for b, _ in refs], metadata)
+    return blocks, DatasetStats(stages={"cache_read": metadata})
+
+
+def write_disk_cache(key: str, blocks: BlockList) -> None:
+    """Write the blocks of a dataset to the disk cache.
+
+    The blocks are written to a temporary directory which is renamed into
+    place once complete, so that concurrent jobs never read partial entries.
+    The least recently used entries are then evicted to fit the cache into
+    its budget.
+    """
+    context = DatasetContext.get_current()
+    os.makedirs(context.cache_dir, exist_ok=True)
+    path = os.path.join(context.cache_dir, key)
+    tmp_path = "{}.tmp-{}".format(path, uuid.uuid4().hex)
+    os.makedirs(tmp_path)
+
+    write_block = cached_remote_fn(_write_cached_block).options(
+        resources=_local_node_resources())
+    blocks_with_metadata = list(blocks.iter_blocks_with_metadata())
+    refs = [
+        write_block.remote(block, tmp_path, i)
+        for i, (block, _) in enumerate(blocks_with_metadata)
+    ]
+    write_bar = ProgressBar("Cache Write", len(refs))
+    try:
+        filenames = write_bar.fetch_until_complete(refs)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    finally:
+        write_bar.close()
+
+    entries = []
+    for filename, (_, meta) in zip(filenames, blocks_with_metadata):
+        entries.append((filename,
+                        BlockMetadata(
+                            num_rows=meta.num_rows,
+                            size_bytes=meta.size_bytes,
+                            schema=meta.schema,
+                            input_files=meta.input_files)))
+    with open(os.path.join(tmp_path, _METADATA_FILE), "wb") as f:
+        pickle.dump(entries, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another job cached the same dataset concurrently.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    _evict_disk_cache(context.cache_dir, context.cache_max_disk_bytes, key)
+
+
+def _evict_disk_cache(cache_dir: str, max_bytes: int, new_key: str) -> None:
+    """Evict the least recently used entries until the cache fits max_bytes.
+
+    The new entry is only evicted if it alone doesn't fit into the cache.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            mtime = os.path.getmtime(os.path.join(path, _METADATA_FILE))
+            size = sum(
+                os.path.getsize(os.path.join(path, f))
+                for f in os.listdir(path))
+        except FileNotFoundError:
+            # A partially written or concurrently evicted entry.
+            continue
+        entries.append((name != new_key, mtime, size, path))
+    # Evict the other entries first, least recently used first.
+    entries.sort(reverse=True)
+    total = sum(size for _, _, size, _ in entries)
+    while entries and total > max_bytes:
+        is_other, _, size, path = entries.pop()
+        if not is_other:
+            logger.warning(
+                "Not caching the dataset on disk, since its size of %d bytes "
+                "exceeds the disk cache limit of %d bytes.", size, max_bytes)
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _local_node_resources() -> dict:
+    # Cache tasks run on the driver node, whose local disk holds the cache.
+    return {"node:{}".format(ray.util.get_node_ip_address()): 0.001}
+
+
+def _write_cached_block(block: Block, path: str, index: int) -> str:
+    import pyarrow as pa
+
+    if isinstance(block, pa.Table):
+        filename = "block-{:06}.arrow".format(index)
+        with pa.OSFile(os.path.join(path, filename), "wb") as f:
+            with pa.ipc.new_file(f, block.schema) as writer:
+                writer.write_table(block)
+    else:
+        filename = "block-{:06}.pkl".format(index)
+        with open(os.path.join(path, filename), "wb") as f:
+            pickle.dump(block, f)
+    return filename
+
+
+def _read_cached_block(path: str) -> Tuple[Block, BlockMetadata]:
+    stats = BlockExecStats.builder()
+    if path.endswith(".arrow"):
+        import pyarrow as pa
+
+        # Reading from a memory map avoids buffering the file, but the table
+        # is still copied into the object store when the task returns it.
+        block = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    else:
+        with open(path, "rb") as f:
+            block = pickle.load(f)
+    return block, BlockAccessor.for_block(block).get_metadata(
+        input_files=None, exec_stats=stats.build())
@@ -1,10 +1,19 @@
-from typing import TypeVar, Any, Union, Callable, List
+import logging
+import time
+from typing import TypeVar, Any, Union, Callable, Iterable, List, Dict, \
+    Optional, Tuple
 
 import ray
-from ray.data.block import Block, BlockAccessor, BlockMetadata
+from ray.data.block import Block, BlockAccessor, BlockMetadata, \
+    BlockExecStats, BlockPartition
+from ray.data.context import DatasetContext
+from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
 from ray.data.impl.block_list import BlockList
 from ray.data.impl.progress_bar import ProgressBar
 from ray.data.impl.remote_fn import cached_remote_fn
+from ray.data.impl.util import _get_locality_resources
+from ray.types import ObjectRef
+from ray.util.annotations import PublicAPI
 
 T = TypeVar("T")
 U = TypeVar("U")
@@ -12,24 +21,60 @@ U = TypeVar("U")
 # A class type that implements __call__.
 CallableClass = type
 
+logger = logging.getLogger(__name__)
+
 
 class ComputeStrategy:
     def apply(self, fn: Any, blocks: BlockList) -> BlockList:
         raise NotImplementedError
 
 
-def _map_block(block: Block, fn: Any,
-               input_files: List[str]) -> (Block, BlockMetadata):
-    new_block = fn(block)
+def _map_block_split(block: Block, fn: Any, input_files: List[str],
+                     context: DatasetContext) -> BlockPartition:
+    DatasetContext._set_current(context)
+    stats = BlockExecStats.builder()
+    stats.add_input(block)
+    partition: BlockPartition = []
+    for new_block in fn(block):
+        accessor = BlockAccessor.for_block(new_block)
+        new_meta = BlockMetadata(
+            num_rows=accessor.num_rows(),
+            size_bytes=accessor.size_bytes(),
+            schema=accessor.schema(),
+            input_files=input_files,
+            exec_stats=stats.build())
+        partition.append((ray.put(new_block, _owner=context.block_owner),
+                          new_meta))
+        # Attribute the time until the next output block to that block.
+        stats = BlockExecStats.builder()
+    return partition
+
+
+def _map_block_nosplit(block: Block, fn: Any,
+                       input_files: List[str]) -> (Block, BlockMetadata):
+    stats = BlockExecStats.builder()
+    stats.add_input(block)
+    new_block = _concat_blocks(fn(block))
     accessor = BlockAccessor.for_block(new_block)
     new_meta = BlockMetadata(
         num_rows=accessor.num_rows(),
         size_bytes=accessor.size_bytes(),
         schema=accessor.schema(),
-        input_files=input_files)
+        input_files=input_files,
+        exec_stats=stats.build())
     return new_block, new_meta
 
 
+def _concat_blocks(blocks: Iterable[Block]) -> Block:
+    blocks = list(blocks)
+    if len(blocks) == 1:
+        return blocks[0]
+    builder = DelegatingArrowBlockBuilder()
+    for block in blocks:
+        builder.add_block(block)
+    return builder.build()
+
+
 class TaskPool(ComputeStrategy):
     def apply(self, fn: Any, remote_args: dict,
               blocks: BlockList) -> BlockList:
@@ -40,26 +85,49 @@ class TaskPool(ComputeStrategy):
         blocks = list(blocks.iter_blocks_with_metadata())
         map_bar = ProgressBar("Map Progress", total=len(blocks))
 
+        context = DatasetContext.get_current()
         kwargs = remote_args.copy()
-        kwargs["num_returns"] = 2
+        task_resources = kwargs.pop("resources", None) or {}
+        if context.block_splitting_enabled:
+            # Each task returns a partition of its output blocks.
+            map_block = cached_remote_fn(_map_block_split)
+            extra_args = [context]
+        else:
+            map_block = cached_remote_fn(_map_block_nosplit)
+            extra_args = []
+            kwargs["num_returns"] = 2
+
+        if context.locality_aware_scheduling:
+            # Schedule each task on a node that holds its input block.
+            locality_resources = _get_locality_resources(
+                [b for b, _ in blocks], remote_args)
+        else:
+            locality_resources = [{} for _ in blocks]
 
-        map_block = cached_remote_fn(_map_block)
         refs = [
-            map_block.options(**kwargs).remote(b, fn, m.input_files)
-            for b, m in blocks
+            map_block.options(
+                **kwargs,
+                resources={
+                    **task_resources,
+                    **resources
+                }).remote(b, fn, m.input_files, *extra_args)
+            for (b, m), resources in zip(blocks, locality_resources)
         ]
-        new_blocks, new_metadata = zip(*refs)
+        if context.block_splitting_enabled:
+            wait_refs = refs
+        else:
+            new_blocks, wait_refs = zip(*refs)
+            wait_refs = list(wait_refs)
 
-        new_metadata = list(new_metadata)
         try:
-            new_metadata = map_bar.fetch_until_complete(new_metadata)
+            results = map_bar.fetch_until_complete(wait_refs)
         except (ray.exceptions.RayTaskError, KeyboardInterrupt) as e:
             # One or more mapper tasks failed, or we received a SIGINT signal
             # while waiting; either way, we cancel all map tasks.
-            for ref in new_metadata:
+            for ref in wait_refs:
                 ray.cancel(ref)
             # Wait until all tasks have failed or been cancelled.
-            for ref in new_metadata:
+            for ref in wait_refs:
                 try:
                     ray.get(ref)
                 except (ray.exceptions.RayTaskError,
@@ -67,24 +135,104 @@ class TaskPool(ComputeStrategy):
                     pass
             # Reraise the original task failure exception.
             raise e from None
-        return BlockList(list(new_blocks), list(new_metadata))
 
+        if context.block_splitting_enabled:
+            return _flatten_partitions(results)
+        return BlockList(list(new_blocks), results)
+
+
+def _flatten_partitions(partitions: List[BlockPartition]) -> BlockList:
+    new_blocks, new_metadata = [], []
+    for partition in partitions:
+        for block, metadata in partition:
+            new_blocks.append(block)
+            new_metadata.append(metadata)
+    return BlockList(new_blocks, new_metadata)
+
+
+class ActorPoolStats:
+    """Utilization stats of an ActorPoolStrategy execution."""
 
-class ActorPool(ComputeStrategy):
     def __init__(self):
-        self.workers = []
+        # The number of actors started.
+        self.num_actors = 0
+        # The maximum number of actors alive at once.
+        self.peak_actors = 0
+        # The number of blocks processed by each actor, in start order.
+        self.blocks_per_actor: List[int] = []
+        # The total seconds that actors were alive after starting up.
+        self.actor_seconds = 0.0
+        # The total seconds that actors had at least one task in flight.
+        self.busy_seconds = 0.0
+
+    def utilization(self) -> float:
+        """The fraction of the actor lifetime spent processing blocks."""
+        if self.actor_seconds == 0:
+            return 0.0
+        return min(1.0, self.busy_seconds / self.actor_seconds)
+
+    def __str__(self) -> str:
+        return ("ActorPoolStats(num_actors={}, peak_actors={}, "
+                "utilization={:.1%}, blocks_per_actor={})".format(
+                    self.num_actors, self.peak_actors, self.utilization(),
+                    self.blocks_per_actor))
+
+
+@PublicAPI(stability="beta")
+class ActorPoolStrategy(ComputeStrategy):
+    """Apply the transform on an autoscaling pool of Ray actors.
+
+    The pool starts with ``min_size`` actors, and adds actors while there is a
+    backlog of blocks and all started actors are busy, up to ``max_size``.
+    Each actor is sent up to ``max_tasks_in_flight_per_actor`` blocks at once,
+    so that the next block is fetched while the current one is processed.
+    Actors are released as soon as they go idle and no blocks are left to
+    process. Utilization stats of the last execution are kept in ``stats``.
+
+    Examples:
+        >>> # Run the transform on 2 to 8 GPU actors.
+        >>> ds.map_batches(
+        ...     CachedModel,
+        ...     compute=ActorPoolStrategy(2, 8),
+        ...     num_gpus=1)
+    """
 
-    def __del__(self):
-        for w in self.workers:
-            w.__ray_terminate__.remote()
+    def __init__(self,
+                 min_size: int = 1,
+                 max_size: Optional[int] = None,
+                 max_tasks_in_flight_per_actor: int = 2):
+        """Construct an ActorPoolStrategy.
+
+        Args:
+            min_size: The minimum number of actors to keep in the pool.
+            max_size: The maximum number of actors in the pool, or None for
+                no limit.
+            max_tasks_in_flight_per_actor: The maximum number of blocks that
+                are queued on each actor at once.
+        """
+        if min_size < 1:
+            raise ValueError("min_size must be > 0", min_size)
+        if max_size is not None and min_size > max_size:
+            raise ValueError("min_size must be <= max_size", min_size,
+                             max_size)
+        if max_tasks_in_flight_per_actor < 1:
+            raise ValueError("max_tasks_in_flight_per_actor must be > 0",
+                             max_tasks_in_flight_per_actor)
+        self.min_size = min_size
+        self.max_size = max_size or float("inf")
+        self.max_tasks_in_flight_per_actor = max_tasks_in_flight_per_actor
+        self.stats: Optional[ActorPoolStats] = None
 
     def apply(self, fn: Any, remote_args: dict,
               blocks: BlockList) -> BlockList:
+        # Handle empty datasets.
+        if blocks.initial_num_blocks() == 0:
+            return blocks
 
         blocks_in = list(blocks.iter_blocks_with_metadata())
         orig_num_blocks = len(blocks_in)
-        blocks_out = []
         map_bar = ProgressBar("Map Progress", total=orig_num_blocks)
+        context = DatasetContext.get_current()
 
         class BlockWorker:
             def ready(self):
@@ -93,61 +241,138 @@ class ActorPool(ComputeStrategy):
             @ray.method(num_returns=2)
             def process_block(self, block: Block, input_files: List[str]
                               ) -> (Block, BlockMetadata):
-                new_block = fn(block)
-                accessor = BlockAccessor.for_block(new_block)
-                new_metadata = BlockMetadata(
-                    num_rows=accessor.num_rows(),
-                    size_bytes=accessor.size_bytes(),
-                    schema=accessor.schema(),
-                    input_files=input_files)
-                return new_block, new_metadata
+                return _map_block_nosplit(block, fn, input_files)
+
+            def process_block_split(self, block: Block,
+                                    input_files: List[str]) -> BlockPartition:
+                return _map_block_split(block, fn, input_files, context)
 
         if not remote_args:
             remote_args["num_cpus"] = 1
 
         BlockWorker = ray.remote(**remote_args)(BlockWorker)
 
-        self.workers = [BlockWorker.remote()]
-        metadata_mapping = {}
-        tasks = {w.ready.remote(): w for w in self.workers}
-        ready_workers = set()
-
-        while len(blocks_out) < orig_num_blocks:
-            ready, _ = ray.wait(
-                list(tasks), timeout=0.01, num_returns=1, fetch_local=False)
-            if not ready:
-                if len(ready_workers) / len(self.workers) > 0.8:
-                    w = BlockWorker.remote()
-                    self.workers.append(w)
-                    tasks[w.ready.remote()] = w
-                    map_bar.set_description(
-                        "Map Progress ({} actors {} pending)".format(
-                            len(ready_workers),
-                            len(self.workers) - len(ready_workers)))
-                continue
-
-            [obj_id] = ready
-            worker = tasks[obj_id]
-            del tasks[obj_id]
-
-            # Process task result.
-            if worker in ready_workers:
-                blocks_out.append(obj_id)
+        stats = ActorPoolStats()
+        self.stats = stats
+        # Actor -> its index in the stats.
+        actor_ids: Dict[Any, int] = {}
+        # Pending ready() refs of actors that are starting up.
+        pending_actors: Dict[ObjectRef, Any] = {}
+        # Ready actor -> the number of its tasks in flight.
+        in_flight: Dict[Any, int] = {}
+        # Ready actor -> the time it became ready.
+        ready_since: Dict[Any, float] = {}
+        # Ready actor -> the time its current busy or idle period started.
+        period_start: Dict[Any, float] = {}
+        # Block ref -> (actor, index of the block).
+        tasks: Dict[ObjectRef, Tuple[Any, int]] = {}
+        new_blocks = [None] * orig_num_blocks
+        new_metadata = [None] * orig_num_blocks
+        next_block = 0
+        num_done = 0
+
+        def start_actor():
+            actor = BlockWorker.remote()
+            actor_ids[actor] = stats.num_actors
+            stats.num_actors += 1
+            stats.blocks_per_actor.append(0)
+            pending_actors[actor.ready.remote()] = actor
+            stats.peak_actors = max(stats.peak_actors,
+                                    len(pending_actors) + len(in_flight))
+
+        def end_period(actor, now):
+            if in_flight[actor] > 0:
+                stats.busy_seconds += now - period_start[actor]
+            period_start[actor] = now
+
+        def release_actor(actor, now):
+            end_period(actor, now)
+            del in_flight[actor]
+            del period_start[actor]
+            actor.__ray_terminate__.remote()
+
+        for _ in range(min(self.min_size, orig_num_blocks)):
+            start_actor()
+
+        try:
+            while num_done < orig_num_blocks:
+                now = time.time()
+                # Queue blocks on the ready actors, least loaded first.
+                for actor in sorted(in_flight, key=in_flight.get):
+                    while (next_block < orig_num_blocks and in_flight[actor] <
+                           self.max_tasks_in_flight_per_actor):
+                        end_period(actor, now)
+                        block, meta = blocks_in[next_block]
+                        if context.block_splitting_enabled:
+                            # The partition holds the blocks and metadata.
+                            block_ref = actor.process_block_split.remote(
+                                block, meta.input_files)
+                            meta_ref = block_ref
+                        else:
+                            block_ref, meta_ref = actor.process_block.remote(
+                                block, meta.input_files)
+                        new_metadata[next_block] = meta_ref
+                        tasks[block_ref] = (actor, next_block)
+                        in_flight[actor] += 1
+                        next_block += 1
+
+                # Scale up while there is a backlog of blocks and no actor is
+                # starting up to take it.
+                backlog = orig_num_blocks - next_block
+                num_actors = len(pending_actors) + len(in_flight)
+                if (backlog > 0 and not pending_actors
+                        and num_actors < self.max_size):
+                    start_actor()
+
+                # Release idle actors once there are no blocks left to queue.
+                if next_block == orig_num_blocks:
+                    for actor in [a for a, n in in_flight.items() if n == 0]:
+                        stats.actor_seconds += now - ready_since.pop(actor)
+                        release_actor(actor, now)
+
+                ready, _ = ray.wait(
+                    list(tasks) + list(pending_actors),
+                    timeout=0.01,
+                    num_returns=1,
+                    fetch_local=False)
+                if not ready:
+                    continue
+
+                [ref] = ready
+                now = time.time()
+                if ref in pending_actors:
+                    actor = pending_actors.pop(ref)
+                    in_flight[actor] = 0
+                    period_start[actor] = now
+                    ready_since[actor] = now
+                    if next_block == orig_num_blocks:
+                        # No blocks are left for the actor.
+                        stats.actor_seconds += now - ready_since.pop(actor)
+                        release_actor(actor, now)
+                    continue
+
+                actor, i = tasks.pop(ref)
+                new_blocks[i] = ref
+                end_period(actor, now)
+                in_flight[actor] -= 1
+                stats.blocks_per_actor[actor_ids[actor]] += 1
+                num_done += 1
                 map_bar.update(1)
-            else:
-                ready_workers.add(worker)
 
-            # Schedule a new task.
-            if blocks_in:
-                block, meta = blocks_in.pop()
-                block_ref, meta_ref = worker.process_block.remote(
-                    block, meta.input_files)
-                metadata_mapping[block_ref] = meta_ref
-                tasks[block_ref] = worker
+            new_metadata = ray.get(new_metadata)
+        finally:
+            now = time.time()
+            for actor in list(in_flight):
+                stats.actor_seconds += now - ready_since.pop(actor)
+                release_actor(actor, now)
+            for actor in pending_actors.values():
+                actor.__ray_terminate__.remote()
+            map_bar.close()
 
-        new_metadata = ray.get([metadata_mapping[b] for b in blocks_out])
-        map_bar.close()
-        return BlockList(blocks_out, new_metadata)
+        logger.info("Actor pool stats: %s", stats)
+        if context.block_splitting_enabled:
+            return _flatten_partitions(new_metadata)
+        return BlockList(new_blocks, new_metadata)
 
 
 def cache_wrapper(fn: Union[CallableClass, Callable[[Any], Any]]
@@ -177,8 +402,9 @@ def get_compute(compute_spec: Union[str, ComputeStrategy]) -> ComputeStrategy:
     if not compute_spec or compute_spec == "tasks":
         return TaskPool()
     elif compute_spec == "actors":
-        return ActorPool()
+        return ActorPoolStrategy()
     elif isinstance(compute_spec, ComputeStrategy):
         return compute_spec
     else:
-        raise ValueError("compute must be one of [`tasks`, `actors`]")
+        raise ValueError("compute must be one of [`tasks`, `actors`, "
+                         "ActorPoolStrategy]")
@@ -127,6 +127,13 @@ class LazyBlockList(BlockList):
             assert self._block_partitions[i], self._block_partitions
         return self._block_partitions[i]
 
+    def _get_executed_metadata(self) -> List[BlockMetadata]:
+        """Get the final metadata of the blocks that were read so far."""
+        if self._block_partitions is None:
+            return []
+        partitions = ray.get([p for p in self._block_partitions if p])
+        return [m for partition in partitions for _, m in partition]
+
     def _num_computed(self) -> int:
         i = 0
         for b in self._block_partitions:
@@ -0,0 +1,90 @@
+from typing import Callable, Any, Optional
+
+from ray.data.block import Block
+from ray.data.context import DatasetContext
+from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
+
+
+class BlockOutputBuffer(object):
+    """Generates output blocks of a given size given a stream of inputs.
+
+    This class is used to turn a stream of items / blocks of arbitrary size
+    into a stream of blocks of ``target_max_block_size``. A new block is
+    emitted once the estimated memory usage of the buffered rows crosses the
+    target size, so an individual output block can exceed the target by at
+    most the size of the last item or block added to it.
+
+    Examples:
+        >>> # Yield a stream of output blocks.
+        >>> output = BlockOutputBuffer(udf, 500 * 1024 * 1024)
+        >>> for item in generator():
+        ...     output.add(item)
+        ...     if output.has_next():
+        ...         yield output.next()
+        >>> output.finalize()
+        >>> if output.has_next():
+        ...     yield output.next()
+    """
+
+    def __init__(self, block_udf: Optional[Callable[[Block], Block]],
+                 target_max_block_size: Optional[int]):
+        """Construct a BlockOutputBuffer.
+
+        Args:
+            block_udf: An optional function to apply to each output block.
+            target_max_block_size: The target max size of the output blocks
+                in bytes, or None to emit a single output block.
+        """
+        self._target_max_block_size = target_max_block_size
+        self._block_udf = block_udf
+        self._buffer = DelegatingArrowBlockBuilder()
+        self._returned_at_least_one_block = False
+        self._finalized = False
+
+    def add(self, item: Any) -> None:
+        """Add a single item to this output buffer."""
+        assert not self._finalized
+        self._buffer.add(item)
+
+    def add_block(self, block: Block) -> None:
+        """Add a data block to this output buffer."""
+        assert not self._finalized
+        self._buffer.add_block(block)
+
+    def finalize(self) -> None:
+        """Must be called once all items have been added."""
+        assert not self._finalized
+        self._finalized = True
+
+    def has_next(self) -> bool:
+        """Returns true when a complete output block is produced."""
+        if self._finalized:
+            # Always emit at least one (possibly empty) block.
+            return (not self._returned_at_least_one_block
+                    or self._buffer.num_rows() > 0)
+        if self._target_max_block_size is None:
+            return False
+        return (self._buffer.get_estimated_memory_usage() >
+                self._target_max_block_size)
+
+    def next(self) -> Block:
+        """Returns the next complete output block."""
+        assert self.has_next()
+        block = self._buffer.build()
+        if self._block_udf is not None:
+            block = self._block_udf(block)
+        self._buffer = DelegatingArrowBlockBuilder()
+        self._returned_at_least_one_block = True
+        return block
+
+
+def get_target_max_block_size(context: DatasetContext) -> Optional[int]:
+    """Get the target max size of output blocks in the given context.
+
+    Returns:
+        The target max block size if block splitting is enabled, otherwise
+        None, in which case each task emits a single output block.
+    """
+    if context.block_splitting_enabled:
+        return context.target_max_block_size
+    return None
@@ -1,15 +1,30 @@
-from typing import Any, Callable, List, Optional, TYPE_CHECKING
+import collections
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, \
+    Tuple, TYPE_CHECKING
 
 import ray
+from ray.data.block import Block, BlockMetadata
 from ray.data.context import DatasetContext
 from ray.data.dataset import Dataset, T
+from ray.data.impl.block_list import BlockList
+from ray.data.impl.compute import TaskPool, _map_block_nosplit
+from ray.data.impl.plan import OneToOneStage
 from ray.data.impl.progress_bar import ProgressBar, \
     set_progress_bars
+from ray.data.impl.remote_fn import cached_remote_fn
 from ray.types import ObjectRef
 
 if TYPE_CHECKING:
     from ray.data.dataset_pipeline import DatasetPipeline
 
+# The fraction of the cluster's object store memory that a streaming pipeline
+# may fill with buffered blocks, unless a limit is set in the DatasetContext.
+STREAMING_OBJECT_STORE_MEMORY_FRACTION = 0.25
+
+# A block waiting for a stage of a streaming pipeline: the index of its input
+# block, the block and its metadata.
+_QueuedBlock = Tuple[int, ObjectRef[Block], BlockMetadata]
+
 
 @ray.remote(num_cpus=0, placement_group=None)
 def pipeline_stage(fn: Callable[[], Dataset[T]],
@@ -17,7 +32,10 @@ def pipeline_stage(fn: Callable[[], Dataset[T]],
     DatasetContext._set_current(context)
     try:
         prev = set_progress_bars(False)
-        return fn()
+        ds = fn()
+        # Execute the dataset within this stage rather than by its consumer.
+        ds._plan.execute()
+        return ds
     finally:
         set_progress_bars(prev)
 
@@ -92,6 +110,194 @@ class PipelineExecutor:
         return output
 
 
+class PerRecordWindowFn:
+    """A pipeline stage that applies a per-record transform to each window.
+
+    Unlike arbitrary ``foreach_window`` functions, these stages transform each
+    block of a window independently, so they can be streamed block by block.
+    """
+
+    def __init__(self, method: str, args: tuple, kwargs: dict):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, ds: Dataset[Any]) -> Dataset[Any]:
+        return getattr(ds, self.method)(*self.args, **self.kwargs)
+
+
+def get_streaming_stages(fns: List[Callable[[Dataset[Any]], Dataset[Any]]]
+                         ) -> Optional[List[OneToOneStage]]:
+    """Get the fused one-to-one stages of the given pipeline stages.
+
+    Returns:
+        The stages to stream blocks through, or None if the pipeline stages
+        can't be streamed (i.e., if any of them is not a per-record transform
+        or runs on an actor pool).
+    """
+    if not all(isinstance(fn, PerRecordWindowFn) for fn in fns):
+        return None
+    # Per-record transforms are lazy, so applying them to an empty dataset
+    # only builds their (fused) stages.
+    ds = Dataset(BlockList([], []), 0)
+    for fn in fns:
+        ds = fn(ds)
+    stages = ds._plan._stages
+    if not all(isinstance(stage.compute, TaskPool) for stage in stages):
+        return None
+    return stages
+
+
+class StreamingPipelineExecutor:
+    """Streams the blocks of a pipeline's windows through its stages.
+
+    Unlike the PipelineExecutor, which executes each window as a whole, this
+    submits a task per block and stage as soon as the block is output by the
+    previous stage, with at most ``max_tasks_per_stage`` tasks in flight per
+    stage. New input blocks are only admitted while the blocks buffered by
+    the pipeline fit in the object store memory limit. Since tasks are only
+    submitted as the consumer pulls output blocks, a slow consumer applies
+    backpressure to the whole pipeline.
+
+    The output blocks are returned in the order of the input blocks.
+    """
+
+    def __init__(self,
+                 pipeline: "DatasetPipeline[T]",
+                 stages: List[OneToOneStage],
+                 max_tasks_per_stage: Optional[int] = None,
+                 object_store_memory_limit: Optional[int] = None):
+        context = DatasetContext.get_current()
+        if max_tasks_per_stage is None:
+            max_tasks_per_stage = context.pipeline_max_tasks_per_stage
+        if max_tasks_per_stage is None:
+            max_tasks_per_stage = int(ray.cluster_resources().get("CPU", 1))
+        if object_store_memory_limit is None:
+            object_store_memory_limit = (
+                context.pipeline_object_store_memory_limit)
+        if object_store_memory_limit is None:
+            object_store_memory_limit = int(
+                ray.cluster_resources().get("object_store_memory", 0) *
+                STREAMING_OBJECT_STORE_MEMORY_FRACTION)
+        self._max_tasks_per_stage = max(1, max_tasks_per_stage)
+        self._memory_limit = object_store_memory_limit
+        self._stages = stages
+        self._input = _iter_window_blocks(pipeline._base_iterable)
+        self._input_done = False
+        # The index of the next input block, and of the next output block.
+        self._next_input = 0
+        self._next_output = 0
+        # The blocks waiting to be submitted to each stage.
+        self._queues: List[Deque[_QueuedBlock]] = [
+            collections.deque() for _ in stages
+        ]
+        # The metadata ref of each task in flight, mapped to its stage, the
+        # index of its input block, and its output block.
+        self._in_flight: Dict[ObjectRef[BlockMetadata], Tuple[
+            int, int, ObjectRef[Block]]] = {}
+        self._num_in_flight = [0] * len(stages)
+        # The output blocks that are waiting on preceding blocks.
+        self._outputs: Dict[int, Tuple[ObjectRef[Block], BlockMetadata]] = {}
+        # The (estimated) size of each block buffered by the pipeline.
+        self._block_bytes: Dict[int, int] = {}
+        self._buffered_bytes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Tuple[ObjectRef[Block], BlockMetadata]:
+        while self._next_output not in self._outputs:
+            self._admit_input_blocks()
+            self._submit_tasks()
+            if not self._in_flight:
+                if self._next_output in self._outputs:
+                    break
+                assert self._input_done, self
+                raise StopIteration
+            ready, _ = ray.wait(list(self._in_flight), num_returns=1)
+            self._process_ready(ready)
+
+        # The output block is now owned by the consumer.
+        output = self._outputs.pop(self._next_output)
+        self._set_block_bytes(self._next_output, None)
+        self._next_output += 1
+        return output
+
+    def _can_admit_input_block(self) -> bool:
+        if self._input_done:
+            return False
+        # Always admit a block into an empty pipeline, even if the block
+        # exceeds the memory limit on its own.
+        if 0 < self._memory_limit <= self._buffered_bytes:
+            return False
+        if self._stages:
+            waiting = len(self._queues[0]) + self._num_in_flight[0]
+        else:
+            waiting = len(self._outputs)
+        return waiting < self._max_tasks_per_stage
+
+    def _admit_input_blocks(self) -> None:
+        while self._can_admit_input_block():
+            try:
+                block, metadata = next(self._input)
+            except StopIteration:
+                self._input_done = True
+                break
+            index = self._next_input
+            self._next_input += 1
+            self._set_block_bytes(index, metadata.size_bytes)
+            if self._stages:
+                self._queues[0].append((index, block, metadata))
+            else:
+                self._outputs[index] = (block, metadata)
+
+    def _submit_tasks(self) -> None:
+        map_block = cached_remote_fn(_map_block_nosplit)
+        # Prioritize the downstream stages, which free up memory for new input
+        # blocks once their outputs are consumed.
+        for i in reversed(range(len(self._stages))):
+            stage = self._stages[i]
+            queue = self._queues[i]
+            while queue and (self._num_in_flight[i] <
+                             self._max_tasks_per_stage):
+                index, block, metadata = queue.popleft()
+                new_block, new_metadata = map_block.options(
+                    **stage.ray_remote_args, num_returns=2).remote(
+                        block, stage.block_fn, metadata.input_files)
+                self._in_flight[new_metadata] = (i, index, new_block)
+                self._num_in_flight[i] += 1
+
+    def _process_ready(self, ready: List[ObjectRef[BlockMetadata]]) -> None:
+        for ref, metadata in zip(ready, ray.get(ready)):
+            i, index, block = self._in_flight.pop(ref)
+            self._num_in_flight[i] -= 1
+            # The input block of the task is released in favor of its output.
+            self._set_block_bytes(index, metadata.size_bytes)
+            if i + 1 < len(self._stages):
+                self._queues[i + 1].append((index, block, metadata))
+            else:
+                self._outputs[index] = (block, metadata)
+
+    def _set_block_bytes(self, index: int, size_bytes: Optional[int]) -> None:
+        self._buffered_bytes -= self._block_bytes.pop(index, 0)
+        if size_bytes is not None:
+            self._block_bytes[index] = size_bytes
+            self._buffered_bytes += size_bytes
+
+    def __repr__(self) -> str:
+        return ("StreamingPipelineExecutor(stages={}, in_flight={}, "
+                "buffered_bytes={})".format(self._stages,
+                                            self._num_in_flight,
+                                            self._buffered_bytes))
+
+
+def _iter_window_blocks(base_iterable: Iterator[Callable[[], Dataset[T]]]
+                        ) -> Iterator[Tuple[ObjectRef[Block], BlockMetadata]]:
+    for window in base_iterable:
+        ds = window()
+        yield from ds._blocks.iter_blocks_with_metadata()
+
+
 @ray.remote(num_cpus=0, placement_group=None)
 class PipelineSplitExecutorCoordinator:
     def __init__(self, pipeline: "DatasetPipeline[T]", n: int,
@@ -0,0 +1,168 @@
+import time
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from ray.data.block import Block
+from ray.data.impl.block_list import BlockList
+from ray.data.impl.cache import Lineage
+from ray.data.impl.compute import ComputeStrategy, TaskPool
+from ray.data.impl.stats import DatasetStats
+
+
+class OneToOneStage:
+    """A stage that transforms each block of its input independently.
+
+    The transform of a stage returns the output blocks of each input block,
+    which is a single block unless block splitting is enabled in the
+    ``DatasetContext``.
+
+    Consecutive one-to-one stages can be fused into a single stage, so that
+    all of their transforms are applied to a block within a single task,
+    without materializing the intermediate blocks in the object store.
+
+    The lineage of a stage holds the items that identify its transform for
+    ``Dataset.cache()``, or is None if the transform can't be identified.
+    """
+
+    def __init__(self,
+                 name: str,
+                 block_fn: Callable[[Block], Iterable[Block]],
+                 compute: ComputeStrategy,
+                 ray_remote_args: dict,
+                 lineage: Optional[Tuple[Any, ...]] = None):
+        self.name = name
+        self.block_fn = block_fn
+        self.compute = compute
+        self.ray_remote_args = ray_remote_args or {}
+        self.lineage = lineage
+
+    def can_fuse(self, prev: "OneToOneStage") -> bool:
+        """Whether this stage can be fused with the given preceding stage.
+
+        Only stages that run as Ray tasks are fused: each actor pool stage
+        caches its own callable class, so fusing actor stages would
+        reinitialize the callables for every block.
+        """
+        return (isinstance(self.compute, TaskPool)
+                and isinstance(prev.compute, TaskPool)
+                and self.ray_remote_args == prev.ray_remote_args)
+
+    def fuse(self, prev: "OneToOneStage") -> "OneToOneStage":
+        """Fuse this stage with the given preceding stage."""
+        assert self.can_fuse(prev), (self, prev)
+        fn1 = prev.block_fn
+        fn2 = self.block_fn
+
+        def block_fn(block: Block) -> Iterable[Block]:
+            for tmp in fn1(block):
+                yield from fn2(tmp)
+
+        lineage = None
+        if prev.lineage is not None and self.lineage is not None:
+            lineage = prev.lineage + self.lineage
+        return OneToOneStage("{}->{}".format(prev.name, self.name), block_fn,
+                             prev.compute, prev.ray_remote_args, lineage)
+
+    def __call__(self, blocks: BlockList) -> BlockList:
+        return self.compute.apply(self.block_fn, self.ray_remote_args.copy(),
+                                  blocks)
+
+    def __repr__(self) -> str:
+        return "OneToOneStage({})".format(self.name)
+
+
+class ExecutionPlan:
+    """A lazy execution plan for a Dataset.
+
+    The plan holds the input blocks of the dataset, their stats, and the
+    stages that have yet to be applied to them. Stages are only executed when
+    the dataset is consumed, at which point the output blocks and stats are
+    cached in the plan and the stages are dropped.
+
+    The lineage of a plan identifies its output blocks for
+    ``Dataset.cache()``, or is None if they can't be identified.
+    """
+
+    def __init__(self,
+                 in_blocks: BlockList,
+                 stats: DatasetStats,
+                 stages: Optional[List[OneToOneStage]] = None,
+                 lineage: Optional[Lineage] = None):
+        self._in_blocks = in_blocks
+        self._in_stats = stats
+        self._stages = stages or []
+        self.lineage = lineage
+
+    @property
+    def lineage_key(self) -> Optional[str]:
+        """The key of the lineage of this plan, or None if it's unknown."""
+        if self.lineage is None:
+            return None
+        return self.lineage.key
+
+    def with_stage(self, stage: OneToOneStage) -> "ExecutionPlan":
+        """Return a copy of this plan with the given stage appended.
+
+        The stage is fused into the last stage of the plan if possible.
+
+        Args:
+            stage: The stage to append.
+
+        Returns:
+            A new ExecutionPlan.
+        """
+        stages = self._stages.copy()
+        if stages and stage.can_fuse(stages[-1]):
+            stages[-1] = stage.fuse(stages[-1])
+        else:
+            stages.append(stage)
+        lineage = None
+        if self.lineage is not None and stage.lineage is not None:
+            lineage = self.lineage.extend(stage.lineage)
+        return ExecutionPlan(self._in_blocks, self._in_stats, stages, lineage)
+
+    def execute(self) -> BlockList:
+        """Execute the pending stages of this plan.
+
+        Returns:
+            The output blocks of the plan.
+        """
+        blocks = self._in_blocks
+        stats = self._in_stats
+        for stage in self._stages:
+            start = time.perf_counter()
+            blocks = stage(blocks)
+            stats = DatasetStats(
+                stages={stage.name: blocks.get_metadata()},
+                parent=stats,
+                time_total_s=time.perf_counter() - start)
+        self._in_blocks = blocks
+        self._in_stats = stats
+        self._stages = []
+        return blocks
+
+    def stats(self) -> DatasetStats:
+        """Get the stats of the executed stages of this plan."""
+        return self._in_stats
+
+    def is_executed(self) -> bool:
+        """Whether this plan has no pending stages."""
+        return not self._stages
+
+    def initial_num_blocks(self) -> int:
+        """Get the number of output blocks, without executing the plan."""
+        # Pending stages output one block per input block, unless their
+        # outputs are split, which is only known once they're executed.
+        return self._in_blocks.initial_num_blocks()
+
+    def __getstate__(self) -> dict:
+        # Execute the plan before serialization, so that the stages aren't
+        # recomputed by every process that receives the dataset.
+        self.execute()
+        state = self.__dict__.copy()
+        # The lineage may hold unpicklable read arguments, so datasets
+        # received from other processes can't be cached.
+        state["lineage"] = None
+        return state
+
+    def __repr__(self) -> str:
+        return "ExecutionPlan(stages={})".format(self._stages)
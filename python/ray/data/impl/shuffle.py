@@ -1,19 +1,64 @@
 import itertools
 import math
-from typing import TypeVar, List, Optional, Dict, Any
+from typing import TypeVar, List, Optional, Dict, Any, Tuple, Union
 
 import numpy as np
 
 import ray
-from ray.data.block import Block, BlockAccessor, BlockMetadata
+from ray.types import ObjectRef
+from ray.data.block import Block, BlockAccessor, BlockMetadata, \
+    BlockExecStats, BlockPartition, _BlockExecStatsBuilder
+from ray.data.context import DatasetContext
 from ray.data.impl.progress_bar import ProgressBar
 from ray.data.impl.block_list import BlockList
 from ray.data.impl.arrow_block import DelegatingArrowBlockBuilder
+from ray.data.impl.output_buffer import BlockOutputBuffer
 from ray.data.impl.remote_fn import cached_remote_fn
 from ray.data.impl.util import _get_spread_resources_iter
 
 T = TypeVar("T")
 
+# The number of shuffle map tasks launched per shuffle merge task in each
+# round of the push-based shuffle.
+PUSH_BASED_SHUFFLE_MERGE_FACTOR = 2
+
+
+def shuffle_impl(input_blocks: BlockList,
+                 output_num_blocks: int,
+                 *,
+                 random_shuffle: bool = False,
+                 random_seed: Optional[int] = None,
+                 map_ray_remote_args: Optional[Dict[str, Any]] = None,
+                 reduce_ray_remote_args: Optional[Dict[str, Any]] = None,
+                 _spread_resource_prefix: Optional[str] = None
+                 ) -> Tuple[BlockList, Dict[str, List[BlockMetadata]]]:
+    """Shuffle the given blocks into ``output_num_blocks`` blocks.
+
+    The push-based shuffle is used if enabled in the ``DatasetContext``,
+    otherwise this falls back to the pull-based ``simple_shuffle``. Since the
+    push-based shuffle doesn't support resource-based spreading, the simple
+    shuffle is always used when a spread resource prefix is given.
+
+    Returns:
+        The shuffled blocks, and the output metadata of each shuffle stage.
+    """
+    context = DatasetContext.get_current()
+    if context.use_push_based_shuffle and _spread_resource_prefix is None:
+        shuffle_fn = push_based_shuffle
+    else:
+        shuffle_fn = simple_shuffle
+    kwargs = {}
+    if _spread_resource_prefix is not None:
+        kwargs["_spread_resource_prefix"] = _spread_resource_prefix
+    return shuffle_fn(
+        input_blocks,
+        output_num_blocks,
+        random_shuffle=random_shuffle,
+        random_seed=random_seed,
+        map_ray_remote_args=map_ray_remote_args,
+        reduce_ray_remote_args=reduce_ray_remote_args,
+        **kwargs)
+
 
 def simple_shuffle(input_blocks: BlockList,
                    output_num_blocks: int,
@@ -22,7 +67,8 @@ def simple_shuffle(input_blocks: BlockList,
                    random_seed: Optional[int] = None,
                    map_ray_remote_args: Optional[Dict[str, Any]] = None,
                    reduce_ray_remote_args: Optional[Dict[str, Any]] = None,
-                   _spread_resource_prefix: Optional[str] = None) -> BlockList:
+                   _spread_resource_prefix: Optional[str] = None
+                   ) -> Tuple[BlockList, Dict[str, List[BlockMetadata]]]:
     input_blocks = list(input_blocks.iter_blocks())
     if map_ray_remote_args is None:
         map_ray_remote_args = {}
@@ -43,14 +89,14 @@ def simple_shuffle(input_blocks: BlockList,
             itertools.repeat({}), 2)
 
     shuffle_map = cached_remote_fn(_shuffle_map)
-    shuffle_reduce = cached_remote_fn(_shuffle_reduce)
+    shuffle_reduce, reduce_options, reduce_args = _get_shuffle_reduce()
 
     map_bar = ProgressBar("Shuffle Map", position=0, total=input_num_blocks)
 
     shuffle_map_out = [
         shuffle_map.options(
             **map_ray_remote_args,
-            num_returns=output_num_blocks,
+            num_returns=output_num_blocks + 1,
             resources=next(map_resource_iter)).remote(
                 block, i, output_num_blocks, random_shuffle, random_seed)
         for i, block in enumerate(input_blocks)
@@ -58,10 +104,10 @@ def simple_shuffle(input_blocks: BlockList,
     # Eagerly delete the input block references in order to eagerly release
     # the blocks' memory.
     del input_blocks
-    if output_num_blocks == 1:
-        # Handle the num_returns=1 edge case which doesn't return a list.
-        shuffle_map_out = [[x] for x in shuffle_map_out]
-    map_bar.block_until_complete([x[0] for x in shuffle_map_out])
+    # The last output of each map task is its metadata.
+    shuffle_map_metadata = [x[-1] for x in shuffle_map_out]
+    shuffle_map_out = [x[:-1] for x in shuffle_map_out]
+    shuffle_map_metadata = map_bar.fetch_until_complete(shuffle_map_metadata)
     map_bar.close()
 
     # Randomize the reduce order of the blocks.
@@ -74,25 +120,263 @@ def simple_shuffle(input_blocks: BlockList,
     shuffle_reduce_out = [
         shuffle_reduce.options(
             **reduce_ray_remote_args,
-            num_returns=2,
+            **reduce_options,
             resources=next(reduce_resource_iter)).remote(
+                *reduce_args,
                 *[shuffle_map_out[i][j] for i in range(input_num_blocks)])
         for j in range(output_num_blocks)
     ]
     # Eagerly delete the map block references in order to eagerly release
     # the blocks' memory.
     del shuffle_map_out
+    new_blocks, new_metadata = _get_shuffle_reduce_outputs(
+        shuffle_reduce_out, reduce_bar)
+    reduce_bar.close()
+
+    stages = {
+        "shuffle_map": shuffle_map_metadata,
+        "shuffle_reduce": new_metadata,
+    }
+    return BlockList(list(new_blocks), list(new_metadata)), stages
+
+
+def push_based_shuffle(input_blocks: BlockList,
+                       output_num_blocks: int,
+                       *,
+                       random_shuffle: bool = False,
+                       random_seed: Optional[int] = None,
+                       map_ray_remote_args: Optional[Dict[str, Any]] = None,
+                       reduce_ray_remote_args: Optional[Dict[str, Any]] = None,
+                       num_maps_per_round: Optional[int] = None,
+                       num_mergers: Optional[int] = None
+                       ) -> Tuple[BlockList, Dict[str, List[BlockMetadata]]]:
+    """Shuffle the given blocks by pushing map outputs into merge tasks.
+
+    Unlike ``simple_shuffle``, which creates M*N map output objects and only
+    starts reducing after all maps finish, this shuffle runs the map tasks in
+    rounds of ``num_maps_per_round`` tasks. Each map task partitions its block
+    into one object per merge task, and each merge task combines the outputs
+    of a round of maps into one partially merged block per reducer that it is
+    responsible for. The merges of a round run concurrently with the maps of
+    the next round. The final reduce tasks then only need to combine one
+    partially merged block per round.
+
+    Only one round of map tasks is in flight at a time, which bounds the
+    number of map outputs stored at any given time.
+
+    Args:
+        input_blocks: The blocks to shuffle.
+        output_num_blocks: The number of output blocks (reducers).
+        random_shuffle: Whether to randomly shuffle the records.
+        random_seed: The random seed to use for the random shuffle.
+        map_ray_remote_args: Ray remote args for the map and merge tasks.
+        reduce_ray_remote_args: Ray remote args for the reduce tasks.
+        num_maps_per_round: The number of map tasks to run per round, or None
+            to pick it based on the number of CPUs in the cluster.
+        num_mergers: The number of merge tasks to run per round, or None to
+            pick it based on the number of CPUs in the cluster.
+
+    Returns:
+        The shuffled blocks, and the output metadata of each shuffle stage.
+    """
+    input_blocks = list(input_blocks.iter_blocks())
+    if map_ray_remote_args is None:
+        map_ray_remote_args = {}
+    if reduce_ray_remote_args is None:
+        reduce_ray_remote_args = {}
+    input_num_blocks = len(input_blocks)
+
+    if num_maps_per_round is None or num_mergers is None:
+        num_cpus = max(1, int(ray.cluster_resources().get("CPU", 1)))
+        merge_factor = PUSH_BASED_SHUFFLE_MERGE_FACTOR
+        if num_maps_per_round is None:
+            num_maps_per_round = max(
+                1, num_cpus * merge_factor // (merge_factor + 1))
+        if num_mergers is None:
+            num_mergers = max(1, num_cpus // (merge_factor + 1))
+    num_mergers = min(num_mergers, output_num_blocks)
+    # Assign contiguous ranges of reducers to each merge task.
+    reducer_bounds = _get_merger_reducer_bounds(output_num_blocks,
+                                                num_mergers)
+
+    shuffle_map = cached_remote_fn(_push_based_shuffle_map)
+    shuffle_merge = cached_remote_fn(_push_based_shuffle_merge)
+    shuffle_reduce, reduce_options, reduce_args = _get_shuffle_reduce()
+
+    map_bar = ProgressBar("Shuffle Map", position=0, total=input_num_blocks)
+
+    # The partially merged outputs of each round, indexed by
+    # [round][reducer].
+    merge_results = []
+    map_metadata = []
+    merge_metadata = []
+    prev_map_refs = []
+    for round_start in range(0, input_num_blocks, num_maps_per_round):
+        round_blocks = input_blocks[round_start:round_start +
+                                    num_maps_per_round]
+        # Bound the number of maps in flight by waiting for the previous round
+        # of maps before launching the next one. The merges of the previous
+        # round may still be running.
+        map_bar.block_until_complete(prev_map_refs)
+        map_out = [
+            shuffle_map.options(
+                **map_ray_remote_args, num_returns=num_mergers + 1).remote(
+                    block, round_start + i, output_num_blocks, reducer_bounds,
+                    random_shuffle, random_seed)
+            for i, block in enumerate(round_blocks)
+        ]
+        del round_blocks
+        # The last output of each map task is its metadata.
+        prev_map_refs = [x[-1] for x in map_out]
+        map_metadata.extend(prev_map_refs)
+
+        round_merge_results = []
+        for j in range(num_mergers):
+            num_merge_outputs = reducer_bounds[j + 1] - reducer_bounds[j]
+            *merge_out, merge_meta = shuffle_merge.options(
+                **map_ray_remote_args,
+                num_returns=num_merge_outputs + 1).remote(
+                    num_merge_outputs, random_shuffle,
+                    _get_merge_seed(random_seed,
+                                    len(merge_results) * num_mergers + j),
+                    *[map_out[i][j] for i in range(len(map_out))])
+            round_merge_results.extend(merge_out)
+            merge_metadata.append(merge_meta)
+        # Eagerly delete the map output references in order to eagerly release
+        # the blocks' memory once merged.
+        del map_out
+        merge_results.append(round_merge_results)
+    # Eagerly delete the input block references in order to eagerly release
+    # the blocks' memory.
+    del input_blocks
+    map_bar.block_until_complete(prev_map_refs)
+    map_bar.close()
+    map_metadata = ray.get(map_metadata)
+
+    # Randomize the reduce order of the rounds.
+    if random_shuffle:
+        random = np.random.RandomState(random_seed)
+        random.shuffle(merge_results)
+
+    reduce_bar = ProgressBar(
+        "Shuffle Reduce", position=0, total=output_num_blocks)
+    shuffle_reduce_out = [
+        shuffle_reduce.options(
+            **reduce_ray_remote_args, **reduce_options).remote(
+                *reduce_args,
+                *[merge_results[r][j] for r in range(len(merge_results))])
+        for j in range(output_num_blocks)
+    ]
+    # Eagerly delete the merge block references in order to eagerly release
+    # the blocks' memory.
+    del merge_results
+    new_blocks, new_metadata = _get_shuffle_reduce_outputs(
+        shuffle_reduce_out, reduce_bar)
+    reduce_bar.close()
+
+    stages = {
+        "shuffle_map": map_metadata,
+        "shuffle_merge": ray.get(merge_metadata),
+        "shuffle_reduce": new_metadata,
+    }
+    return BlockList(list(new_blocks), list(new_metadata)), stages
+
+
+def _get_shuffle_reduce() -> Tuple[Any, Dict[str, Any], List[Any]]:
+    """Get the shuffle reduce task for the current context.
+
+    Returns:
+        The remote function, the options and the leading arguments of the
+        reduce tasks. If block splitting is enabled, each reduce task returns
+        a partition of its output blocks, otherwise an output block and its
+        metadata.
+    """
+    context = DatasetContext.get_current()
+    if context.block_splitting_enabled:
+        return cached_remote_fn(_shuffle_reduce_split), {}, [context]
+    return cached_remote_fn(_shuffle_reduce), {"num_returns": 2}, []
+
+
+def _get_shuffle_reduce_outputs(
+        shuffle_reduce_out: List[Any], reduce_bar: ProgressBar
+) -> Tuple[List[ObjectRef[Block]], List[BlockMetadata]]:
+    """Wait for the given reduce tasks, and get their output blocks."""
+    if DatasetContext.get_current().block_splitting_enabled:
+        partitions = reduce_bar.fetch_until_complete(shuffle_reduce_out)
+        new_blocks = [b for partition in partitions for b, _ in partition]
+        new_metadata = [m for partition in partitions for _, m in partition]
+        return new_blocks, new_metadata
     new_blocks, new_metadata = zip(*shuffle_reduce_out)
     reduce_bar.block_until_complete(list(new_blocks))
-    new_metadata = ray.get(list(new_metadata))
-    reduce_bar.close()
+    return list(new_blocks), ray.get(list(new_metadata))
+
+
+def _get_merger_reducer_bounds(output_num_blocks: int,
+                               num_mergers: int) -> List[int]:
+    """Return the reducer index boundaries of each merge task.
+
+    Merge task ``j`` is responsible for reducers in the range
+    ``[bounds[j], bounds[j + 1])``.
+    """
+    bounds = [0]
+    for split in np.array_split(np.arange(output_num_blocks), num_mergers):
+        bounds.append(bounds[-1] + len(split))
+    return bounds
 
-    return BlockList(list(new_blocks), list(new_metadata))
+
+def _get_merge_seed(random_seed: Optional[int],
+                    merge_idx: int) -> Optional[int]:
+    if random_seed is None:
+        return None
+    return random_seed + merge_idx
+
+
+def _push_based_shuffle_map(block: Block, idx: int, output_num_blocks: int,
+                            reducer_bounds: List[int], random_shuffle: bool,
+                            random_seed: Optional[int]
+                            ) -> List[Union[List[Block], BlockMetadata]]:
+    *slices, metadata = _shuffle_map(block, idx, output_num_blocks,
+                                     random_shuffle, random_seed)
+    # Group the slices by the merge task responsible for their reducers.
+    merger_inputs = [
+        slices[reducer_bounds[j]:reducer_bounds[j + 1]]
+        for j in range(len(reducer_bounds) - 1)
+    ]
+    return merger_inputs + [metadata]
+
+
+def _push_based_shuffle_merge(num_outputs: int, random_shuffle: bool,
+                              random_seed: Optional[int],
+                              *mapper_outputs: List[List[Block]]
+                              ) -> List[Union[Block, BlockMetadata]]:
+    stats = BlockExecStats.builder()
+    mapper_outputs = list(mapper_outputs)
+    # Randomize the merge order of the map outputs.
+    if random_shuffle:
+        random = np.random.RandomState(random_seed)
+        random.shuffle(mapper_outputs)
+    merged = []
+    for i in range(num_outputs):
+        builder = DelegatingArrowBlockBuilder()
+        for slices in mapper_outputs:
+            stats.add_input(slices[i])
+            builder.add_block(slices[i])
+        merged.append(builder.build())
+    accessors = [BlockAccessor.for_block(b) for b in merged]
+    metadata = BlockMetadata(
+        num_rows=sum(a.num_rows() for a in accessors),
+        size_bytes=sum(a.size_bytes() for a in accessors),
+        schema=None,
+        input_files=None,
+        exec_stats=stats.build())
+    return merged + [metadata]
 
 
 def _shuffle_map(block: Block, idx: int, output_num_blocks: int,
-                 random_shuffle: bool,
-                 random_seed: Optional[int]) -> List[Block]:
+                 random_shuffle: bool, random_seed: Optional[int]
+                 ) -> List[Union[Block, BlockMetadata]]:
+    stats = BlockExecStats.builder()
+    stats.add_input(block)
     block = BlockAccessor.for_block(block)
 
     # Randomize the distribution of records to blocks.
@@ -114,16 +398,16 @@ def _shuffle_map(block: Block, idx: int, output_num_blocks: int,
 
     num_rows = sum(BlockAccessor.for_block(s).num_rows() for s in slices)
     assert num_rows == block.num_rows(), (num_rows, block.num_rows())
-    # Needed to handle num_returns=1 edge case in Ray API.
-    if len(slices) == 1:
-        return slices[0]
-    else:
-        return slices
+    metadata = block.get_metadata(
+        input_files=None, exec_stats=stats.build())
+    return slices + [metadata]
 
 
 def _shuffle_reduce(*mapper_outputs: List[Block]) -> (Block, BlockMetadata):
+    stats = BlockExecStats.builder()
     builder = DelegatingArrowBlockBuilder()
     for block in mapper_outputs:
+        stats.add_input(block)
         builder.add_block(block)
     new_block = builder.build()
     accessor = BlockAccessor.for_block(new_block)
@@ -131,5 +415,38 @@ def _shuffle_reduce(*mapper_outputs: List[Block]) -> (Block, BlockMetadata):
         num_rows=accessor.num_rows(),
         size_bytes=accessor.size_bytes(),
         schema=accessor.schema(),
-        input_files=None)
+        input_files=None,
+        exec_stats=stats.build())
     return new_block, new_metadata
+
+
+def _shuffle_reduce_split(context: DatasetContext,
+                          *mapper_outputs: List[Block]) -> BlockPartition:
+    DatasetContext._set_current(context)
+    stats = BlockExecStats.builder()
+    output_buffer = BlockOutputBuffer(None, context.target_max_block_size)
+    partition: BlockPartition = []
+    for block in mapper_outputs:
+        stats.add_input(block)
+        output_buffer.add_block(block)
+        if output_buffer.has_next():
+            partition.append(_put_block(output_buffer.next(), stats, context))
+            # Attribute the time until the next output block to that block.
+            stats = BlockExecStats.builder()
+    output_buffer.finalize()
+    if output_buffer.has_next():
+        partition.append(_put_block(output_buffer.next(), stats, context))
+    return partition
+
+
+def _put_block(block: Block, stats: _BlockExecStatsBuilder,
+               context: DatasetContext
+               ) -> Tuple[ObjectRef[Block], BlockMetadata]:
+    accessor = BlockAccessor.for_block(block)
+    metadata = BlockMetadata(
+        num_rows=accessor.num_rows(),
+        size_bytes=accessor.size_bytes(),
+        schema=accessor.schema(),
+        input_files=None,
+        exec_stats=stats.build())
+    return ray.put(block, _owner=context.block_owner), metadata
@@ -15,6 +15,7 @@ from ray.data.aggregate import AggregateFn
 from ray.data.impl.size_estimator import SizeEstimator
 from ray.data.block import Block, BlockAccessor, BlockMetadata, \
     T, U, KeyType, AggType
+from ray.data.impl.util import _accumulate_by_key, _hash_key
 
 # A simple block can be sorted by value (None) or a lambda function (Callable).
 SortKeyT = Union[None, Callable[[T], Any]]
@@ -39,6 +40,9 @@ class SimpleBlockBuilder(BlockBuilder[T]):
     def build(self) -> Block:
         return list(self._items)
 
+    def num_rows(self) -> int:
+        return len(self._items)
+
     def get_estimated_memory_usage(self) -> int:
         return self._size_estimator.size_bytes()
 
@@ -75,10 +79,16 @@ class SimpleBlockAccessor(BlockAccessor):
             raise ValueError("`column` arg not supported for list block")
         return np.array(self._items)
 
+    def to_numpy_batch(self) -> np.ndarray:
+        return self.to_numpy()
+
     def to_arrow(self) -> "pyarrow.Table":
         import pyarrow
         return pyarrow.Table.from_pandas(self.to_pandas())
 
+    def to_block(self) -> List[T]:
+        return self._items
+
     def size_bytes(self) -> int:
         return sys.getsizeof(self._items)
 
@@ -207,6 +217,31 @@ class SimpleBlockAccessor(BlockAccessor):
                 break
         return ret
 
+    def hash_combine(self, key: GroupKeyT, aggs: Tuple[AggregateFn],
+                     num_partitions: int
+                     ) -> List[Block[Tuple[KeyType, AggType]]]:
+        """Combine rows with the same key into accumulators, and partition
+        the accumulators by the hash of their key.
+
+        Unlike ``combine()``, this doesn't require the block to be sorted.
+
+        Args:
+            key: The key function that returns the key from the row.
+            aggs: The aggregations to do.
+            num_partitions: The number of partitions to return.
+
+        Returns:
+            A list of ``num_partitions`` blocks of (k, v_1, ..., v_n) tuples
+            sorted by k, where k is the groupby key and v_i is the partially
+            combined accumulator for the ith given aggregation.
+        """
+        accumulators = _accumulate_by_key(self.iter_rows(), key, aggs)
+        partitions = [[] for _ in range(num_partitions)]
+        for k in sorted(accumulators):
+            partitions[_hash_key(k) % num_partitions].append(
+                (k, ) + tuple(accumulators[k]))
+        return partitions
+
     @staticmethod
     def merge_sorted_blocks(
             blocks: List[Block[T]], key: SortKeyT,
@@ -215,6 +250,19 @@ class SimpleBlockAccessor(BlockAccessor):
         ret.sort(key=key, reverse=descending)
         return ret, SimpleBlockAccessor(ret).get_metadata(None)
 
+    @staticmethod
+    def iter_merge_sorted_blocks(blocks: List[Block[T]], key: SortKeyT,
+                                 descending: bool,
+                                 max_block_size: int) -> Iterator[Block[T]]:
+        builder = SimpleBlockBuilder()
+        for item in heapq.merge(*blocks, key=key, reverse=descending):
+            builder.add(item)
+            if builder.get_estimated_memory_usage() >= max_block_size:
+                yield builder.build()
+                builder = SimpleBlockBuilder()
+        if builder.num_rows() > 0:
+            yield builder.build()
+
     @staticmethod
     def aggregate_combined_blocks(
             blocks: List[Block[Tuple[KeyType, AggType]]], key: GroupKeyT,
@@ -15,17 +15,29 @@ This is an all-to-all shuffle.
 Merging: a merge task would receive a block from every worker that consists
 of items in a certain range. It then merges the sorted blocks into one sorted
 block and becomes part of the new, sorted dataset.
+
+If external sort is enabled in the ``DatasetContext``, the number of merge
+tasks is chosen based on the size of the data instead of the number of input
+blocks, and each merge task streams its inputs through a k-way merge, emitting
+multiple output blocks of at most ``target_max_block_size`` bytes.
 """
-from typing import List, Any, Callable, TypeVar, Tuple, Union
+import math
+from typing import List, Any, Callable, Dict, TypeVar, Tuple, Union, \
+    TYPE_CHECKING
 
 import numpy as np
 import ray
 from ray.types import ObjectRef
-from ray.data.block import Block, BlockAccessor
+from ray.data.block import Block, BlockAccessor, BlockMetadata, \
+    BlockPartition, BlockExecStats
+from ray.data.context import DatasetContext
 from ray.data.impl.block_list import BlockList
 from ray.data.impl.progress_bar import ProgressBar
 from ray.data.impl.remote_fn import cached_remote_fn
 
+if TYPE_CHECKING:
+    import pyarrow
+
 T = TypeVar("T")
 
 # Data can be sorted by value (None), a list of columns and
@@ -33,67 +45,142 @@ T = TypeVar("T")
 # (Callable).
 SortKeyT = Union[None, List[Tuple[str, str]], Callable[[T], Any]]
 
+# The target input size of each merge task in an external sort, in multiples
+# of the target max block size.
+EXTERNAL_SORT_BLOCKS_PER_REDUCER = 4
+
 
 def sample_boundaries(blocks: List[ObjectRef[Block]], key: SortKeyT,
                       num_reducers: int) -> List[T]:
     """
-    Return (num_reducers - 1) items in ascending order from the blocks that
+    Return (num_reducers - 1) items in sort order from the blocks that
     partition the domain into ranges with approximately equally many elements.
+
+    For Arrow blocks, the items are in the order given by the sort key, and
+    are scalars for single-column keys or tuples for multi-column keys. For
+    simple blocks, the items are in ascending order.
     """
+    boundaries, _ = _sample_boundaries_with_metadata(blocks, key,
+                                                     num_reducers)
+    return boundaries
+
+
+def _sample_boundaries_with_metadata(
+        blocks: List[ObjectRef[Block]], key: SortKeyT,
+        num_reducers: int) -> Tuple[List[T], List[BlockMetadata]]:
+    """Like ``sample_boundaries``, but also return the metadata of the
+    sampled blocks with the exec stats of the sample tasks."""
     n_samples = int(num_reducers * 10 / len(blocks))
 
-    sample_block = cached_remote_fn(_sample_block)
+    sample_block = cached_remote_fn(_sample_block).options(num_returns=2)
 
     sample_results = [
         sample_block.remote(block, n_samples, key) for block in blocks
     ]
     sample_bar = ProgressBar("Sort Sample", len(sample_results))
-    sample_bar.block_until_complete(sample_results)
+    sample_metadata = sample_bar.fetch_until_complete(
+        [m for _, m in sample_results])
     sample_bar.close()
 
-    samples = ray.get(sample_results)
+    samples = ray.get([s for s, _ in sample_results])
     samples = [s for s in samples if len(s) > 0]
     # The dataset is empty
     if len(samples) == 0:
-        return [None] * (num_reducers - 1)
+        return [None] * (num_reducers - 1), sample_metadata
+    if isinstance(key, list):
+        return (_sample_arrow_boundaries(samples, key, num_reducers),
+                sample_metadata)
     sample_items = np.concatenate(samples)
     sample_items.sort()
-    ret = [
-        np.quantile(sample_items, q, interpolation="nearest")
-        for q in np.arange(0, 1, 1 / num_reducers)
+    indices = _quantile_indices(len(sample_items), num_reducers)
+    return list(sample_items[indices]), sample_metadata
+
+
+def _sample_arrow_boundaries(samples: List["pyarrow.Table"],
+                             key: List[Tuple[str, str]],
+                             num_reducers: int) -> List[Any]:
+    import pyarrow
+    import pyarrow.compute as pac
+
+    sample_table = pyarrow.concat_tables(samples, promote=True)
+    sample_table = sample_table.take(
+        pac.sort_indices(sample_table, sort_keys=key))
+    indices = _quantile_indices(sample_table.num_rows, num_reducers)
+    columns = [
+        sample_table.column(col).take(pyarrow.array(indices)).to_pylist()
+        for col, _ in key
     ]
-    return ret[1:]
+    if len(columns) == 1:
+        return columns[0]
+    return list(zip(*columns))
+
+
+def _quantile_indices(num_items: int, num_reducers: int) -> np.ndarray:
+    """Return the indices of the (num_reducers - 1) boundary quantiles.
+
+    This matches ``np.quantile(..., interpolation="nearest")`` over a sorted
+    array of ``num_items`` items, for the quantiles ``i / num_reducers``.
+    """
+    quantiles = np.arange(1, num_reducers) / num_reducers
+    return np.round(quantiles * (num_items - 1)).astype(np.int64)
 
 
-def sort_impl(blocks: BlockList, key: SortKeyT,
-              descending: bool = False) -> BlockList:
-    blocks = list(blocks.iter_blocks())
-    if len(blocks) == 0:
-        return BlockList([], [])
+def sort_impl(blocks: BlockList, key: SortKeyT, descending: bool = False
+              ) -> Tuple[BlockList, Dict[str, List[BlockMetadata]]]:
+    """Sort the given blocks.
+
+    Returns:
+        The sorted blocks, and the output metadata of each sort stage.
+    """
+    blocks_with_metadata = list(blocks.iter_blocks_with_metadata())
+    if len(blocks_with_metadata) == 0:
+        return BlockList([], []), {}
+    blocks, input_metadata = zip(*blocks_with_metadata)
+    blocks = list(blocks)
+    del blocks_with_metadata
 
     if isinstance(key, str):
         key = [(key, "descending" if descending else "ascending")]
 
+    if isinstance(key, list) and isinstance(key[0], str):
+        key = [(k, "descending" if descending else "ascending") for k in key]
+
     if isinstance(key, list):
         descending = key[0][1] == "descending"
 
+    context = DatasetContext.get_current()
     num_mappers = len(blocks)
-    num_reducers = num_mappers
-    boundaries = sample_boundaries(blocks, key, num_reducers)
-    if descending:
+    if context.use_external_sort:
+        num_reducers = _get_external_sort_num_reducers(
+            input_metadata, context.target_max_block_size)
+    else:
+        num_reducers = num_mappers
+    boundaries, sample_metadata = _sample_boundaries_with_metadata(
+        blocks, key, num_reducers)
+    if descending and not isinstance(key, list):
+        # Arrow boundaries are already in the (descending) sort order.
         boundaries.reverse()
 
+    # The last output of each map task is its metadata.
     sort_block = cached_remote_fn(_sort_block).options(
-        num_returns=num_reducers)
+        num_returns=num_reducers + 1)
     merge_sorted_blocks = cached_remote_fn(_merge_sorted_blocks, num_returns=2)
 
     map_results = np.empty((num_mappers, num_reducers), dtype=object)
+    map_metadata = []
     for i, block in enumerate(blocks):
-        map_results[i, :] = sort_block.remote(block, boundaries, key,
-                                              descending)
+        out = sort_block.remote(block, boundaries, key, descending)
+        map_results[i, :] = out[:-1]
+        map_metadata.append(out[-1])
     map_bar = ProgressBar("Sort Map", len(map_results))
-    map_bar.block_until_complete([ret[0] for ret in map_results])
+    map_metadata = map_bar.fetch_until_complete(map_metadata)
     map_bar.close()
+    stages = {"sort_sample": sample_metadata, "sort_map": map_metadata}
+
+    if context.use_external_sort:
+        blocks = _external_merge(map_results, key, descending, context)
+        stages["sort_merge"] = blocks.get_metadata()
+        return blocks, stages
 
     reduce_results = []
     for j in range(num_reducers):
@@ -106,21 +193,108 @@ def sort_impl(blocks: BlockList, key: SortKeyT,
 
     blocks = [b for b, _ in reduce_results]
     metadata = ray.get([m for _, m in reduce_results])
+    stages["sort_merge"] = metadata
+    return BlockList(blocks, metadata), stages
+
+
+def _get_external_sort_num_reducers(metadata: List[BlockMetadata],
+                                    target_max_block_size: int) -> int:
+    """Choose the number of merge tasks for an external sort.
+
+    Each merge task targets an input of ``EXTERNAL_SORT_BLOCKS_PER_REDUCER``
+    max-sized blocks, but at least one merge task per input block is used
+    (up to the number of CPUs in the cluster) to keep the cluster busy.
+    """
+    num_mappers = len(metadata)
+    if any(m.size_bytes is None for m in metadata):
+        # Fall back to the default if the input size is unknown.
+        return num_mappers
+    total_bytes = sum(m.size_bytes for m in metadata)
+    target_reducer_bytes = (
+        target_max_block_size * EXTERNAL_SORT_BLOCKS_PER_REDUCER)
+    num_cpus = int(ray.cluster_resources().get("CPU", 1))
+    return max(1, math.ceil(total_bytes / target_reducer_bytes),
+               min(num_mappers, num_cpus))
+
+
+def _external_merge(map_results: np.ndarray, key: SortKeyT, descending: bool,
+                    context: DatasetContext) -> BlockList:
+    num_reducers = map_results.shape[1]
+    merge_sorted_blocks = cached_remote_fn(_merge_sorted_blocks_streaming)
+    reduce_results = [
+        merge_sorted_blocks.remote(key, descending, context,
+                                   *map_results[:, j].tolist())
+        for j in range(num_reducers)
+    ]
+    # Eagerly delete the map output references in order to eagerly release
+    # the blocks' memory once merged.
+    del map_results
+    merge_bar = ProgressBar("Sort Merge", len(reduce_results))
+    partitions = merge_bar.fetch_until_complete(reduce_results)
+    merge_bar.close()
+
+    blocks = []
+    metadata = []
+    for partition in partitions:
+        for block, meta in partition:
+            blocks.append(block)
+            metadata.append(meta)
     return BlockList(blocks, metadata)
 
 
 def _sample_block(block: Block[T], n_samples: int,
-                  key: SortKeyT) -> np.ndarray:
-    return BlockAccessor.for_block(block).sample(n_samples, key)
+                  key: SortKeyT) -> (np.ndarray, BlockMetadata):
+    stats = BlockExecStats.builder()
+    accessor = BlockAccessor.for_block(block)
+    samples = accessor.sample(n_samples, key)
+    return samples, accessor.get_metadata(
+        input_files=None, exec_stats=stats.build())
 
 
 def _sort_block(block, boundaries, key, descending):
-    return BlockAccessor.for_block(block).sort_and_partition(
-        boundaries, key, descending)
+    stats = BlockExecStats.builder()
+    stats.add_input(block)
+    accessor = BlockAccessor.for_block(block)
+    partitions = accessor.sort_and_partition(boundaries, key, descending)
+    return partitions + [
+        accessor.get_metadata(input_files=None, exec_stats=stats.build())
+    ]
 
 
-def _merge_sorted_blocks(key, descending, *blocks: List[Block[T]]) -> Block[T]:
-    if len(blocks) == 1:
-        blocks = blocks[0]  # Python weirdness
-    return BlockAccessor.for_block(blocks[0]).merge_sorted_blocks(
+def _merge_sorted_blocks(key, descending,
+                         *blocks: List[Block[T]]) -> (Block[T], BlockMetadata):
+    stats = BlockExecStats.builder()
+    for block in blocks:
+        stats.add_input(block)
+    block, metadata = BlockAccessor.for_block(blocks[0]).merge_sorted_blocks(
         list(blocks), key, descending)
+    metadata.exec_stats = stats.build()
+    return block, metadata
+
+
+def _merge_sorted_blocks_streaming(key: SortKeyT, descending: bool,
+                                   context: DatasetContext,
+                                   *blocks: List[Block[T]]) -> BlockPartition:
+    DatasetContext._set_current(context)
+    stats = BlockExecStats.builder()
+    blocks = list(blocks)
+    for block in blocks:
+        stats.add_input(block)
+    accessor = BlockAccessor.for_block(blocks[0])
+    partition: BlockPartition = []
+    for block in accessor.iter_merge_sorted_blocks(
+            blocks, key, descending, context.target_max_block_size):
+        metadata = BlockAccessor.for_block(block).get_metadata(
+            input_files=None, exec_stats=stats.build())
+        partition.append((ray.put(block, _owner=context.block_owner),
+                          metadata))
+        # Attribute the time until the next output block to that block.
+        stats = BlockExecStats.builder()
+    if len(partition) == 0:
+        # All inputs were empty, return an empty block of the same type.
+        block = accessor.builder().build()
+        metadata = BlockAccessor.for_block(block).get_metadata(
+            input_files=None, exec_stats=stats.build())
+        partition.append((ray.put(block, _owner=context.block_owner),
+                          metadata))
+    return partition
@@ -0,0 +1,103 @@
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from ray.data.block import BlockMetadata
+
+# The metadata of the blocks output by a stage, or a function that returns it
+# once the stage is executed (e.g., for lazily executed reads).
+StageMetadataT = Union[List[BlockMetadata], Callable[[], List[BlockMetadata]]]
+
+
+class DatasetStats:
+    """Holds the execution stats of a Dataset.
+
+    The stats of a Dataset consist of the stats of the stages that produced
+    it, and the stats of its parent Dataset (if any). The stats of a stage are
+    derived from the ``BlockMetadata.exec_stats`` of its output blocks.
+    """
+
+    def __init__(self,
+                 *,
+                 stages: Dict[str, StageMetadataT],
+                 parent: Optional["DatasetStats"] = None,
+                 time_total_s: Optional[float] = None):
+        """Create dataset stats.
+
+        Args:
+            stages: Dict of stage name to the metadata of the stage outputs.
+            parent: The stats of the parent Dataset, or None.
+            time_total_s: The driver-side wall time of the stages, or None.
+        """
+        self.stages: Dict[str, StageMetadataT] = stages
+        self.parent: Optional["DatasetStats"] = parent
+        self.time_total_s: Optional[float] = time_total_s
+
+    def summary_string(self) -> str:
+        """Return a human-readable summary of this Dataset's stats."""
+        out = ""
+        if self.parent is not None:
+            out = self.parent.summary_string()
+        for name, metadata in self.stages.items():
+            if callable(metadata):
+                metadata = metadata()
+            if out:
+                out += "\n"
+            out += "Stage {}:\n".format(name)
+            out += _summarize_stage(metadata)
+        if self.time_total_s is not None and self.stages:
+            out += "* Total stage time: {}\n".format(_fmt_s(self.time_total_s))
+        return out
+
+    def __repr__(self) -> str:
+        return "DatasetStats(stages={}, parent={})".format(
+            list(self.stages), self.parent)
+
+
+def _summarize_stage(metadata: List[BlockMetadata]) -> str:
+    exec_stats = [m.exec_stats for m in metadata if m.exec_stats is not None]
+    out = "* {} blocks executed by {} tasks\n".format(
+        len(metadata), len(exec_stats))
+    if exec_stats:
+        wall_time = np.array([s.wall_time_s for s in exec_stats])
+        cpu_time = np.array([s.cpu_time_s for s in exec_stats])
+        out += "* Wall time: {} min, {} max, {} mean, {} total\n".format(
+            _fmt_s(wall_time.min()), _fmt_s(wall_time.max()),
+            _fmt_s(wall_time.mean()), _fmt_s(wall_time.sum()))
+        out += "* CPU time: {} min, {} max, {} mean, {} total\n".format(
+            _fmt_s(cpu_time.min()), _fmt_s(cpu_time.max()),
+            _fmt_s(cpu_time.mean()), _fmt_s(cpu_time.sum()))
+        input_rows = [s.input_rows for s in exec_stats]
+        if all(r is not None for r in input_rows):
+            out += "* Input rows: {} total\n".format(sum(input_rows))
+        input_bytes = [s.input_bytes for s in exec_stats]
+        if all(b is not None for b in input_bytes):
+            out += "* Input size bytes: {} total\n".format(sum(input_bytes))
+    output_rows = [m.num_rows for m in metadata]
+    if output_rows and all(r is not None for r in output_rows):
+        out += "* Output rows: {} min, {} max, {} mean, {} total\n".format(
+            min(output_rows), max(output_rows),
+            int(np.mean(output_rows)), sum(output_rows))
+    output_bytes = [m.size_bytes for m in metadata]
+    if output_bytes and all(b is not None for b in output_bytes):
+        out += ("* Output size bytes: {} min, {} max, {} mean, {} total\n".
+                format(
+                    min(output_bytes), max(output_bytes),
+                    int(np.mean(output_bytes)), sum(output_bytes)))
+    return out
+
+
+def _fmt_s(seconds: float) -> str:
+    if seconds > 1:
+        return "{}s".format(round(seconds, 2))
+    return "{}ms".format(round(seconds * 1000, 2))
+
+
+def _get_object_store_summary() -> str:
+    """Return the cluster-wide object store stats, including spilling."""
+    from ray.internal.internal_api import memory_summary
+    try:
+        return memory_summary(stats_only=True)
+    except Exception:
+        # The stats are best-effort, e.g., the raylet may be unreachable.
+        return ""
@@ -1,12 +1,29 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import itertools
 import logging
-from typing import List, Dict, Any
+import math
+import queue
+import threading
+import zlib
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, \
+    Tuple, TypeVar, TYPE_CHECKING
 
+import numpy as np
+
+import ray
 from ray.remote_function import DEFAULT_REMOTE_FUNCTION_CPUS
+from ray.types import ObjectRef
 import ray.ray_constants as ray_constants
 
+if TYPE_CHECKING:
+    from ray.data.aggregate import AggregateFn
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+U = TypeVar("U")
+
 MIN_PYARROW_VERSION = (4, 0, 1)
 _VERSION_VALIDATED = False
 
@@ -98,3 +115,216 @@ def _filtered_resources(nodes: List[Dict[str, Any]], include_prefix: str,
     ]
     # Ensure stable ordering of unique resources.
     return sorted(set(resources))
+
+
+def _get_locality_resources(blocks: List[ObjectRef],
+                            ray_remote_args: Dict[str, Any]
+                            ) -> List[Dict[str, float]]:
+    """Returns a node resource request for each of the given blocks, which
+    schedules the block's task on a node that holds the block.
+    """
+    return _assign_block_nodes(
+        blocks, ray.experimental.get_object_locations(blocks), ray.nodes(),
+        ray_remote_args)
+
+
+def _assign_block_nodes(blocks: List[ObjectRef],
+                        block_locations: Dict[ObjectRef, Dict[str, Any]],
+                        nodes: List[Dict[str, Any]],
+                        ray_remote_args: Dict[str, Any]
+                        ) -> List[Dict[str, float]]:
+    """Assigns each block to a node, returning the node resource request of
+    each block's task.
+
+    Each block is assigned to the least loaded node that holds it. A node is
+    saturated once it has been assigned its share of the blocks, in
+    proportion to its CPUs; the blocks that are held only by saturated nodes
+    (or whose locations are unknown) are spread over the least loaded nodes.
+    Nodes that don't have the resources requested by the tasks are never
+    assigned blocks.
+    """
+    resource_request_labels = _get_resource_request_labels(ray_remote_args)
+    node_labels = {}
+    node_cpus = {}
+    for node in nodes:
+        if not node.get("Alive", True):
+            continue
+        resources = node["Resources"]
+        if not resource_request_labels <= set(resources.keys()):
+            continue
+        label = "node:{}".format(node["NodeManagerAddress"])
+        if label not in resources:
+            continue
+        node_labels[node["NodeID"]] = label
+        node_cpus[node["NodeID"]] = max(resources.get("CPU", 0), 1)
+    if not node_labels:
+        return [{} for _ in blocks]
+
+    total_cpus = sum(node_cpus.values())
+    limits = {
+        node_id: math.ceil(len(blocks) * cpus / total_cpus)
+        for node_id, cpus in node_cpus.items()
+    }
+    assigned = {node_id: 0 for node_id in node_labels}
+
+    def load(node_id: str) -> float:
+        return assigned[node_id] / limits[node_id]
+
+    assignments = [None] * len(blocks)
+    overflow = []
+    for i, block in enumerate(blocks):
+        node_ids = [
+            node_id
+            for node_id in block_locations.get(block, {}).get("node_ids", [])
+            if node_id in assigned and assigned[node_id] < limits[node_id]
+        ]
+        if node_ids:
+            node_id = min(node_ids, key=load)
+            assigned[node_id] += 1
+            assignments[i] = node_id
+        else:
+            overflow.append(i)
+    for i in overflow:
+        node_id = min(assigned, key=load)
+        assigned[node_id] += 1
+        assignments[i] = node_id
+    return [{node_labels[node_id]: 0.001} for node_id in assignments]
+
+
+def _hash_key(key: Any) -> int:
+    """Hash a groupby key consistently across processes.
+
+    Python's ``hash()`` of strings and bytes is salted per process, so it
+    can't be used to assign keys to reducers from different map tasks.
+    """
+    if key is None:
+        return 0
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    if isinstance(key, bytes):
+        return zlib.crc32(key)
+    if isinstance(key, tuple):
+        h = len(key)
+        for k in key:
+            h = (h * 31 + _hash_key(k)) & 0xFFFFFFFF
+        return h
+    if isinstance(key, (int, float, np.number)):
+        # Numeric hashes aren't salted, and are equal for equal values.
+        return hash(key)
+    return zlib.crc32(repr(key).encode())
+
+
+def _accumulate_by_key(rows: Iterable[Any], key_fn: Callable[[Any], Any],
+                       aggs: Tuple["AggregateFn"]) -> Dict[Any, List[Any]]:
+    """Accumulate the given rows into an accumulator per key and aggregation.
+
+    Unlike ``BlockAccessor.combine()``, the rows don't need to be sorted.
+    """
+    accumulators = {}
+    for row in rows:
+        k = key_fn(row)
+        accs = accumulators.get(k)
+        if accs is None:
+            accs = [agg.init(k) for agg in aggs]
+            accumulators[k] = accs
+        for i, agg in enumerate(aggs):
+            accs[i] = agg.accumulate(accs[i], row)
+    return accumulators
+
+
+def _split_by_size(sizes: List[int], parallelism: int) -> List[List[int]]:
+    """Split items into up to ``parallelism`` splits of about equal size.
+
+    The splits are contiguous ranges of the items, so that the order of the
+    items is preserved. Each item is assigned to the split that contains the
+    midpoint of its byte range, so a large item gets a split of its own.
+
+    Returns:
+        The indices of the items in each non-empty split.
+    """
+    total = sum(sizes)
+    splits = [[] for _ in range(parallelism)]
+    offset = 0
+    for i, size in enumerate(sizes):
+        if total > 0:
+            j = int((offset + size / 2) / total * parallelism)
+        else:
+            j = i * parallelism // len(sizes)
+        offset += size
+        splits[min(j, parallelism - 1)].append(i)
+    return [split for split in splits if split]
+
+
+def _map_concurrently(fn: Callable[[T], U], items: Iterable[T],
+                      num_threads: int) -> Iterator[U]:
+    """Apply fn to the items with a pool of up to num_threads threads.
+
+    At most num_threads items are in flight at any time, and the results are
+    yielded in the order of the items.
+    """
+    if num_threads <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        futures = collections.deque()
+        for item in items:
+            if len(futures) >= num_threads:
+                yield futures.popleft().result()
+            futures.append(executor.submit(fn, item))
+        while futures:
+            yield futures.popleft().result()
+
+
+# Marks the end of the results of _map_in_background().
+_END_OF_RESULTS = object()
+# The name of the background threads of _map_in_background().
+_BACKGROUND_THREAD_NAME = "DatasetBackgroundMap"
+
+
+def _map_in_background(fn: Callable[[T], U], items: Iterable[T],
+                       num_threads: int) -> Iterator[U]:
+    """Apply fn to the items ahead of the consumer of the results.
+
+    The items are iterated over by a background thread, which applies fn to
+    them with a pool of up to num_threads threads. Up to num_threads results
+    are buffered ahead of the consumer, and they are yielded in the order of
+    the items. Any error raised by the items or fn is reraised to the
+    consumer.
+    """
+    results = queue.Queue(maxsize=num_threads)
+    stopped = threading.Event()
+
+    def put(result: Tuple[Any, Optional[Exception]]) -> bool:
+        # Give up once the consumer has stopped iterating.
+        while not stopped.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for result in _map_concurrently(fn, items, num_threads):
+                if not put((result, None)):
+                    return
+        except Exception as e:
+            put((_END_OF_RESULTS, e))
+        else:
+            put((_END_OF_RESULTS, None))
+
+    thread = threading.Thread(
+        target=produce, name=_BACKGROUND_THREAD_NAME, daemon=True)
+    thread.start()
+    try:
+        while True:
+            result, error = results.get()
+            if error is not None:
+                raise error
+            if result is _END_OF_RESULTS:
+                return
+            yield result
+    finally:
+        stopped.set()
@@ -6,6 +6,7 @@ from typing import List, Any, Dict, Union, Optional, Tuple, Callable, \
 import numpy as np
 if TYPE_CHECKING:
     import pyarrow
+    import pyarrow.dataset
     import pandas
     import dask
     import mars
@@ -24,9 +25,11 @@ from ray.data.datasource import Datasource, RangeDatasource, \
 from ray.data.impl.arrow_block import ArrowRow, \
     DelegatingArrowBlockBuilder
 from ray.data.impl.block_list import BlockList
+from ray.data.impl.cache import Lineage
 from ray.data.impl.lazy_block_list import LazyBlockList, BlockPartition, \
     BlockPartitionMetadata
 from ray.data.impl.remote_fn import cached_remote_fn
+from ray.data.impl.stats import DatasetStats
 from ray.data.impl.util import _get_spread_resources_iter
 
 T = TypeVar("T")
@@ -202,7 +205,12 @@ def read_datasource(datasource: Datasource[T],
     if metadata and metadata[0].schema is None:
         block_list.ensure_schema_for_first_block()
 
-    return Dataset(block_list, 0)
+    stats = DatasetStats(stages={"read": block_list._get_executed_metadata})
+    return Dataset(
+        block_list,
+        0,
+        stats,
+        _lineage=Lineage(("read", datasource, parallelism, read_args)))
 
 
 @PublicAPI(stability="beta")
@@ -210,6 +218,7 @@ def read_parquet(paths: Union[str, List[str]],
                  *,
                  filesystem: Optional["pyarrow.fs.FileSystem"] = None,
                  columns: Optional[List[str]] = None,
+                 filter: Optional["pyarrow.dataset.Expression"] = None,
                  parallelism: int = 200,
                  ray_remote_args: Dict[str, Any] = None,
                  _tensor_column_schema: Optional[Dict[str, Tuple[
@@ -224,10 +233,18 @@ def read_parquet(paths: Union[str, List[str]],
         >>> # Read multiple local files.
         >>> ray.data.read_parquet(["/path/to/file1", "/path/to/file2"])
 
+        >>> # Only read the rows of the given dates.
+        >>> import pyarrow.dataset as pds
+        >>> ray.data.read_parquet(
+        ...     "s3://bucket/path", filter=pds.field("date") >= "2021-12-01")
+
     Args:
         paths: A single file path or a list of file paths (or directories).
         filesystem: The filesystem implementation to read from.
         columns: A list of column names to read.
+        filter: A pyarrow dataset expression to filter the rows by. Row
+            groups that can't match the filter according to their statistics
+            are skipped without being read.
         parallelism: The requested parallelism of the read. Parallelism may be
             limited by the number of files of the dataset.
         ray_remote_args: kwargs passed to ray.remote in the read tasks.
@@ -274,6 +291,7 @@ def read_parquet(paths: Union[str, List[str]],
         paths=paths,
         filesystem=filesystem,
         columns=columns,
+        filter=filter,
         ray_remote_args=ray_remote_args,
         **arrow_parquet_args)
 
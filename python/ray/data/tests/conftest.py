@@ -5,6 +5,8 @@ import pyarrow as pa
 
 import ray
 
+from ray.data.context import DatasetContext
+from ray.data.impl.cache import clear_memory_cache
 from ray.data.tests.mock_server import *  # noqa
 from ray.data.datasource.file_based_datasource import BlockWritePathProvider
 
@@ -92,3 +94,74 @@ def test_block_write_path_provider():
             return f"{base_path}/{suffix}"
 
     yield TestBlockWritePathProvider()
+
+
+@pytest.fixture(scope="function")
+def use_push_based_shuffle():
+    ctx = DatasetContext.get_current()
+    original = ctx.use_push_based_shuffle
+    ctx.use_push_based_shuffle = True
+    yield
+    ctx.use_push_based_shuffle = original
+
+
+@pytest.fixture(scope="function")
+def use_external_sort():
+    ctx = DatasetContext.get_current()
+    original = ctx.use_external_sort
+    ctx.use_external_sort = True
+    yield
+    ctx.use_external_sort = original
+
+
+@pytest.fixture(scope="function")
+def locality_aware_scheduling():
+    ctx = DatasetContext.get_current()
+    original = ctx.locality_aware_scheduling
+    ctx.locality_aware_scheduling = True
+    yield
+    ctx.locality_aware_scheduling = original
+
+
+@pytest.fixture(scope="function")
+def streaming_pipeline_executor():
+    ctx = DatasetContext.get_current()
+    original = ctx.use_streaming_pipeline_executor
+    ctx.use_streaming_pipeline_executor = True
+    yield
+    ctx.use_streaming_pipeline_executor = original
+
+
+@pytest.fixture(scope="function")
+def block_splitting_enabled():
+    ctx = DatasetContext.get_current()
+    original = (ctx.block_splitting_enabled, ctx.target_max_block_size)
+    ctx.block_splitting_enabled = True
+    ctx.target_max_block_size = 1024
+    yield
+    ctx.block_splitting_enabled, ctx.target_max_block_size = original
+
+
+@pytest.fixture(scope="function")
+def dataset_cache(tmp_path):
+    ctx = DatasetContext.get_current()
+    original = (ctx.cache_dir, ctx.cache_max_disk_bytes,
+                ctx.cache_max_memory_bytes)
+    ctx.cache_dir = str(tmp_path / "dataset_cache")
+    ctx.cache_max_disk_bytes = 1024 * 1024
+    ctx.cache_max_memory_bytes = 1024 * 1024
+    clear_memory_cache()
+    yield ctx.cache_dir
+    clear_memory_cache()
+    (ctx.cache_dir, ctx.cache_max_disk_bytes,
+     ctx.cache_max_memory_bytes) = original
+
+
+@pytest.fixture(scope="function")
+def write_coalescing_enabled():
+    ctx = DatasetContext.get_current()
+    original = (ctx.write_target_file_size, ctx.write_max_concurrent_tasks)
+    ctx.write_target_file_size = 1024 * 1024
+    ctx.write_max_concurrent_tasks = 2
+    yield
+    ctx.write_target_file_size, ctx.write_max_concurrent_tasks = original
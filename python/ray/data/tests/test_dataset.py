@@ -3,6 +3,9 @@ import os
 import random
 import requests
 import shutil
+import subprocess
+import sys
+import threading
 import time
 
 from unittest.mock import patch
@@ -17,6 +20,8 @@ from pytest_lazyfixture import lazy_fixture
 import ray
 
 from ray.tests.conftest import *  # noqa
+from ray._private.test_utils import wait_for_condition
+from ray.data.context import DatasetContext
 from ray.data.dataset import Dataset
 from ray.data.datasource import DummyOutputDatasource
 from ray.data.datasource.csv_datasource import CSVDatasource
@@ -24,8 +29,9 @@ from ray.data.block import BlockAccessor
 from ray.data.impl.block_list import BlockList
 from ray.data.aggregate import AggregateFn, Count, Sum, Min, Max, Mean, Std
 from ray.data.datasource.file_based_datasource import _unwrap_protocol
+from ray.data.impl.util import _split_by_size, _BACKGROUND_THREAD_NAME
 from ray.data.datasource.parquet_datasource import (
-    PARALLELIZE_META_FETCH_THRESHOLD)
+    PARALLELIZE_META_FETCH_THRESHOLD, _split_row_groups)
 from ray.data.extensions.tensor_extension import (
     TensorArray, TensorDtype, ArrowTensorType, ArrowTensorArray)
 import ray.data.tests.util as util
@@ -150,6 +156,89 @@ def test_callable_classes(shutdown_only):
     assert len(actor_reuse) == 10, actor_reuse
 
 
+def test_actor_pool_strategy(ray_start_regular_shared):
+    from ray.data import ActorPoolStrategy
+
+    class StatefulFn:
+        def __init__(self):
+            self.num_reuses = 0
+
+        def __call__(self, batch):
+            self.num_reuses += 1
+            return [x + 1 for x in batch]
+
+    strategy = ActorPoolStrategy(
+        min_size=1, max_size=2, max_tasks_in_flight_per_actor=4)
+    ds = ray.data.range(100, parallelism=20)
+    out = ds.map_batches(StatefulFn, compute=strategy).take_all()
+    # Block order is preserved.
+    assert out == list(range(1, 101)), out
+    stats = strategy.stats
+    assert 1 <= stats.num_actors <= 2, stats
+    assert stats.peak_actors <= 2, stats
+    assert sum(stats.blocks_per_actor) == 20, stats
+    assert 0 <= stats.utilization() <= 1, stats
+
+    # Fixed size pool.
+    strategy = ActorPoolStrategy(min_size=2, max_size=2)
+    ds = ray.data.range(10, parallelism=5).map(
+        lambda x: x * 2, compute=strategy)
+    assert ds.take_all() == [x * 2 for x in range(10)]
+    assert strategy.stats.num_actors == 2, strategy.stats
+
+    with pytest.raises(ValueError):
+        ActorPoolStrategy(min_size=0)
+    with pytest.raises(ValueError):
+        ActorPoolStrategy(min_size=4, max_size=2)
+    with pytest.raises(ValueError):
+        ActorPoolStrategy(max_tasks_in_flight_per_actor=0)
+
+
+def test_dataset_stats(ray_start_regular_shared):
+    ds = ray.data.range(1000, parallelism=10)
+    ds = ds.map_batches(lambda batch: [x + 1 for x in batch])
+    ds = ds.random_shuffle().sort()
+    stats = ds.stats()
+    for stage in [
+            "read", "map_batches", "shuffle_map", "shuffle_reduce",
+            "sort_sample", "sort_map", "sort_merge"
+    ]:
+        assert "Stage {}:".format(stage) in stats, stats
+    assert stats.index("Stage read:") < stats.index("Stage map_batches:")
+    assert stats.index("Stage map_batches:") < stats.index(
+        "Stage shuffle_map:")
+    assert "10 blocks executed by 10 tasks" in stats, stats
+    assert "Wall time:" in stats, stats
+    assert "CPU time:" in stats, stats
+    assert "Input rows: 1000 total" in stats, stats
+    assert "Output rows:" in stats, stats
+
+    # Per-block exec stats are carried with the block metadata.
+    ds = ray.data.range_arrow(100, parallelism=4).map(lambda r: r)
+    for meta in ds._blocks.get_metadata():
+        assert meta.exec_stats.wall_time_s >= 0
+        assert meta.exec_stats.cpu_time_s >= 0
+        assert meta.exec_stats.input_rows == 25
+        assert meta.exec_stats.input_bytes > 0
+
+    # Stats are kept for datasets without recorded stages.
+    assert ray.data.from_items([1, 2, 3]).stats() is not None
+
+
+def test_read_stats(ray_start_regular_shared, tmp_path):
+    for i in range(3):
+        df = pd.DataFrame({"one": list(range(10))})
+        df.to_csv(os.path.join(tmp_path, f"{i}.csv"), index=False)
+    ds = ray.data.read_csv(str(tmp_path), parallelism=3)
+    assert ds.count() == 30
+    assert sorted(r["one"] for r in ds.take_all()) == sorted(
+        list(range(10)) * 3)
+    stats = ds.stats()
+    assert "Stage read:" in stats, stats
+    assert "3 blocks executed by 3 tasks" in stats, stats
+    assert "Output rows: 10 min, 10 max, 10 mean, 30 total" in stats, stats
+
+
 def test_transform_failure(shutdown_only):
     ray.init(num_cpus=2)
     ds = ray.data.from_items([0, 10], parallelism=2)
@@ -159,8 +248,39 @@ def test_transform_failure(shutdown_only):
         raise ValueError("oops")
         return x
 
+    # Transforms are lazy, so the failure is raised on consumption.
+    ds = ds.map(mapper)
     with pytest.raises(ray.exceptions.RayTaskError):
-        ds.map(mapper)
+        ds.take()
+
+
+def test_operator_fusion(ray_start_regular_shared):
+    ds = ray.data.range(10, parallelism=2)
+    ds = ds.map(lambda x: x + 1).filter(lambda x: x % 2 == 0)
+    ds = ds.flat_map(lambda x: [x, -x]).map_batches(
+        lambda batch: [x * 10 for x in batch])
+    # All transforms are fused into one stage, and not yet executed.
+    assert len(ds._plan._stages) == 1, ds._plan
+    assert not ds._plan.is_executed()
+    assert ds.num_blocks() == 2
+    assert not ds._plan.is_executed()
+    assert sorted(ds.take()) == sorted(
+        [v for x in range(2, 11, 2) for v in [x * 10, -x * 10]])
+    assert ds._plan.is_executed()
+
+    # Transforms are applied once, and reused after execution.
+    ds2 = ds.map(lambda x: x + 1)
+    assert len(ds2._plan._stages) == 1, ds2._plan
+    assert ds2.sum() == 10
+
+    # Transforms with different resources or actors aren't fused.
+    ds = ray.data.range(10).map(lambda x: x + 1)
+    ds = ds.map(lambda x: x * 2, num_cpus=0.5)
+    assert len(ds._plan._stages) == 2, ds._plan
+    ds = ds.map(lambda x: x * 2, compute="actors")
+    ds = ds.map(lambda x: x * 2, compute="actors")
+    assert len(ds._plan._stages) == 4, ds._plan
+    assert sorted(ds.take()) == [(x + 1) * 16 for x in range(10)]
 
 
 @pytest.mark.parametrize(
@@ -739,14 +859,8 @@ def test_tensors_in_tables_parquet_bytes_with_schema(ray_start_regular_shared,
         np.testing.assert_equal(v, e)
 
 
-@pytest.mark.skip(
-    reason=("Waiting for pytorch to support tensor creation from objects that "
-            "implement the __array__ interface. See "
-            "https://github.com/pytorch/pytorch/issues/51156"))
 @pytest.mark.parametrize("pipelined", [False, True])
 def test_tensors_in_tables_to_torch(ray_start_regular_shared, pipelined):
-    import torch
-
     outer_dim = 3
     inner_shape = (2, 2, 2)
     shape = (outer_dim, ) + inner_shape
@@ -763,18 +877,65 @@ def test_tensors_in_tables_to_torch(ray_start_regular_shared, pipelined):
         "two": TensorArray(arr2),
         "label": [4.0, 5.0, 6.0]
     })
-    df = pd.concat([df1, df2])
     ds = ray.data.from_pandas([df1, df2])
     ds = maybe_pipeline(ds, pipelined)
     torchd = ds.to_torch(label_column="label", batch_size=2)
 
-    num_epochs = 2
+    # The tensor column is flattened into the features.
+    expected = np.concatenate(
+        [
+            np.arange(1, 7).reshape(-1, 1),
+            np.concatenate([arr, arr2]).reshape(6, -1),
+            np.arange(1.0, 7.0).reshape(-1, 1),
+        ],
+        axis=1)
+    num_epochs = 1 if pipelined else 2
     for _ in range(num_epochs):
         iterations = []
-        for batch in iter(torchd):
-            iterations.append(torch.cat((*batch[0], batch[1]), axis=1).numpy())
-        combined_iterations = np.concatenate(iterations)
-        assert np.array_equal(np.sort(df.values), np.sort(combined_iterations))
+        for features, label in iter(torchd):
+            assert features.shape == (2, 9)
+            iterations.append(
+                np.concatenate((features.numpy(), label.numpy()), axis=1))
+        assert np.array_equal(np.concatenate(iterations), expected)
+
+    # A single tensor feature column keeps its shape.
+    ds = maybe_pipeline(ray.data.from_pandas([df1, df2]), pipelined)
+    torchd = ds.to_torch(
+        label_column="label", feature_columns=["two"], batch_size=3)
+    features = [f.numpy() for f, _ in iter(torchd)]
+    assert [f.shape for f in features] == [(3, 2, 2, 2)] * 2
+    np.testing.assert_array_equal(
+        np.concatenate(features), np.concatenate([arr, arr2]))
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_iter_batches_numpy(ray_start_regular_shared, pipelined):
+    outer_dim = 4
+    inner_shape = (2, 3)
+    arr = np.arange(outer_dim * 6).reshape((outer_dim, ) + inner_shape)
+    df = pd.DataFrame({"one": [1, 2, 3, 4], "two": TensorArray(arr)})
+    ds = ray.data.from_pandas([df.iloc[:2], df.iloc[2:]])
+    ds = maybe_pipeline(ds, pipelined)
+    batches = list(ds.iter_batches(batch_size=2, batch_format="numpy"))
+    assert len(batches) == 2
+    for i, batch in enumerate(batches):
+        assert set(batch) == {"one", "two"}
+        np.testing.assert_array_equal(batch["one"], [2 * i + 1, 2 * i + 2])
+        np.testing.assert_array_equal(batch["two"], arr[2 * i:2 * i + 2])
+        # Batches within a block are views over the block buffers.
+        assert not batch["two"].flags.owndata
+
+    # Batches across blocks are concatenated.
+    ds = maybe_pipeline(
+        ray.data.from_pandas([df.iloc[:1], df.iloc[1:]]), pipelined)
+    batches = list(ds.iter_batches(batch_size=4, batch_format="numpy"))
+    np.testing.assert_array_equal(batches[0]["two"], arr)
+
+    # Simple blocks are returned as a single ndarray.
+    ds = maybe_pipeline(ray.data.range(10, parallelism=2), pipelined)
+    batches = list(ds.iter_batches(batch_size=5, batch_format="numpy"))
+    for i, batch in enumerate(batches):
+        np.testing.assert_array_equal(batch, np.arange(5 * i, 5 * i + 5))
 
 
 @pytest.mark.skip(
@@ -1096,6 +1257,119 @@ def test_repartition_shuffle_arrow(ray_start_regular_shared):
     assert large._block_sizes() == [500] * 20
 
 
+def test_block_splitting(ray_start_regular_shared, block_splitting_enabled,
+                         tmp_path):
+    # Expand each row 50x, which overflows the 1KiB target block size.
+    ds = ray.data.range(100, parallelism=2)
+    ds = ds.flat_map(lambda x: [x] * 50)
+    assert len(ds.get_internal_block_refs()) > 2
+    assert ds.count() == 5000
+    assert ds.take(60) == [0] * 50 + [1] * 10
+    assert sum(ds._block_sizes()) == 5000
+
+    ds = ray.data.range(100, parallelism=2).map_batches(
+        lambda batch: batch * 50, batch_size=10)
+    assert len(ds.get_internal_block_refs()) > 2
+    assert ds.count() == 5000
+
+    # Actor pools also split their output blocks.
+    ds = ray.data.range(100, parallelism=2).flat_map(
+        lambda x: [x] * 50, compute="actors")
+    assert len(ds.get_internal_block_refs()) > 2
+    assert ds.take(60) == [0] * 50 + [1] * 10
+
+    # Empty outputs are still returned as a single empty block.
+    ds = ray.data.range(100, parallelism=2).flat_map(lambda x: [])
+    assert len(ds.get_internal_block_refs()) == 2
+    assert ds.count() == 0
+
+    ds = ray.data.range(5000, parallelism=1).repartition(2, shuffle=True)
+    assert len(ds.get_internal_block_refs()) > 2
+    assert sorted(ds.take_all()) == list(range(5000))
+
+    df = pd.DataFrame({"one": list(range(1000)), "two": ["a"] * 1000})
+    for i in range(4):
+        df.to_csv(os.path.join(tmp_path, f"{i}.csv"), index=False)
+    ds = ray.data.read_csv(str(tmp_path), parallelism=1)
+    assert len(ds.get_internal_block_refs()) > 1
+    assert ds.count() == 4000
+
+
+def test_cache(ray_start_regular_shared, dataset_cache):
+    def double(batch):
+        return batch * 2
+
+    def make_ds(n):
+        return ray.data.range_arrow(n, parallelism=4).map_batches(
+            double, batch_format="pandas")
+
+    # Datasets with the same lineage share a memory cache entry.
+    ds = make_ds(100).cache()
+    assert ds._plan.lineage_key == make_ds(100)._plan.lineage_key
+    assert ds._plan.lineage_key != make_ds(200)._plan.lineage_key
+    cached = make_ds(100).cache()
+    assert cached.get_internal_block_refs() == ds.get_internal_block_refs()
+    assert cached.take_all() == [{"value": i * 2} for i in range(100)]
+
+    # Disk cache entries are read back by recreated datasets.
+    ds = make_ds(100).cache(storage="disk")
+    key = ds._plan.lineage_key
+    assert os.listdir(dataset_cache) == [key]
+    cached = make_ds(100).cache(storage="disk")
+    assert "Stage cache_read" in cached.stats()
+    assert cached.take_all() == [{"value": i * 2} for i in range(100)]
+
+    # The least recently used entries are evicted over the disk budget.
+    keys = []
+    for n in [50000, 50001, 50002]:
+        keys.append(make_ds(n).cache(storage="disk")._plan.lineage_key)
+    entries = os.listdir(dataset_cache)
+    assert key not in entries
+    assert keys[0] not in entries
+    assert keys[2] in entries
+
+    # Lineage keys are only computed by cache(), and transforms that
+    # reference large objects make the lineage unknown.
+    array = np.zeros((2000, 2000))
+    ds = make_ds(10).map_batches(
+        lambda batch: batch + array[0, 0], batch_format="pandas")
+    assert not ds._plan.lineage._hashed
+    assert ds._plan.lineage_key is None
+
+    # Datasets of unknown lineage are only materialized in memory.
+    ds = ray.data.from_items(list(range(10)))
+    assert ds._plan.lineage_key is None
+    assert ds.cache().take_all() == list(range(10))
+    with pytest.raises(ValueError):
+        ds.cache(storage="disk")
+    with pytest.raises(ValueError):
+        make_ds(10).cache(storage="gpu")
+
+
+def test_cache_key_stable_across_jobs():
+    script = """
+from ray.data.impl.cache import lineage_token
+
+SCALE = 2
+
+class Scale:
+    def __call__(self, batch):
+        return batch * SCALE
+
+print(lineage_token("map_batches", Scale, 4096, "pandas"),
+      lineage_token("map", lambda row: row * SCALE))
+"""
+    keys = [
+        subprocess.check_output([sys.executable, "-c", script])
+        for _ in range(2)
+    ]
+    assert keys[0] == keys[1]
+    changed = subprocess.check_output(
+        [sys.executable, "-c",
+         script.replace("SCALE = 2", "SCALE = 3")])
+    assert set(changed.split()).isdisjoint(keys[0].split())
+
+
 def test_from_pandas(ray_start_regular_shared):
     df1 = pd.DataFrame({"one": [1, 2, 3], "two": ["a", "b", "c"]})
     df2 = pd.DataFrame({"one": [4, 5, 6], "two": ["e", "f", "g"]})
@@ -1415,13 +1689,15 @@ def test_parquet_read_partitioned_with_filter(ray_start_regular_shared,
     assert ds._blocks._num_computed() == 1
     assert sorted(values) == [[1, "a"], [1, "a"]]
 
-    # 2 partitions, 1 empty partition, 2 block/read tasks, 1 empty block
+    # 2 partitions, 1 partition pruned by the row group statistics, 1
+    # block/read task
 
     ds = ray.data.read_parquet(
         str(tmp_path), parallelism=2, filter=(pa.dataset.field("two") == "a"))
 
     values = [[s["one"], s["two"]] for s in ds.take()]
-    assert ds._blocks._num_computed() == 2
+    assert ds.num_blocks() == 1
+    assert ds._blocks._num_computed() == 1
     assert sorted(values) == [[1, "a"], [1, "a"]]
 
 
@@ -1461,7 +1737,7 @@ def test_parquet_read_with_udf(ray_start_regular_shared, tmp_path):
     assert ds._blocks._num_computed() == 2
     np.testing.assert_array_equal(sorted(ones), np.array(one_data) + 1)
 
-    # 2 blocks/read tasks, 1 empty block
+    # 2 partitions pruned by the filter, 1 block/read task
 
     ds = ray.data.read_parquet(
         str(tmp_path),
@@ -1470,10 +1746,53 @@ def test_parquet_read_with_udf(ray_start_regular_shared, tmp_path):
         _block_udf=_block_udf)
 
     ones, twos = zip(*[[s["one"], s["two"]] for s in ds.take()])
-    assert ds._blocks._num_computed() == 2
+    assert ds._blocks._num_computed() == 1
     np.testing.assert_array_equal(sorted(ones), np.array(one_data[:2]) + 1)
 
 
+def test_parquet_read_row_groups(ray_start_regular_shared, tmp_path):
+    # A single file of 10 row groups of 10 rows.
+    table = pa.Table.from_pandas(
+        pd.DataFrame({
+            "one": list(range(100)),
+            "two": [str(i) for i in range(100)]
+        }))
+    pq.write_table(table, os.path.join(tmp_path, "test.parquet"),
+                   row_group_size=10)
+
+    # The read is split by row group.
+    ds = ray.data.read_parquet(str(tmp_path), parallelism=5)
+    assert ds.num_blocks() == 5
+    assert ds.count() == 100
+    assert [s["one"] for s in ds.take(100)] == list(range(100))
+
+    # Row groups are pruned by their statistics.
+    ds = ray.data.read_parquet(
+        str(tmp_path),
+        parallelism=10,
+        filter=(pa.dataset.field("one") >= 75))
+    assert ds.num_blocks() == 3
+    # The surviving row groups hold 30 rows, but only 25 pass the filter, so
+    # the count isn't known from the metadata.
+    assert ds._meta_count() is None
+    assert ds.count() == 25
+    assert [s["one"] for s in ds.take(100)] == list(range(75, 100))
+
+    # All row groups are pruned.
+    ds = ray.data.read_parquet(
+        str(tmp_path), filter=(pa.dataset.field("one") > 100))
+    assert ds.count() == 0
+    assert ds.schema().names == ["one", "two"]
+
+    # Splits are balanced by the compressed size of the columns read.
+    metadata = [(pq.read_metadata(os.path.join(tmp_path, "test.parquet")),
+                 list(range(10)))]
+    splits = _split_row_groups(metadata, 5, ["one"])
+    assert splits == [[(0, [2 * i, 2 * i + 1])] for i in range(5)]
+    assert _split_row_groups(metadata, 20, None) == [[(0, [i])]
+                                                     for i in range(10)]
+
+
 @pytest.mark.parametrize(
     "fs,data_path",
     [(None, lazy_fixture("local_path")),
@@ -1629,6 +1948,33 @@ def test_parquet_write_with_udf(ray_start_regular_shared, tmp_path):
     assert expected_df.equals(dfds)
 
 
+def test_write_coalesce_blocks(ray_start_regular_shared,
+                               write_coalescing_enabled, tmp_path):
+    # Small blocks are coalesced into a single file per format.
+    ds = ray.data.range_arrow(1000, parallelism=10)
+    for fmt in ["parquet", "csv", "json"]:
+        path = os.path.join(tmp_path, fmt)
+        getattr(ds, "write_" + fmt)(path)
+        assert len(os.listdir(path)) == 1
+        read = getattr(ray.data, "read_" + fmt)(path)
+        assert sorted(r["value"] for r in read.iter_rows()) == list(
+            range(1000))
+
+    # Each coalesced block is streamed to its own Parquet row group.
+    path = os.path.join(tmp_path, "parquet")
+    file = os.path.join(path, os.listdir(path)[0])
+    assert pq.ParquetFile(file).num_row_groups == 10
+
+    # Large datasets are split into files of about the target size, with a
+    # bounded number of concurrent writers.
+    ds = ray.data.range_arrow(300000, parallelism=20)
+    path = os.path.join(tmp_path, "large")
+    ds.write_parquet(path)
+    assert len(os.listdir(path)) == 3
+    read = ray.data.read_parquet(path)
+    assert sorted(r["value"] for r in read.iter_rows()) == list(range(300000))
+
+
 @pytest.mark.parametrize("fs,data_path,endpoint_url", [
     (None, lazy_fixture("local_path"), None),
     (lazy_fixture("local_fs"), lazy_fixture("local_path"), None),
@@ -1730,6 +2076,43 @@ def test_read_binary_files(ray_start_regular_shared):
         assert "bytes" in str(ds), ds
 
 
+def test_read_binary_files_balanced_by_size(ray_start_regular_shared,
+                                            tmp_path):
+    # One large file followed by many small ones.
+    sizes = [1000] + [10] * 100
+    paths = []
+    for i, size in enumerate(sizes):
+        path = os.path.join(tmp_path, f"{i:03}.bin")
+        with open(path, "wb") as f:
+            f.write(bytes([i % 256]) * size)
+        paths.append(path)
+    ds = ray.data.read_binary_files(paths, parallelism=2)
+    assert ds.num_blocks() == 2
+    assert [m.input_files for m in ds._blocks.get_metadata()] == [
+        paths[:1], paths[1:]
+    ]
+    # File order is preserved with concurrent reads in each task.
+    assert ds.take(len(sizes)) == [
+        bytes([i % 256]) * size for i, size in enumerate(sizes)
+    ]
+    context = DatasetContext.get_current()
+    original = context.read_threads_per_task
+    try:
+        context.read_threads_per_task = 1
+        ds = ray.data.read_binary_files(paths, parallelism=2)
+        assert ds.take(len(sizes)) == [
+            bytes([i % 256]) * size for i, size in enumerate(sizes)
+        ]
+    finally:
+        context.read_threads_per_task = original
+
+    assert _split_by_size([], 4) == []
+    assert _split_by_size([1, 1, 1, 1], 2) == [[0, 1], [2, 3]]
+    assert _split_by_size([10, 1, 1, 1, 1], 2) == [[0], [1, 2, 3, 4]]
+    assert _split_by_size([0, 0, 0], 3) == [[0], [1], [2]]
+    assert _split_by_size([5, 5], 4) == [[0], [1]]
+
+
 def test_read_binary_files_with_fs(ray_start_regular_shared):
     with util.gen_bin_files(10) as (tempdir, paths):
         # All the paths are absolute, so we want the root file system.
@@ -1846,6 +2229,76 @@ def test_iter_batches_basic(ray_start_regular_shared):
         batches, ignore_index=True).equals(pd.concat(dfs, ignore_index=True))
 
 
+def test_batcher():
+    from ray.data.impl.batcher import Batcher
+
+    # Batches within a single block are zero-copy slices of it.
+    table = pa.Table.from_pydict({"value": list(range(10))})
+    batcher = Batcher(batch_size=4)
+    batcher.add(table)
+    batches = list(batcher.iter_batches())
+    assert [b["value"].to_pylist() for b in batches] == [[0, 1, 2, 3],
+                                                         [4, 5, 6, 7]]
+    assert all(b["value"].chunk(0).buffers()[1].address ==
+               table["value"].chunk(0).buffers()[1].address
+               for b in batches)
+    assert batcher.has_any()
+    assert not batcher.has_batch()
+
+    # Batches spanning multiple blocks, including empty ones.
+    batcher.add(pa.Table.from_pydict({"value": []}))
+    batcher.add(pa.Table.from_pydict({"value": list(range(10, 15))}))
+    assert batcher.has_batch()
+    assert batcher.next_batch()["value"].to_pylist() == [8, 9, 10, 11]
+    assert not batcher.has_batch()
+    assert batcher.next_batch()["value"].to_pylist() == [12, 13, 14]
+    assert not batcher.has_any()
+
+    # Simple blocks.
+    batcher = Batcher(batch_size=3)
+    for block in [[1, 2], [3, 4, 5, 6, 7], [], [8]]:
+        batcher.add(block)
+    assert list(batcher.iter_batches()) == [[1, 2, 3], [4, 5, 6]]
+    assert batcher.next_batch() == [7, 8]
+    assert not batcher.has_any()
+
+    # No batch size.
+    batcher = Batcher(batch_size=None)
+    batcher.add([1, 2, 3])
+    assert list(batcher.iter_batches()) == [[1, 2, 3]]
+    assert not batcher.has_any()
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_iter_batches_prefetch_batches(ray_start_regular_shared, pipelined):
+    df = pd.DataFrame({"value": list(range(100))})
+    ds = ray.data.from_pandas([df.iloc[i:i + 10] for i in range(0, 100, 10)])
+    ds = maybe_pipeline(ds, pipelined)
+    batches = list(
+        ds.iter_batches(
+            batch_size=7, batch_format="pandas", prefetch_batches=3))
+    assert [len(b) for b in batches] == [7] * 14 + [2]
+    assert pd.concat(batches, ignore_index=True).equals(df)
+
+    # Stopping the iteration early releases the prefetching thread.
+    def num_prefetching_threads():
+        return sum(thread.name == _BACKGROUND_THREAD_NAME
+                   for thread in threading.enumerate())
+
+    ds = maybe_pipeline(ray.data.range(100, parallelism=10), pipelined)
+    it = ds.iter_batches(
+        batch_size=10, batch_format="native", prefetch_batches=2)
+    assert next(it) == list(range(10))
+    assert num_prefetching_threads() >= 1
+    it.close()
+    wait_for_condition(lambda: num_prefetching_threads() == 0)
+
+    # Errors in formatting the batches are raised to the consumer.
+    ds = maybe_pipeline(ray.data.range(100, parallelism=10), pipelined)
+    with pytest.raises(ValueError):
+        list(ds.iter_batches(batch_format="invalid", prefetch_batches=2))
+
+
 def test_iter_batches_grid(ray_start_regular_shared):
     # Tests slicing, batch combining, and partial batch dropping logic over
     # a grid of dataset, batching, and dropping configurations.
@@ -2077,6 +2530,82 @@ def test_split(ray_start_regular_shared):
     assert 190 == sum([dataset.sum() for dataset in datasets])
 
 
+def test_locality_aware_scheduling(ray_start_regular_shared,
+                                   locality_aware_scheduling):
+    ds = ray.data.range(100, parallelism=10)
+    ds = ds.map(lambda x: x * 2).filter(lambda x: x % 4 == 0)
+    assert sorted(ds.take_all()) == list(range(0, 200, 4))
+
+    # Resources requested by the tasks are kept, and the tasks run on the
+    # nodes that hold their input blocks. The blocks are large enough to be
+    # stored in the object store rather than inlined.
+    ds = ray.data.range_tensor(10, shape=(10000, ), parallelism=5)
+    blocks = ds.get_internal_block_refs()
+    ray.wait(blocks, num_returns=len(blocks), fetch_local=False)
+    block_node_ids = set()
+    for location in ray.experimental.get_object_locations(blocks).values():
+        block_node_ids.update(location["node_ids"])
+    assert block_node_ids
+
+    def get_node_id(_):
+        return ray.get_runtime_context().node_id.hex()
+
+    task_node_ids = ds.map(get_node_id, num_cpus=1).take_all()
+    assert len(task_node_ids) == 10
+    assert set(task_node_ids) <= block_node_ids
+
+
+def test_assign_block_nodes():
+    from ray.data.impl.util import _assign_block_nodes
+
+    def node(node_id, cpus, **resources):
+        return {
+            "NodeID": node_id,
+            "NodeManagerAddress": node_id,
+            "Alive": True,
+            "Resources": {
+                "CPU": cpus,
+                "node:" + node_id: 1.0,
+                **resources
+            },
+        }
+
+    def assign(block_node_ids, nodes, ray_remote_args=None):
+        blocks = list(range(len(block_node_ids)))
+        locations = {
+            b: {
+                "node_ids": node_ids
+            }
+            for b, node_ids in zip(blocks, block_node_ids) if node_ids
+        }
+        resources = _assign_block_nodes(blocks, locations, nodes,
+                                        ray_remote_args or {})
+        return [list(r)[0][len("node:"):] if r else None for r in resources]
+
+    nodes = [node("n1", 4), node("n2", 4)]
+    # Blocks are scheduled on their nodes.
+    assert assign([["n1"], ["n2"], ["n1"], ["n2"]],
+                  nodes) == ["n1", "n2", "n1", "n2"]
+    # Replicated blocks go to the least loaded node.
+    assert assign([["n1"], ["n1", "n2"]], nodes) == ["n1", "n2"]
+    # Blocks on saturated nodes and blocks without a location are spread.
+    assert assign([["n1"], ["n1"], ["n1"], None],
+                  nodes) == ["n1", "n1", "n2", "n2"]
+    # Node shares are proportional to the node CPUs.
+    assert assign([["n1"]] * 4,
+                  [node("n1", 6), node("n2", 2)]) == ["n1", "n1", "n1", "n2"]
+    # Nodes without the requested resources are skipped.
+    assert assign([["n1"], ["n2"]], [node("n1", 4),
+                                     node("n2", 4, GPU=1)],
+                  {"num_gpus": 1}) == ["n2", "n2"]
+    # Dead nodes are skipped.
+    dead = node("n2", 4)
+    dead["Alive"] = False
+    assert assign([["n2"]], [node("n1", 4), dead]) == ["n1"]
+    # No schedulable nodes.
+    assert assign([["n1"]], [], {}) == [None]
+
+
 def test_split_hints(ray_start_regular_shared):
     @ray.remote
     class Actor(object):
@@ -2297,7 +2826,8 @@ def test_to_torch(ray_start_regular_shared, pipelined):
     df = pd.concat([df1, df2, df3])
     ds = ray.data.from_pandas([df1, df2, df3])
     ds = maybe_pipeline(ds, pipelined)
-    torchd = ds.to_torch(label_column="label", batch_size=3)
+    torchd = ds.to_torch(
+        label_column="label", batch_size=3, prefetch_batches=2)
 
     num_epochs = 1 if pipelined else 2
     for _ in range(num_epochs):
@@ -3227,6 +3757,44 @@ def test_groupby_simple(ray_start_regular_shared):
     assert agg_ds.count() == 0
 
 
+def test_groupby_hash_aggregate(ray_start_regular_shared):
+    import zlib
+    from ray.data.impl.util import _hash_key
+
+    # String keys hash consistently across processes.
+    assert _hash_key("a") == _hash_key("a".encode()) == zlib.crc32(b"a")
+    assert _hash_key(1) == _hash_key(1.0) == _hash_key(np.int64(1))
+    assert _hash_key(("a", 1)) == _hash_key(("a", 1))
+
+    # Each key is combined into exactly one sorted partition.
+    partitions = BlockAccessor.for_block([5, 3, 1, 2, 4, 0]).hash_combine(
+        lambda x: x % 3, (Count(), Sum()), 2)
+    assert len(partitions) == 2
+    assert sorted(r for p in partitions for r in p) == [
+        (0, 2, 3), (1, 2, 5), (2, 2, 7)
+    ]
+    assert all(p == sorted(p) for p in partitions)
+
+    # Keys of the same group from different blocks are merged, and the output
+    # is sorted by key.
+    xs = [f"k{x % 7}" for x in range(100)]
+    random.shuffle(xs)
+    agg_ds = ray.data.from_items(xs, parallelism=10).groupby(
+        lambda x: x).count()
+    assert agg_ds.take_all() == [(f"k{i}", 15 if i < 2 else 14)
+                                 for i in range(7)]
+    assert "Stage groupby_map" in agg_ds.stats()
+    agg_ds = ray.data.from_items(
+        [{
+            "A": x,
+            "B": 1
+        } for x in xs], parallelism=10).groupby("A").sum("B")
+    assert [row.as_pydict() for row in agg_ds.iter_rows()] == [{
+        "A": f"k{i}",
+        "sum(B)": 15 if i < 2 else 14
+    } for i in range(7)]
+
+
 @pytest.mark.parametrize("num_parts", [1, 10, 100])
 def test_groupby_simple_count(ray_start_regular_shared, num_parts):
     # Test built-in count aggregation
@@ -3523,6 +4091,53 @@ def test_random_shuffle(shutdown_only, pipelined):
     assert r1 == ds
 
 
+def test_push_based_shuffle(ray_start_regular_shared, use_push_based_shuffle):
+    ds = ray.data.range(100, parallelism=10)
+    r0 = ds.take_all()
+    r1 = ds.random_shuffle(seed=0).take_all()
+    r2 = ds.random_shuffle(seed=0).take_all()
+    r3 = ds.random_shuffle(seed=12345).take_all()
+    assert r1 == r2, (r1, r2)
+    assert r1 != r0, (r1, r0)
+    assert r1 != r3, (r1, r3)
+    assert sorted(r1) == r0
+
+    ds = ray.data.range_arrow(100, parallelism=10)
+    r1 = ds.random_shuffle(num_blocks=3)
+    assert r1.num_blocks() == 3
+    assert sorted(r["value"] for r in r1.take_all()) == list(range(100))
+
+    # The push-based shuffle should preserve the simple shuffle's block
+    # assignment when not randomizing.
+    ds = ray.data.range(20, parallelism=10)
+    ds2 = ds.repartition(5, shuffle=True)
+    assert ds2.num_blocks() == 5
+    assert ds2.sum() == 190
+    assert ds2._block_sizes() == [10, 10, 0, 0, 0]
+
+
+@pytest.mark.parametrize("num_maps_per_round,num_mergers",
+                         [(1, 1), (3, 2), (4, 7), (100, 100)])
+def test_push_based_shuffle_rounds(ray_start_regular_shared,
+                                   num_maps_per_round, num_mergers):
+    from ray.data.impl.shuffle import push_based_shuffle
+
+    ds = ray.data.range(1000, parallelism=10)
+    blocks, stages = push_based_shuffle(
+        ds._blocks,
+        7,
+        random_shuffle=True,
+        random_seed=0,
+        num_maps_per_round=num_maps_per_round,
+        num_mergers=num_mergers)
+    out = Dataset(blocks, ds._get_epoch())
+    assert out.num_blocks() == 7
+    assert len(stages["shuffle_map"]) == 10
+    assert len(stages["shuffle_reduce"]) == 7
+    assert sorted(out.take_all()) == list(range(1000))
+    assert sum(out._block_sizes()) == 1000
+
+
 def test_random_shuffle_spread(ray_start_cluster):
     cluster = ray_start_cluster
     cluster.add_node(
@@ -3624,6 +4239,106 @@ def test_sort_arrow(ray_start_regular, num_items, parallelism):
         ds.sort(key=[("b", "descending")]), zip(reversed(a), reversed(b)))
 
 
+@pytest.mark.parametrize("num_items,parallelism", [(100, 1), (1000, 4)])
+def test_sort_external(ray_start_regular, use_external_sort, num_items,
+                       parallelism):
+    ctx = DatasetContext.get_current()
+    original = ctx.target_max_block_size
+    # Force the merge tasks to emit multiple small output blocks.
+    ctx.target_max_block_size = 1000
+    try:
+        xs = list(range(num_items))
+        random.shuffle(xs)
+        ds = ray.data.from_items(xs, parallelism=parallelism)
+        assert ds.sort().take_all() == list(range(num_items))
+        assert ds.sort(descending=True).take_all() == list(
+            reversed(range(num_items)))
+
+        ds = ray.data.from_items([{
+            "a": x % 7,
+            "b": x
+        } for x in xs],
+                                 parallelism=parallelism)
+        sorted_ds = ds.sort("b")
+        assert sorted_ds.num_blocks() > parallelism
+        assert [r["b"] for r in sorted_ds.iter_rows()] == list(
+            range(num_items))
+        assert [r["b"] for r in ds.sort("b", descending=True).iter_rows()
+                ] == list(reversed(range(num_items)))
+        # Heavy ties on the sort key.
+        assert [r["a"] for r in ds.sort("a").iter_rows()
+                ] == sorted(x % 7 for x in xs)
+    finally:
+        ctx.target_max_block_size = original
+
+
+def test_iter_merge_sorted_blocks_arrow():
+    from ray.data.impl.arrow_block import ArrowBlockAccessor
+
+    blocks = [
+        pa.Table.from_pydict({
+            "a": sorted([x % 5 for x in range(i, 100, 3)]),
+            "b": list(range(len(range(i, 100, 3))))
+        }) for i in range(3)
+    ]
+    blocks.append(pa.Table.from_pydict({}))
+    out = list(
+        ArrowBlockAccessor.iter_merge_sorted_blocks(
+            blocks, [("a", "ascending")], False, max_block_size=100))
+    assert len(out) > 1
+    merged = pa.concat_tables(out)
+    assert merged["a"].to_pylist() == sorted(x % 5 for x in range(100))
+    assert all(b.nbytes <= 200 for b in out)
+
+
+@pytest.mark.parametrize("parallelism", [1, 4])
+def test_sort_arrow_multi_column(ray_start_regular, parallelism):
+    rows = [{"a": x % 3, "b": x % 7, "c": x} for x in range(200)]
+    random.shuffle(rows)
+    ds = ray.data.from_items(rows, parallelism=parallelism)
+
+    def assert_sorted(sorted_ds, expected_rows):
+        assert [(r["a"], r["b"], r["c"])
+                for r in sorted_ds.iter_rows()] == expected_rows
+
+    tuples = [(r["a"], r["b"], r["c"]) for r in rows]
+    assert_sorted(ds.sort(["a", "b", "c"]), sorted(tuples))
+    assert_sorted(
+        ds.sort(["a", "b", "c"], descending=True),
+        sorted(tuples, reverse=True))
+    assert_sorted(
+        ds.sort([("a", "ascending"), ("b", "descending"),
+                 ("c", "ascending")]),
+        sorted(tuples, key=lambda t: (t[0], -t[1], t[2])))
+    assert_sorted(
+        ds.sort([("a", "descending"), ("c", "ascending")]),
+        sorted(tuples, key=lambda t: (-t[0], t[2])))
+
+
+def test_arrow_sort_and_partition():
+    from ray.data.impl.arrow_block import ArrowBlockAccessor
+
+    table = pa.Table.from_pydict({
+        "a": [3, 1, 2, 2, 5, 4, 0],
+        "b": ["x", "y", "z", "w", "v", "u", "t"]
+    })
+    acc = ArrowBlockAccessor(table)
+
+    parts = acc.sort_and_partition([1, 2, 4], [("a", "ascending")], False)
+    assert [p["a"].to_pylist() for p in parts] == [[0], [1], [2, 2, 3],
+                                                   [4, 5]]
+
+    parts = acc.sort_and_partition([4, 2, 1], [("a", "descending")], True)
+    assert [p["a"].to_pylist() for p in parts] == [[5], [4, 3], [2, 2], [1, 0]]
+
+    parts = acc.sort_and_partition([(2, "x"), (4, "a")],
+                                   [("a", "ascending"), ("b", "descending")],
+                                   False)
+    assert [list(zip(p["a"].to_pylist(), p["b"].to_pylist()))
+            for p in parts] == [[(0, "t"), (1, "y"), (2, "z")],
+                                [(2, "w"), (3, "x"), (4, "u")], [(5, "v")]]
+
+
 def test_sort_arrow_with_empty_blocks(ray_start_regular):
     assert BlockAccessor.for_block(pa.Table.from_pydict({})).sample(
         10, "A").num_rows == 0
@@ -3718,5 +4433,4 @@ def test_dataset_retry_exceptions(ray_start_regular, local_path):
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(pytest.main(["-v", __file__]))
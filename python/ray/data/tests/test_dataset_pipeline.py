@@ -7,6 +7,8 @@ import numpy as np
 
 import ray
 from ray.data.dataset_pipeline import DatasetPipeline
+from ray.data.impl.pipeline_executor import StreamingPipelineExecutor, \
+    get_streaming_stages
 
 from ray.tests.conftest import *  # noqa
 
@@ -178,6 +180,58 @@ def test_iter_batches(ray_start_regular_shared):
     assert all(len(e) == 1 for e in batches)
 
 
+def test_streaming_executor(ray_start_regular_shared,
+                            streaming_pipeline_executor):
+    pipe = ray.data.range(20, parallelism=10).window(blocks_per_window=5)
+    pipe = pipe.map(lambda x: x * 2).filter(lambda x: x % 4 == 0)
+    pipe = pipe.map_batches(lambda batch: [x + 1 for x in batch])
+    # The per-record transforms are fused into a single stage.
+    assert len(get_streaming_stages(pipe._stages)) == 1
+    assert pipe.take() == [x * 2 + 1 for x in range(20) if x % 2 == 0]
+    with pytest.raises(RuntimeError):
+        pipe.take()
+
+    # Holistic transforms fall back to executing whole windows.
+    pipe = ray.data.range(20).window(blocks_per_window=5)
+    pipe = pipe.map(lambda x: x * 2).sort_each_window()
+    assert get_streaming_stages(pipe._stages) is None
+    assert pipe.take() == [x * 2 for x in range(20)]
+
+    # Actor pool stages aren't streamed either.
+    pipe = ray.data.range(20).window(blocks_per_window=5)
+    pipe = pipe.map(lambda x: x * 2, compute="actors")
+    assert get_streaming_stages(pipe._stages) is None
+
+
+def test_streaming_executor_backpressure(ray_start_regular_shared):
+    pipe = ray.data.range(20, parallelism=20).window(blocks_per_window=10)
+    pipe = pipe.map(lambda x: x + 1).map(lambda x: x * 2, num_cpus=0.5)
+    stages = get_streaming_stages(pipe._stages)
+    assert len(stages) == 2
+
+    # Each block exceeds the memory limit, so only one block is admitted at a
+    # time, and no task is submitted until the consumer pulls the next block.
+    executor = StreamingPipelineExecutor(
+        pipe, stages, max_tasks_per_stage=2, object_store_memory_limit=1)
+    assert executor._num_in_flight == [0, 0]
+    block, _ = next(executor)
+    assert ray.get(block) == [2]
+    assert executor._next_input == 1
+    assert executor._num_in_flight == [0, 0]
+    rest = [r for b, _ in executor for r in ray.get(b)]
+    assert rest == [(x + 1) * 2 for x in range(1, 20)]
+
+    # Without a memory limit, blocks are admitted up to the stage limit.
+    pipe = ray.data.range(20, parallelism=20).window(blocks_per_window=10)
+    pipe = pipe.map(lambda x: x + 1)
+    executor = StreamingPipelineExecutor(
+        pipe,
+        get_streaming_stages(pipe._stages),
+        max_tasks_per_stage=4,
+        object_store_memory_limit=0)
+    assert [r for b, _ in executor for r in ray.get(b)] == list(range(1, 21))
+
+
 def test_iter_datasets(ray_start_regular_shared):
     pipe = ray.data.range(10).window(blocks_per_window=2)
     ds = list(pipe.iter_datasets())
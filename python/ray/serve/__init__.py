@@ -2,6 +2,7 @@ try:
     from ray.serve.api import (start, get_replica_context, shutdown, ingress,
                                deployment, get_deployment, list_deployments)
     from ray.serve.batching import batch
+    from ray.serve.multiplex import multiplexed, get_multiplexed_model_id
     from ray.serve.config import HTTPOptions
 except ModuleNotFoundError as e:
     e.msg += (
@@ -16,5 +17,6 @@ ray.worker.blocking_get_inside_async_warned = True
 
 __all__ = [
     "batch", "start", "HTTPOptions", "get_replica_context", "shutdown",
-    "ingress", "deployment", "get_deployment", "list_deployments"
+    "ingress", "deployment", "get_deployment", "list_deployments",
+    "multiplexed", "get_multiplexed_model_id"
 ]
@@ -741,6 +741,16 @@ class Deployment:
         """Current max outstanding queries from each handle."""
         return self._config.max_concurrent_queries
 
+    @property
+    def max_queued_requests(self) -> int:
+        """Current max queued queries from each handle, -1 for no limit."""
+        return self._config.max_queued_requests
+
+    @property
+    def queue_timeout_s(self) -> float:
+        """Current max time a query waits for a replica, -1 for no limit."""
+        return self._config.queue_timeout_s
+
     @property
     def route_prefix(self) -> Optional[str]:
         """HTTP route prefix that this deployment is exposed under."""
@@ -834,6 +844,8 @@ class Deployment:
                 ray_actor_options: Optional[Dict] = None,
                 user_config: Optional[Any] = None,
                 max_concurrent_queries: Optional[int] = None,
+                max_queued_requests: Optional[int] = None,
+                queue_timeout_s: Optional[float] = None,
                 _autoscaling_config: Optional[Union[Dict,
                                                     AutoscalingConfig]] = None,
                 _graceful_shutdown_wait_loop_s: Optional[float] = None,
@@ -851,6 +863,10 @@ class Deployment:
             new_config.user_config = user_config
         if max_concurrent_queries is not None:
             new_config.max_concurrent_queries = max_concurrent_queries
+        if max_queued_requests is not None:
+            new_config.max_queued_requests = max_queued_requests
+        if queue_timeout_s is not None:
+            new_config.queue_timeout_s = queue_timeout_s
 
         if func_or_class is None:
             func_or_class = self._func_or_class
@@ -940,6 +956,8 @@ def deployment(
         ray_actor_options: Optional[Dict] = None,
         user_config: Optional[Any] = None,
         max_concurrent_queries: Optional[int] = None,
+        max_queued_requests: Optional[int] = None,
+        queue_timeout_s: Optional[float] = None,
         _autoscaling_config: Optional[Union[Dict, AutoscalingConfig]] = None,
         _graceful_shutdown_wait_loop_s: Optional[float] = None,
         _graceful_shutdown_timeout_s: Optional[float] = None
@@ -960,6 +978,8 @@ def deployment(
         ray_actor_options: Optional[Dict] = None,
         user_config: Optional[Any] = None,
         max_concurrent_queries: Optional[int] = None,
+        max_queued_requests: Optional[int] = None,
+        queue_timeout_s: Optional[float] = None,
         _autoscaling_config: Optional[Union[Dict, AutoscalingConfig]] = None,
         _graceful_shutdown_wait_loop_s: Optional[float] = None,
         _graceful_shutdown_timeout_s: Optional[float] = None
@@ -1006,6 +1026,15 @@ def deployment(
         max_concurrent_queries (Optional[int]): The maximum number of queries
             that will be sent to a replica of this deployment without receiving
             a response. Defaults to 100.
+        max_queued_requests (Optional[int]): The maximum number of queries
+            that each handle, including the HTTP proxy, queues while all
+            replicas are at max_concurrent_queries. Further queries are
+            rejected with a BackPressureError, or HTTP 503 over HTTP, unless
+            they have a higher priority than a queued query, which is then
+            rejected instead. Defaults to 0, no limit.
+        queue_timeout_s (Optional[float]): The maximum time that a query
+            waits for a free replica before it's rejected the same way.
+            Defaults to 0, no limit.
 
     Example:
 
@@ -1035,6 +1064,12 @@ def deployment(
     if max_concurrent_queries is not None:
         config.max_concurrent_queries = max_concurrent_queries
 
+    if max_queued_requests is not None:
+        config.max_queued_requests = max_queued_requests
+
+    if queue_timeout_s is not None:
+        config.queue_timeout_s = queue_timeout_s
+
     if _autoscaling_config is not None:
         config.autoscaling_config = _autoscaling_config
 
@@ -1,12 +1,19 @@
 import threading
-import bisect
-from collections import defaultdict
 import time
-from typing import Callable, DefaultDict, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass, field
 
+import numpy as np
+
 import ray
 
+#: Suffix of the key of the number of queued requests of a replica, whose
+#: number of ongoing requests is keyed by its replica tag.
+QUEUED_REQUESTS_KEY_SUFFIX = "/queued_requests"
+
+#: Suffix of the key of the processing latencies of a replica.
+LATENCY_MS_KEY_SUFFIX = "/latency_ms"
+
 
 def start_metrics_pusher(interval_s: float,
                          collection_callback: Callable[[], Dict[str, float]],
@@ -62,27 +69,183 @@ class TimeStampedValue:
     value: float = field(compare=False)
 
 
+_EMPTY = np.empty(0, dtype=np.float64)
+
+
+class _TimeSeriesBuffer:
+    """The points of a time series in a pair of NumPy arrays.
+
+    Like a ring buffer, the buffer holds at most max_points points, after
+    which appending overwrites the oldest ones. Rather than wrapping around,
+    the points are moved back to the front of the arrays once their end is
+    reached, which keeps them contiguous so that window queries are views.
+    This happens once per capacity / 2 appends at most, so appending is
+    amortized O(1).
+
+    While points arrive in timestamp order, the start of a window is found
+    by bisection, otherwise the points in a window are selected by a mask.
+    """
+
+    def __init__(self, max_points: int, initial_capacity: int = 16):
+        self.max_points = max_points
+        self.timestamps = np.empty(initial_capacity, dtype=np.float64)
+        self.values = np.empty(initial_capacity, dtype=np.float64)
+        self.start = 0
+        self.end = 0
+        self.is_sorted = True
+        self.last_timestamp = float("-inf")
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    def append(self, timestamp: float, value: float):
+        if (self.end == len(self.values)
+                or self.end - self.start == self.max_points):
+            self._reserve(1)
+        if timestamp < self.last_timestamp:
+            self.is_sorted = False
+        self.last_timestamp = timestamp
+        self.timestamps[self.end] = timestamp
+        self.values[self.end] = value
+        self.end += 1
+
+    def extend(self, timestamp: float, values: np.ndarray):
+        """Append values that all have the same timestamp."""
+        values = values[len(values) - min(len(values), self.max_points):]
+        self._reserve(len(values))
+        if timestamp < self.last_timestamp:
+            self.is_sorted = False
+        self.last_timestamp = timestamp
+        self.timestamps[self.end:self.end + len(values)] = timestamp
+        self.values[self.end:self.end + len(values)] = values
+        self.end += len(values)
+
+    def _reserve(self, num_points: int):
+        """Make room to append num_points <= max_points points."""
+        self.drop_oldest(max(0, self.size + num_points - self.max_points))
+        capacity = len(self.values)
+        if self.end + num_points <= capacity:
+            return
+
+        size = self.size
+        if size + num_points > capacity // 2:
+            capacity = min(2 * self.max_points,
+                           max(2 * capacity, 2 * (size + num_points)))
+            timestamps, values = self.timestamps, self.values
+            self.timestamps = np.empty(capacity, dtype=np.float64)
+            self.values = np.empty(capacity, dtype=np.float64)
+        else:
+            timestamps, values = self.timestamps, self.values
+        self.timestamps[:size] = timestamps[self.start:self.end]
+        self.values[:size] = values[self.start:self.end]
+        self.start, self.end = 0, size
+
+    def drop_oldest(self, num_points: int):
+        self.start += num_points
+        if self.size == 0:
+            self.start = self.end = 0
+            self.is_sorted = True
+            self.last_timestamp = float("-inf")
+
+    def points(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return views of the timestamps and values in insertion order."""
+        return (self.timestamps[self.start:self.end],
+                self.values[self.start:self.end])
+
+    def window(self, window_start_timestamp_s: float, do_compact: bool
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the timestamps and values on and after the window start.
+
+        If do_compact is set, the points before the first one in the window
+        are dropped. Points that arrived out of order may stay until the
+        points before them are dropped, but are excluded from the window.
+        """
+        timestamps, values = self.points()
+        if self.is_sorted:
+            first = int(
+                np.searchsorted(timestamps, window_start_timestamp_s, "left"))
+            if do_compact:
+                self.drop_oldest(first)
+            return timestamps[first:], values[first:]
+
+        in_window = timestamps >= window_start_timestamp_s
+        if do_compact:
+            num_expired = (int(np.argmax(in_window))
+                           if in_window.any() else self.size)
+            self.drop_oldest(num_expired)
+            timestamps_left, _ = self.points()
+            self.is_sorted = bool(
+                np.all(timestamps_left[1:] >= timestamps_left[:-1]))
+        return timestamps[in_window], values[in_window]
+
+
 class InMemoryMetricsStore:
-    """A very simple, in memory time series database"""
+    """A very simple, in memory time series database.
+
+    Each time series is kept in a bounded buffer of NumPy arrays, so that
+    appending a point doesn't allocate and window queries are vectorized.
+    """
 
-    def __init__(self):
-        self.data: DefaultDict[str, List[TimeStampedValue]] = defaultdict(list)
+    def __init__(self, max_points_per_key: int = 2**16):
+        """
+        Args:
+            max_points_per_key(int): the number of points kept for each key,
+              after which the oldest points are overwritten.
+        """
+        self.max_points_per_key = max_points_per_key
+        self._series: Dict[str, _TimeSeriesBuffer] = {}
 
-    def add_metrics_point(self, data_points: Dict[str, float],
-                          timestamp: float):
+    def add_metrics_point(
+            self, data_points: Dict[str, Union[float, Sequence[float]]],
+            timestamp: float):
         """Push new data points to the store.
 
         Args:
             data_points(dict): dictionary containing the metrics values. The
               key should be a string that uniquely identifies this time series
-              and to be used to perform aggregation.
+              and to be used to perform aggregation. The value is either a
+              single value or a sequence of values, e.g. latency samples,
+              that all get the timestamp.
             timestamp(float): the unix epoch timestamp the metrics are
               collected at.
         """
         for name, value in data_points.items():
-            # Using in-sort to insert while maintaining sorted ordering.
-            bisect.insort(
-                a=self.data[name], x=TimeStampedValue(timestamp, value))
+            is_scalar = isinstance(value, (int, float))
+            if not is_scalar:
+                value = np.asarray(value, dtype=np.float64).reshape(-1)
+                if len(value) == 0:
+                    continue
+
+            series = self._series.get(name)
+            if series is None:
+                series = _TimeSeriesBuffer(self.max_points_per_key)
+                self._series[name] = series
+            if is_scalar:
+                series.append(timestamp, value)
+            else:
+                series.extend(timestamp, value)
+
+    def keys(self) -> List[str]:
+        return list(self._series.keys())
+
+    def points(self, key: str) -> List[TimeStampedValue]:
+        """Return the data points of metric `key`, sorted by timestamp."""
+        if key not in self._series:
+            return []
+        timestamps, values = self._series[key].points()
+        order = np.argsort(timestamps, kind="stable")
+        return [
+            TimeStampedValue(float(timestamp), float(value))
+            for timestamp, value in zip(timestamps[order], values[order])
+        ]
+
+    def _window(self, key: str, window_start_timestamp_s: float,
+                do_compact: bool) -> Tuple[np.ndarray, np.ndarray]:
+        series = self._series.get(key)
+        if series is None:
+            return _EMPTY, _EMPTY
+        return series.window(window_start_timestamp_s, do_compact)
 
     def window_average(self,
                        key: str,
@@ -102,20 +265,57 @@ class InMemoryMetricsStore:
             The average of all the datapoints for the key on and after time
             window_start_timestamp_s, or None if there are no such points.
         """
-        datapoints = self.data[key]
+        _, values = self._window(key, window_start_timestamp_s, do_compact)
+        if len(values) == 0:
+            return None
+        # Faster than values.mean() for the few points of typical windows.
+        return float(values.sum()) / len(values)
 
-        idx = bisect.bisect(
-            a=datapoints,
-            x=TimeStampedValue(
-                timestamp=window_start_timestamp_s,
-                value=0  # dummy value
-            ))
-        points_after_idx = datapoints[idx:]
+    def window_percentile(self,
+                          key: str,
+                          window_start_timestamp_s: float,
+                          percentile: float,
+                          do_compact: bool = True) -> Optional[float]:
+        """Compute a percentile of the datapoints of metric `key` in a window.
 
-        if do_compact:
-            self.data[key] = points_after_idx
+        Args:
+            key(str): the metric name.
+            window_start_timestamp_s(float): see window_average.
+            percentile(float): the percentile to compute, between 0 and 100.
+            do_compact(bool): see window_average.
+        Returns:
+            The percentile of the datapoints for the key on and after time
+            window_start_timestamp_s, or None if there are no such points.
+        """
+        _, values = self._window(key, window_start_timestamp_s, do_compact)
+        if len(values) == 0:
+            return None
+        return float(np.percentile(values, percentile))
 
-        if len(points_after_idx) == 0:
-            return
-        return sum(point.value
-                   for point in points_after_idx) / len(points_after_idx)
+    def window_rate(self,
+                    key: str,
+                    window_start_timestamp_s: float,
+                    do_compact: bool = True) -> Optional[float]:
+        """Compute the per second rate of change of metric `key` in a window.
+
+        This is meant for counters, e.g. the number of handled requests.
+
+        Args:
+            key(str): the metric name.
+            window_start_timestamp_s(float): see window_average.
+            do_compact(bool): see window_average.
+        Returns:
+            The change between the first and the last datapoints for the key
+            on and after time window_start_timestamp_s divided by the time
+            between them, or None if there are no two such points with
+            different timestamps.
+        """
+        timestamps, values = self._window(key, window_start_timestamp_s,
+                                          do_compact)
+        if len(values) == 0:
+            return None
+        first, last = np.argmin(timestamps), np.argmax(timestamps)
+        duration_s = timestamps[last] - timestamps[first]
+        if duration_s <= 0:
+            return None
+        return float((values[last] - values[first]) / duration_s)
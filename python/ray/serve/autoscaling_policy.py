@@ -1,6 +1,9 @@
 from abc import ABCMeta, abstractmethod
 import math
+import time
 
+from ray.serve.autoscaling_metrics import (
+    InMemoryMetricsStore, LATENCY_MS_KEY_SUFFIX, QUEUED_REQUESTS_KEY_SUFFIX)
 from ray.serve.config import AutoscalingConfig
 from ray.serve.constants import CONTROL_LOOP_PERIOD_S
 
@@ -24,19 +27,46 @@ def calculate_desired_num_replicas(autoscaling_config: AutoscalingConfig,
             on the input metrics and the current number of replicas.
 
     """
-    current_num_replicas = len(current_num_ongoing_requests)
+    return calculate_desired_num_replicas_for_target(
+        autoscaling_config, current_num_ongoing_requests,
+        autoscaling_config.target_num_ongoing_requests_per_replica)
+
+
+def calculate_desired_num_replicas_for_target(
+        autoscaling_config: AutoscalingConfig,
+        current_metric_values: List[float], target_value: float) -> int:
+    """Returns the number of replicas to keep a metric at its target.
+
+    Assumes that the metric is inversely proportional to the number of
+    replicas, like the load of each replica. Latency isn't: it never drops
+    below the time that the handler takes, and it grows faster than the
+    load once requests queue up. Scaling in proportion to it is only a
+    heuristic, which overshoots when scaling up and undershoots when
+    scaling down, and relies on the scaling delays to settle.
+
+    Args:
+        autoscaling_config: The autoscaling parameters to use for this
+            calculation.
+        current_metric_values (List[float]): The value of the metric for each
+            replica, aggregated over the desired lookback window.
+        target_value (float): The value to keep the metric, averaged over all
+            replicas, at.
+
+    Returns:
+        desired_num_replicas: The desired number of replicas to scale to, based
+            on the input metrics and the current number of replicas.
+    """
+    current_num_replicas = len(current_metric_values)
     if current_num_replicas == 0:
         raise ValueError("Number of replicas cannot be zero")
 
-    # The number of ongoing requests per replica, averaged over all replicas.
-    num_ongoing_requests_per_replica: float = sum(
-        current_num_ongoing_requests) / len(current_num_ongoing_requests)
+    # The metric per replica, averaged over all replicas.
+    metric_value_per_replica: float = sum(current_metric_values) / len(
+        current_metric_values)
 
     # Example: if error_ratio == 2.0, we have two times too many ongoing
     # requests per replica, so we desire twice as many replicas.
-    error_ratio: float = (
-        num_ongoing_requests_per_replica /
-        autoscaling_config.target_num_ongoing_requests_per_replica)
+    error_ratio: float = metric_value_per_replica / target_value
 
     # Multiply the distance to 1 by the smoothing ("gain") factor (default=1).
     smoothed_error_ratio = 1 + (
@@ -67,6 +97,30 @@ class AutoscalingPolicy:
         """Initialize the policy using the specified config dictionary."""
         self.config = config
 
+    def get_current_metrics(self, metrics_store: InMemoryMetricsStore,
+                            deployment_name: str,
+                            replica_tags: List[str]) -> List[float]:
+        """Aggregate the metrics that get_decision_num_replicas is given.
+
+        Arguments:
+            metrics_store (InMemoryMetricsStore): The metrics pushed by the
+                replicas.
+            deployment_name (str): The name of the deployment.
+            replica_tags (List[str]): The running replicas.
+
+        Returns:
+            List[float]: The number of ongoing requests of each replica that
+                pushed metrics, averaged over the look back period.
+        """
+        window_start_timestamp_s = time.time() - self.config.look_back_period_s
+        current_num_ongoing_requests = []
+        for replica_tag in replica_tags:
+            num_ongoing_requests = metrics_store.window_average(
+                replica_tag, window_start_timestamp_s)
+            if num_ongoing_requests is not None:
+                current_num_ongoing_requests.append(num_ongoing_requests)
+        return current_num_ongoing_requests
+
     @abstractmethod
     def get_decision_num_replicas(self,
                                   current_num_ongoing_requests: List[float],
@@ -75,7 +129,8 @@ class AutoscalingPolicy:
 
         Arguments:
             current_num_ongoing_requests: List[float]: List of number of
-                ongoing requests for each replica.
+                ongoing requests for each replica, or of the other metrics
+                returned by get_current_metrics.
             curr_target_num_replicas (int): The number of replicas that the
                 deployment is currently trying to scale to.
 
@@ -94,6 +149,13 @@ class BasicAutoscalingPolicy(AutoscalingPolicy):
     actually scaled. See config options for more details.  Assumes
     `get_decision_num_replicas` is called once every CONTROL_LOOP_PERIOD_S
     seconds.
+
+    If the config sets target_latency_ms, the policy scales on a percentile
+    of the end to end latency of the requests to the deployment instead,
+    which includes the time that they were queued for. The target is then a
+    latency SLO for the deployment, not a load per replica. If the config
+    sets target_num_queued_requests_per_replica, the policy scales on the
+    number of requests queued at the replicas.
     """
 
     def __init__(self, config: AutoscalingConfig):
@@ -117,6 +179,48 @@ class BasicAutoscalingPolicy(AutoscalingPolicy):
         # scale_up_periods or scale_down_periods.
         self.decision_counter = 0
 
+        if config.target_latency_ms > 0:
+            self.target_value = config.target_latency_ms
+        elif config.target_num_queued_requests_per_replica > 0:
+            self.target_value = config.target_num_queued_requests_per_replica
+        else:
+            self.target_value = config.target_num_ongoing_requests_per_replica
+
+    def get_current_metrics(self, metrics_store: InMemoryMetricsStore,
+                            deployment_name: str,
+                            replica_tags: List[str]) -> List[float]:
+        """Aggregate the metric that the config targets for each replica.
+
+        For latency, that's the percentile of the end to end latency of all
+        requests of the deployment in the look back period, for each replica
+        that pushed metrics. The metrics store keeps a bounded number of
+        latencies per deployment, so for large deployments the percentile
+        only covers the latest part of the look back period.
+        """
+        current_num_ongoing_requests = super().get_current_metrics(
+            metrics_store, deployment_name, replica_tags)
+        window_start_timestamp_s = time.time() - self.config.look_back_period_s
+
+        if self.config.target_latency_ms > 0:
+            latency_ms = metrics_store.window_percentile(
+                deployment_name + LATENCY_MS_KEY_SUFFIX,
+                window_start_timestamp_s, self.config.latency_percentile)
+            if latency_ms is None:
+                return []
+            return [latency_ms] * len(current_num_ongoing_requests)
+
+        if self.config.target_num_queued_requests_per_replica > 0:
+            current_num_queued_requests = []
+            for replica_tag in replica_tags:
+                num_queued_requests = metrics_store.window_average(
+                    replica_tag + QUEUED_REQUESTS_KEY_SUFFIX,
+                    window_start_timestamp_s)
+                if num_queued_requests is not None:
+                    current_num_queued_requests.append(num_queued_requests)
+            return current_num_queued_requests
+
+        return current_num_ongoing_requests
+
     def get_decision_num_replicas(self,
                                   current_num_ongoing_requests: List[float],
                                   curr_target_num_replicas: int) -> int:
@@ -125,8 +229,8 @@ class BasicAutoscalingPolicy(AutoscalingPolicy):
 
         decision_num_replicas = curr_target_num_replicas
 
-        desired_num_replicas = calculate_desired_num_replicas(
-            self.config, current_num_ongoing_requests)
+        desired_num_replicas = calculate_desired_num_replicas_for_target(
+            self.config, current_num_ongoing_requests, self.target_value)
         # Scale up.
         if desired_num_replicas > curr_target_num_replicas:
             # If the previous decision was to scale down (the counter was
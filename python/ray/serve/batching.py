@@ -1,23 +1,42 @@
 import asyncio
+import collections
 from functools import wraps
 from inspect import iscoroutinefunction
 import time
 from typing import Any, Callable, List, Optional, overload, Tuple, TypeVar
 
+import ray
 from ray.serve.exceptions import RayServeException
+from ray.serve.utils import logger
+from ray.util import metrics
+
+
+# The weight of the latest observation in the moving averages of the
+# adaptive batching statistics.
+_ADAPTIVE_EWMA_WEIGHT = 0.2
 
 
 class _BatchQueue:
     def __init__(self,
                  max_batch_size: int,
                  timeout_s: float,
-                 handle_batch_func: Optional[Callable] = None) -> None:
+                 handle_batch_func: Optional[Callable] = None,
+                 latency_slo_s: Optional[float] = None) -> None:
         """Async queue that accepts individual items and returns batches.
 
         Respects max_batch_size and timeout_s; a batch will be returned when
         max_batch_size elements are available or the timeout has passed since
         the previous get.
 
+        If latency_slo_s is passed in, the batch size and timeout are instead
+        tuned after each batch, so that the latency of the requests stays
+        within the SLO. The batch size doubles while requests back up in the
+        queue and grows by one while full batches meet the SLO, up to the
+        size that can be handled within the SLO and max_batch_size. It is
+        halved when a partial batch misses the SLO. The timeout is the time
+        expected to fill a batch at the observed arrival rate, within the part
+        of the SLO left after handling the batch.
+
         If handle_batch_func is passed in, a background coroutine will run to
         poll from the queue and call handle_batch_func on the results.
 
@@ -27,11 +46,36 @@ class _BatchQueue:
                 batch.
             handle_batch_func(Optional[Callable]): callback to run in the
                 background to handle batches if provided.
+            latency_slo_s(Optional[float]): target latency of the requests,
+                from entering the queue to the batch being handled, to tune
+                the batch size and timeout for if provided.
         """
         self.queue = asyncio.Queue()
         self.full_batch_event = asyncio.Event()
         self.max_batch_size = max_batch_size
-        self.timeout_s = timeout_s
+        self.latency_slo_s = latency_slo_s
+        if latency_slo_s is None:
+            self.batch_size = max_batch_size
+            self.timeout_s = timeout_s
+        else:
+            # Start from unbatched requests and grow from there.
+            self.batch_size = 1
+            self.timeout_s = 0
+
+        # The times at which the queued requests were put, in queue order.
+        self._put_times = collections.deque()
+        self._last_put_time: Optional[float] = None
+        self._oldest_batch_put_time: Optional[float] = None
+        # Moving averages of the time between requests, the latency of the
+        # batch handler, and the size of the handled batches.
+        self._arrival_interval_s: Optional[float] = None
+        self._handler_latency_s: Optional[float] = None
+        self._handled_batch_size: Optional[float] = None
+
+        self._metrics = _BatchQueueMetrics(
+            handle_batch_func) if ray.is_initialized() else None
+        if self._metrics is not None:
+            self._metrics.wait_timeout.set(self.timeout_s)
 
         self._handle_batch_task = None
         if handle_batch_func is not None:
@@ -39,22 +83,34 @@ class _BatchQueue:
                 self._handle_batches(handle_batch_func))
 
     def put(self, request: Tuple[Any, asyncio.Future]) -> None:
+        now = time.time()
+        if self._last_put_time is not None:
+            self._arrival_interval_s = _ewma(self._arrival_interval_s,
+                                             now - self._last_put_time)
+        self._last_put_time = now
+        self._put_times.append(now)
         self.queue.put_nowait(request)
         # Signal when the full batch is ready. The event will be reset
         # in wait_for_batch.
-        if self.queue.qsize() == self.max_batch_size:
+        if self.queue.qsize() >= self.batch_size:
             self.full_batch_event.set()
+        if self._metrics is not None:
+            self._metrics.queue_depth.set(self.queue.qsize())
 
     async def wait_for_batch(self) -> List[Any]:
-        """Wait for batch respecting self.max_batch_size and self.timeout_s.
+        """Wait for batch respecting self.batch_size and self.timeout_s.
 
-        Returns a batch of up to self.max_batch_size items, waiting for up
-        to self.timeout_s for a full batch. After the timeout, returns as many
+        Returns a batch of up to self.batch_size items, waiting for up to
+        self.timeout_s for a full batch. After the timeout, returns as many
         items as are ready.
 
         Always returns a batch with at least one item - will block
         indefinitely until an item comes in.
         """
+        # The batch size may have shrunk since the event was last reset.
+        if self.queue.qsize() >= self.batch_size:
+            self.full_batch_event.set()
+
         curr_timeout = self.timeout_s
         batch = []
         while len(batch) == 0:
@@ -65,7 +121,7 @@ class _BatchQueue:
             if curr_timeout == 0:
                 batch.append(await self.queue.get())
             # If the timeout is nonzero, wait for either the timeout to occur
-            # or the max batch size to be ready.
+            # or the batch size to be ready.
             else:
                 try:
                     await asyncio.wait_for(self.full_batch_event.wait(),
@@ -73,21 +129,76 @@ class _BatchQueue:
                 except asyncio.TimeoutError:
                     pass
 
-            # Pull up to the max_batch_size requests off the queue.
-            while len(batch) < self.max_batch_size and not self.queue.empty():
+            # Pull up to the batch_size requests off the queue.
+            while len(batch) < self.batch_size and not self.queue.empty():
                 batch.append(self.queue.get_nowait())
 
-            # Reset the event if there are fewer than max_batch_size requests
+            # Reset the event if there are fewer than batch_size requests
             # in the queue.
-            if (self.queue.qsize() < self.max_batch_size
+            if (self.queue.qsize() < self.batch_size
                     and self.full_batch_event.is_set()):
                 self.full_batch_event.clear()
 
             # Adjust the timeout based on the time spent in this iteration.
             curr_timeout = max(0, curr_timeout - (time.time() - loop_start))
 
+        self._oldest_batch_put_time = self._put_times[0]
+        for _ in range(len(batch)):
+            self._put_times.popleft()
+        if self._metrics is not None:
+            self._metrics.queue_depth.set(self.queue.qsize())
+            self._metrics.batch_size.set(len(batch))
         return batch
 
+    def _tune(self, batch_size: int, handler_latency_s: float) -> None:
+        """Tune the batch size and timeout after handling a batch."""
+        self._handler_latency_s = _ewma(self._handler_latency_s,
+                                        handler_latency_s)
+        self._handled_batch_size = _ewma(self._handled_batch_size,
+                                         batch_size)
+        if self.latency_slo_s is None:
+            return
+
+        latency_s = time.time() - self._oldest_batch_put_time
+        # The largest batch expected to be handled within the SLO, which is
+        # unbounded for handlers too fast for the clock to measure.
+        max_batch_size = self.max_batch_size
+        if self._handler_latency_s > 0:
+            max_batch_size = min(
+                max_batch_size,
+                max(1, int(self.latency_slo_s * self._handled_batch_size /
+                           self._handler_latency_s)))
+        if batch_size < self.batch_size:
+            # The batch timed out before filling up, so shrink it if the
+            # wait for it missed the SLO.
+            if latency_s > self.latency_slo_s:
+                self.batch_size = max(1, self.batch_size // 2)
+        elif self.queue.qsize() >= self.batch_size:
+            # Requests arrive faster than they're handled, so batch more of
+            # them to keep up with the arrival rate.
+            self.batch_size = min(max_batch_size, self.batch_size * 2)
+        elif latency_s <= self.latency_slo_s:
+            # Probe for larger batches while full batches meet the SLO.
+            self.batch_size = min(max_batch_size, self.batch_size + 1)
+        else:
+            # Full batches miss the SLO, which only the cap can improve on.
+            self.batch_size = min(max_batch_size, self.batch_size)
+
+        # Wait for the time it takes requests to fill a batch, as long as
+        # the batch can still be handled within the SLO.
+        budget_s = (self.latency_slo_s -
+                    self._predict_handler_latency(self.batch_size))
+        fill_time_s = (self.batch_size - 1) * (self._arrival_interval_s or 0)
+        self.timeout_s = max(0, min(budget_s, fill_time_s))
+        if self._metrics is not None:
+            self._metrics.wait_timeout.set(self.timeout_s)
+
+    def _predict_handler_latency(self, batch_size: int) -> float:
+        # Assume the handler latency grows linearly with the batch size,
+        # which overestimates it for handlers with a fixed cost per batch.
+        return (self._handler_latency_s * batch_size /
+                self._handled_batch_size)
+
     async def _handle_batches(self, func):
         while True:
             batch = await self.wait_for_batch()
@@ -97,12 +208,14 @@ class _BatchQueue:
             futures = [item[2] for item in batch]
 
             try:
+                start = time.time()
                 # Method call.
                 if self_arg is not None:
                     results = await func(self_arg, args)
                 # Normal function call.
                 else:
                     results = await func(args)
+                handler_latency_s = time.time() - start
 
                 if len(results) != len(batch):
                     raise RayServeException(
@@ -115,6 +228,14 @@ class _BatchQueue:
             except Exception as e:
                 for future in futures:
                     future.set_exception(e)
+                continue
+
+            # Tune only once the results are delivered, so that a tuning
+            # error can't fail the requests of a successful batch.
+            try:
+                self._tune(len(batch), handler_latency_s)
+            except Exception:
+                logger.exception("Failed to tune the batch size.")
 
     def __del__(self):
         if (self._handle_batch_task is None
@@ -127,6 +248,45 @@ class _BatchQueue:
         self._handle_batch_task.cancel()
 
 
+class _BatchQueueMetrics:
+    """The metrics exported by a batch queue, tagged by its function."""
+
+    def __init__(self, handle_batch_func: Optional[Callable]):
+        tags = {
+            "function": getattr(handle_batch_func, "__qualname__", ""),
+            "deployment": "",
+            "replica": "",
+        }
+        replica_context = ray.serve.api._INTERNAL_REPLICA_CONTEXT
+        if replica_context is not None:
+            tags["deployment"] = replica_context.deployment
+            tags["replica"] = replica_context.replica_tag
+        tag_keys = tuple(tags.keys())
+
+        self.batch_size = metrics.Gauge(
+            "serve_batch_size",
+            description="The size of the latest batch.",
+            tag_keys=tag_keys)
+        self.wait_timeout = metrics.Gauge(
+            "serve_batch_wait_timeout_s",
+            description=("The time to wait for a full batch, as tuned for "
+                         "the latency SLO."),
+            tag_keys=tag_keys)
+        self.queue_depth = metrics.Gauge(
+            "serve_batch_queue_depth",
+            description="The number of requests waiting to be batched.",
+            tag_keys=tag_keys)
+        for metric in [self.batch_size, self.wait_timeout, self.queue_depth]:
+            metric.set_default_tags(tags)
+
+
+def _ewma(average: Optional[float], value: float) -> float:
+    if average is None:
+        return value
+    return (_ADAPTIVE_EWMA_WEIGHT * value +
+            (1 - _ADAPTIVE_EWMA_WEIGHT) * average)
+
+
 def extract_self_if_method_call(args: List[Any],
                                 func: Callable) -> Optional[object]:
     """Check if this is a method rather than a function.
@@ -167,11 +327,15 @@ def batch(func: F) -> G:
 # "Decorator factory" use case (called with arguments).
 @overload
 def batch(max_batch_size: Optional[int] = 10,
-          batch_wait_timeout_s: Optional[float] = 0.0) -> Callable[[F], G]:
+          batch_wait_timeout_s: Optional[float] = 0.0,
+          latency_slo_s: Optional[float] = None) -> Callable[[F], G]:
     pass
 
 
-def batch(_func=None, max_batch_size=10, batch_wait_timeout_s=0.0):
+def batch(_func=None,
+          max_batch_size=10,
+          batch_wait_timeout_s=0.0,
+          latency_slo_s=None):
     """Converts a function to asynchronously handle batches.
 
     The function can be a standalone function or a class method. In both
@@ -191,11 +355,26 @@ def batch(_func=None, max_batch_size=10, batch_wait_timeout_s=0.0):
     >>> async def handle_single(s: str):
             return await handle_batch(s) # Returns s.lower().
 
+    If `latency_slo_s` is set, the batch size and wait timeout are instead
+    tuned to the observed latency of the function and arrival rate of the
+    requests, to batch as much as possible while keeping the latency of
+    each request within the SLO. The current batch size, wait timeout and
+    queue depth are exported as the `serve_batch_size`,
+    `serve_batch_wait_timeout_s` and `serve_batch_queue_depth` metrics.
+
+    >>> @serve.batch(max_batch_size=256, latency_slo_s=0.1)
+        async def handle_batch(batch: List[str]):
+            return model(batch)
+
     Arguments:
         max_batch_size (int): the maximum batch size that will be executed in
             one call to the underlying function.
         batch_wait_timeout_s (float): the maximum duration to wait for
             `max_batch_size` elements before running the underlying function.
+            Ignored if `latency_slo_s` is set.
+        latency_slo_s (Optional[float]): the target latency of each request,
+            from being queued until its batch has been handled, to tune the
+            batch size and wait timeout for.
     """
     # `_func` will be None in the case when the decorator is parametrized.
     # See the comment at the end of this function for a detailed explanation.
@@ -223,6 +402,12 @@ def batch(_func=None, max_batch_size=10, batch_wait_timeout_s=0.0):
     if batch_wait_timeout_s < 0:
         raise ValueError("batch_wait_timeout_s must be a float >= 0")
 
+    if latency_slo_s is not None:
+        if not isinstance(latency_slo_s, (float, int)):
+            raise TypeError("latency_slo_s must be a float > 0")
+        if latency_slo_s <= 0:
+            raise ValueError("latency_slo_s must be a float > 0")
+
     def _batch_decorator(_func):
         @wraps(_func)
         async def batch_wrapper(*args, **kwargs):
@@ -252,7 +437,7 @@ def batch(_func=None, max_batch_size=10, batch_wait_timeout_s=0.0):
             batch_queue_attr = f"__serve_batch_queue_{_func.__name__}"
             if not hasattr(batch_queue_object, batch_queue_attr):
                 batch_queue = _BatchQueue(max_batch_size, batch_wait_timeout_s,
-                                          _func)
+                                          _func, latency_slo_s)
                 setattr(batch_queue_object, batch_queue_attr, batch_queue)
             else:
                 batch_queue = getattr(batch_queue_object, batch_queue_attr)
@@ -0,0 +1,98 @@
+# Compares the tail latency of the replica selection policies of the router.
+#
+# Requests to the benchmark deployment have heterogeneous latencies: most are
+# fast, but a fraction of them are much slower. Since each replica processes
+# its requests one at a time, policies that ignore the load of the replicas
+# queue fast requests behind slow ones, which shows in the tail latency.
+#
+#   python replica_selection.py --num-replicas 8 --num-queries 4000
+
+import asyncio
+import random
+import time
+
+import click
+import numpy as np
+
+import ray
+from ray import serve
+from ray.serve.api import _get_global_client
+from ray.serve.handle import RayServeHandle
+from ray.serve.router import Router, get_replica_selection_policy
+
+POLICIES = ["round_robin", "least_loaded", "power_of_two", "node_local"]
+
+
+def sample_delay_s(fast_ms: float, slow_ms: float, slow_fraction: float):
+    if random.random() < slow_fraction:
+        return slow_ms / 1000
+    return fast_ms / 1000
+
+
+async def run_trial(handle: RayServeHandle, num_clients: int,
+                    num_queries: int, fast_ms: float, slow_ms: float,
+                    slow_fraction: float) -> np.ndarray:
+    latencies = []
+
+    async def client(num):
+        for _ in range(num):
+            delay_s = sample_delay_s(fast_ms, slow_ms, slow_fraction)
+            start = time.perf_counter()
+            await (await handle.remote(delay_s))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(
+        *[client(num_queries // num_clients) for _ in range(num_clients)])
+    return np.array(latencies) * 1000
+
+
+async def run(num_replicas: int, num_clients: int, num_queries: int,
+              fast_ms: float, slow_ms: float, slow_fraction: float):
+    @serve.deployment(num_replicas=num_replicas, max_concurrent_queries=100)
+    def backend(delay_s: float):
+        # Block the replica, so that its requests queue up behind each other.
+        time.sleep(delay_s)
+        return "ok"
+
+    backend.deploy()
+    controller = _get_global_client()._controller
+
+    print(f"num_replicas={num_replicas}, num_clients={num_clients}, "
+          f"fast_ms={fast_ms}, slow_ms={slow_ms}, "
+          f"slow_fraction={slow_fraction}")
+    print(f"{'policy':>14} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8}")
+    for policy in POLICIES:
+        router = Router(
+            controller,
+            backend.name,
+            event_loop=asyncio.get_event_loop(),
+            replica_selection_policy=get_replica_selection_policy(policy))
+        handle = RayServeHandle(controller, backend.name, _router=router)
+        # Warm up, which also waits for the router to learn the replicas.
+        await run_trial(handle, num_clients, num_clients * 10, 0, 0, 0)
+        latencies = await run_trial(handle, num_clients, num_queries,
+                                    fast_ms, slow_ms, slow_fraction)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"{policy:>14} {p50:8.2f} {p90:8.2f} {p99:8.2f} "
+              f"{latencies.max():8.2f}")
+
+
+@click.command()
+@click.option("--num-replicas", type=int, default=8)
+@click.option("--num-clients", type=int, default=32)
+@click.option("--num-queries", type=int, default=4000)
+@click.option("--fast-ms", type=float, default=2)
+@click.option("--slow-ms", type=float, default=50)
+@click.option("--slow-fraction", type=float, default=0.05)
+def main(num_replicas: int, num_clients: int, num_queries: int,
+         fast_ms: float, slow_ms: float, slow_fraction: float):
+    ray.init()
+    serve.start()
+    asyncio.get_event_loop().run_until_complete(
+        run(num_replicas, num_clients, num_queries, fast_ms, slow_ms,
+            slow_fraction))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Compares streamed and buffered HTTP responses of a deployment.
+#
+# The deployment produces a body of --num-chunks chunks, sleeping for
+# --chunk-delay-ms before each, like an LLM generating tokens. It either
+# returns a generator of the chunks, which the HTTP proxy forwards as they're
+# produced, or the joined body. The benchmark reports the time to the first
+# byte and to the full body, and the peak memory of the HTTP proxy.
+#
+#   python streaming.py --num-chunks 100 --chunk-kb 64 --chunk-delay-ms 10
+
+import threading
+import time
+
+import click
+import numpy as np
+import psutil
+import requests
+
+import ray
+from ray import serve
+from ray.serve.constants import DEFAULT_HTTP_ADDRESS
+
+
+def find_proxy_process() -> psutil.Process:
+    for process in psutil.process_iter(["cmdline"]):
+        cmdline = process.info["cmdline"] or []
+        if cmdline and cmdline[0].startswith("ray::HTTPProxyActor"):
+            return process
+    raise RuntimeError("Couldn't find the HTTP proxy process.")
+
+
+class PeakMemoryMonitor:
+    """Samples the resident memory of a process in a background thread."""
+
+    def __init__(self, process: psutil.Process, interval_s: float = 0.005):
+        self._process = process
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self.peak_bytes = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes,
+                                  self._process.memory_info().rss)
+            time.sleep(self._interval_s)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_trial(url: str, num_queries: int):
+    first_byte_s = []
+    total_s = []
+    for _ in range(num_queries):
+        start = time.perf_counter()
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            first = True
+            for _ in response.iter_content(chunk_size=None):
+                if first:
+                    first_byte_s.append(time.perf_counter() - start)
+                    first = False
+        total_s.append(time.perf_counter() - start)
+    return np.array(first_byte_s) * 1000, np.array(total_s) * 1000
+
+
+@click.command()
+@click.option("--num-chunks", type=int, default=100)
+@click.option("--chunk-kb", type=int, default=64)
+@click.option("--chunk-delay-ms", type=float, default=10)
+@click.option("--num-queries", type=int, default=20)
+def main(num_chunks: int, chunk_kb: int, chunk_delay_ms: float,
+         num_queries: int):
+    ray.init()
+    serve.start()
+
+    chunk = b"x" * (chunk_kb * 1024)
+
+    def generate():
+        for _ in range(num_chunks):
+            time.sleep(chunk_delay_ms / 1000)
+            yield chunk
+
+    @serve.deployment
+    def streamed(_):
+        return generate()
+
+    @serve.deployment
+    def buffered(_):
+        return b"".join(generate())
+
+    streamed.deploy()
+    buffered.deploy()
+    proxy = find_proxy_process()
+
+    print(f"num_chunks={num_chunks}, chunk_kb={chunk_kb}, "
+          f"chunk_delay_ms={chunk_delay_ms}")
+    print(f"{'response':>10} {'p50 ttfb ms':>12} {'p50 total ms':>13} "
+          f"{'peak proxy MB':>14}")
+    for name in ["buffered", "streamed"]:
+        url = f"{DEFAULT_HTTP_ADDRESS}/{name}"
+        # Warm up the route, handle and replica.
+        requests.get(url)
+        with PeakMemoryMonitor(proxy) as monitor:
+            first_byte_ms, total_ms = run_trial(url, num_queries)
+        print(f"{name:>10} {np.median(first_byte_ms):12.2f} "
+              f"{np.median(total_ms):13.2f} "
+              f"{monitor.peak_bytes / 1024 ** 2:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
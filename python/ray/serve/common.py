@@ -107,3 +107,9 @@ class RunningReplicaInfo:
     replica_tag: ReplicaTag
     actor_handle: ActorHandle
     max_concurrent_queries: int
+    # The ID of the node the replica runs on, for node-local routing.
+    node_id: Optional[str] = None
+    # The limits on the queries that routers queue for the deployment, which
+    # are the same for all its replicas. 0 for no limit.
+    max_queued_requests: int = 0
+    queue_timeout_s: float = 0
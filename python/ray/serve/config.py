@@ -5,7 +5,8 @@ from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pydantic
 from google.protobuf.json_format import MessageToDict
-from pydantic import BaseModel, NonNegativeFloat, PositiveInt, validator
+from pydantic import (BaseModel, NonNegativeFloat, NonNegativeInt,
+                      PositiveInt, validator)
 from ray.serve.constants import DEFAULT_HTTP_HOST, DEFAULT_HTTP_PORT
 from ray.serve.generated.serve_pb2 import (
     DeploymentConfig as DeploymentConfigProto, AutoscalingConfig as
@@ -45,6 +46,17 @@ class AutoscalingConfig(BaseModel):
     # How long to wait before scaling up replicas
     upscale_delay_s: float = 30.0
 
+    # The metric to scale on, instead of the number of ongoing requests.
+    # If target_latency_ms is > 0, scale to keep the latency_percentile
+    # percentile of the end to end latency of the requests, from when the
+    # router received them, at or below it. That's a latency SLO for the
+    # whole deployment, not a load per replica.
+    target_latency_ms: NonNegativeFloat = 0
+    latency_percentile: float = 95.0
+    # If target_num_queued_requests_per_replica is > 0, scale to keep the
+    # average number of requests queued at each replica at it.
+    target_num_queued_requests_per_replica: NonNegativeFloat = 0
+
     # TODO(architkulkarni): implement below
     # The number of replicas to start with when creating the deployment
     # initial_replicas: int = 1
@@ -55,6 +67,20 @@ class AutoscalingConfig(BaseModel):
     # TODO(architkulkarni): Add reasonable defaults
     # TODO(architkulkarni): Add pydantic validation.  E.g. max_replicas>=min
 
+    @validator("latency_percentile")
+    def latency_percentile_valid(cls, v):  # noqa 805
+        if not 0 < v <= 100:
+            raise ValueError("latency_percentile must be in (0, 100]")
+        return v
+
+    @validator("target_num_queued_requests_per_replica")
+    def single_target_metric(cls, v, values):  # noqa 805
+        if v > 0 and values.get("target_latency_ms", 0) > 0:
+            raise ValueError(
+                "Only one of target_latency_ms and "
+                "target_num_queued_requests_per_replica can be set.")
+        return v
+
 
 class DeploymentConfig(BaseModel):
     """Configuration options for a deployment, to be set by the user.
@@ -65,6 +91,13 @@ class DeploymentConfig(BaseModel):
         max_concurrent_queries (Optional[int]): The maximum number of queries
             that will be sent to a replica of this deployment without receiving
             a response. Defaults to 100.
+        max_queued_requests (Optional[int]): The maximum number of queries
+            that each handle queues while all replicas of this deployment are
+            at max_concurrent_queries, beyond which queries are rejected.
+            Defaults to 0, no limit.
+        queue_timeout_s (Optional[float]): The maximum time that a query
+            waits for a free replica before it's rejected. Defaults to 0, no
+            limit.
         user_config (Optional[Any]): Arguments to pass to the reconfigure
             method of the deployment. The reconfigure method is called if
             user_config is not None.
@@ -78,6 +111,8 @@ class DeploymentConfig(BaseModel):
 
     num_replicas: PositiveInt = 1
     max_concurrent_queries: Optional[int] = None
+    max_queued_requests: NonNegativeInt = 0
+    queue_timeout_s: NonNegativeFloat = 0
     user_config: Any = None
 
     graceful_shutdown_wait_loop_s: NonNegativeFloat = 2.0
@@ -126,6 +161,10 @@ class DeploymentConfig(BaseModel):
             else:
                 data["user_config"] = None
         if "autoscaling_config" in data:
+            # An unset latency_percentile is decoded as 0, which isn't a
+            # valid percentile, so use the default instead.
+            if data["autoscaling_config"].get("latency_percentile") == 0:
+                del data["autoscaling_config"]["latency_percentile"]
             data["autoscaling_config"] = AutoscalingConfig(
                 **data["autoscaling_config"])
 
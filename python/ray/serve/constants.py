@@ -62,3 +62,19 @@ MAX_CACHED_HANDLES = 100
 #: Because ServeController will accept one long poll request per handle, its
 #: concurrency needs to scale as O(num_handles)
 CONTROLLER_MAX_CONCURRENCY = 15000
+
+#: Max number of chunks of a streamed HTTP response that a replica buffers
+#: ahead of the HTTP proxy pulling them.
+STREAM_MAX_BUFFERED_CHUNKS = 16
+
+#: Time after which a replica abandons a streamed HTTP response whose chunks
+#: the HTTP proxy stopped pulling, e.g. because the proxy died.
+STREAM_IDLE_TIMEOUT_S = 60
+
+#: Max number of request latencies that a replica pushes to the controller
+#: for autoscaling each metrics interval, keeping the latest ones. The
+#: controller keeps at most 2**16 latencies for each deployment, so with the
+#: default 10s metrics interval and 30s look back period, deployments of more
+#: than ~20 busy replicas compute the latency percentile over less than the
+#: whole look back period.
+AUTOSCALING_MAX_LATENCY_SAMPLES = 1000
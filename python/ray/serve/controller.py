@@ -106,7 +106,10 @@ class ServeController:
         self.autoscaling_metrics_store.add_metrics_point(data, send_timestamp)
 
     def _dump_autoscaling_metrics_for_testing(self):
-        return self.autoscaling_metrics_store.data
+        return {
+            key: self.autoscaling_metrics_store.points(key)
+            for key in self.autoscaling_metrics_store.keys()
+        }
 
     def _dump_replica_states_for_testing(self, deployment_name):
         return self.deployment_state_manager._deployment_states[
@@ -151,25 +154,18 @@ class ServeController:
                 deployment_name]._replicas
             running_replicas = replicas.get([ReplicaState.RUNNING])
 
-            current_num_ongoing_requests = []
-            for replica in running_replicas:
-                replica_tag = replica.replica_tag
-                num_ongoing_requests = (
-                    self.autoscaling_metrics_store.window_average(
-                        replica_tag,
-                        time.time() -
-                        autoscaling_policy.config.look_back_period_s))
-                if num_ongoing_requests is not None:
-                    current_num_ongoing_requests.append(num_ongoing_requests)
-
-            if len(current_num_ongoing_requests) == 0:
+            current_metrics = autoscaling_policy.get_current_metrics(
+                self.autoscaling_metrics_store, deployment_name,
+                [replica.replica_tag for replica in running_replicas])
+
+            if len(current_metrics) == 0:
                 continue
 
             new_deployment_config = deployment_config.copy()
 
             decision_num_replicas = (
                 autoscaling_policy.get_decision_num_replicas(
-                    current_num_ongoing_requests=current_num_ongoing_requests,
+                    current_num_ongoing_requests=current_metrics,
                     curr_target_num_replicas=deployment_config.num_replicas))
             new_deployment_config.num_replicas = decision_num_replicas
 
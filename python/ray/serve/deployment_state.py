@@ -101,6 +101,9 @@ class ActorReplicaWrapper:
 
         self._actor_resources: Dict[str, float] = None
         self._max_concurrent_queries: int = None
+        self._max_queued_requests: int = 0
+        self._queue_timeout_s: float = 0
+        self._node_id: Optional[str] = None
         self._graceful_shutdown_timeout_s: float = 0.0
         self._health_check_ref: ObjectRef = None
         # NOTE: storing these is necessary to keep the actor and PG alive in
@@ -134,6 +137,18 @@ class ActorReplicaWrapper:
     def max_concurrent_queries(self) -> int:
         return self._max_concurrent_queries
 
+    @property
+    def max_queued_requests(self) -> int:
+        return self._max_queued_requests
+
+    @property
+    def queue_timeout_s(self) -> float:
+        return self._queue_timeout_s
+
+    @property
+    def node_id(self) -> Optional[str]:
+        return self._node_id
+
     def create_placement_group(self, placement_group_name: str,
                                actor_resources: dict) -> PlacementGroup:
         # Only need one placement group per actor
@@ -170,6 +185,10 @@ class ActorReplicaWrapper:
         self._actor_resources = deployment_info.replica_config.resource_dict
         self._max_concurrent_queries = (
             deployment_info.deployment_config.max_concurrent_queries)
+        self._max_queued_requests = (
+            deployment_info.deployment_config.max_queued_requests)
+        self._queue_timeout_s = (
+            deployment_info.deployment_config.queue_timeout_s)
         self._graceful_shutdown_timeout_s = (
             deployment_info.deployment_config.graceful_shutdown_timeout_s)
         if USE_PLACEMENT_GROUP:
@@ -259,6 +278,11 @@ class ActorReplicaWrapper:
         ready, _ = ray.wait([self._allocated_obj_ref], timeout=0)
         if len(ready) == 0:
             return ReplicaStartupStatus.PENDING_ALLOCATION, None
+        if self._node_id is None:
+            try:
+                self._node_id = ray.get(self._allocated_obj_ref)
+            except Exception:
+                return ReplicaStartupStatus.FAILED, None
 
         # check whether relica initialization has completed
         ready, _ = ray.wait([self._ready_obj_ref], timeout=0)
@@ -271,6 +295,9 @@ class ActorReplicaWrapper:
                 deployment_config, version = ray.get(ready)[0]
                 self._max_concurrent_queries = (
                     deployment_config.max_concurrent_queries)
+                self._max_queued_requests = (
+                    deployment_config.max_queued_requests)
+                self._queue_timeout_s = deployment_config.queue_timeout_s
                 self._graceful_shutdown_timeout_s = (
                     deployment_config.graceful_shutdown_timeout_s)
             except Exception:
@@ -368,6 +395,9 @@ class DeploymentReplica(VersionedReplica):
             replica_tag=self._replica_tag,
             actor_handle=self._actor.actor_handle,
             max_concurrent_queries=self._actor.max_concurrent_queries,
+            node_id=self._actor.node_id,
+            max_queued_requests=self._actor.max_queued_requests,
+            queue_timeout_s=self._actor.queue_timeout_s,
         )
         return self._actor.get_running_replica_info()
 
@@ -1,2 +1,11 @@
 class RayServeException(Exception):
     pass
+
+
+class BackPressureError(RayServeException):
+    """Raised when a query is rejected since its deployment is overloaded.
+
+    This happens when the queue of the handle is at max_queued_requests, or
+    the query waited queue_timeout_s for a free replica.
+    """
+    pass
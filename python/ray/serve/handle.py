@@ -33,6 +33,7 @@ class HandleOptions:
     shard_key: Optional[str] = None
     http_method: str = "GET"
     http_headers: Dict[str, str] = field(default_factory=dict)
+    priority: int = 0
 
 
 # Use a global singleton enum to emulate default options. We cannot use None
@@ -123,6 +124,7 @@ class RayServeHandle:
             shard_key: Union[str, DEFAULT] = DEFAULT.VALUE,
             http_method: Union[str, DEFAULT] = DEFAULT.VALUE,
             http_headers: Union[Dict[str, str], DEFAULT] = DEFAULT.VALUE,
+            priority: Union[int, DEFAULT] = DEFAULT.VALUE,
     ):
         """Set options for this handle.
 
@@ -130,14 +132,20 @@ class RayServeHandle:
             method_name(str): The method to invoke.
             http_method(str): The HTTP method to use for the request.
             shard_key(str): A string to use to deterministically map this
-                request to a deployment if there are multiple.
+                request to a replica while it has free capacity, e.g. the ID
+                of a multiplexed model, see serve.multiplexed.
+            priority(int): Queries with a higher priority are assigned to
+                replicas first while they're busy, and are rejected last
+                when the queue is at max_queued_requests. Defaults to 0.
         """
         new_options_dict = self.handle_options.__dict__.copy()
         user_modified_options_dict = {
             key: value
             for key, value in
-            zip(["method_name", "shard_key", "http_method", "http_headers"],
-                [method_name, shard_key, http_method, http_headers])
+            zip([
+                "method_name", "shard_key", "http_method", "http_headers",
+                "priority"
+            ], [method_name, shard_key, http_method, http_headers, priority])
             if value != DEFAULT.VALUE
         }
         new_options_dict.update(user_modified_options_dict)
@@ -161,6 +169,7 @@ class RayServeHandle:
             http_method=handle_options.http_method,
             http_headers=handle_options.http_headers,
             http_arg_is_pickled=self._pickled_http_request,
+            priority=handle_options.priority,
         )
         coro = self.router.assign_request(request_metadata, *args, **kwargs)
         return coro
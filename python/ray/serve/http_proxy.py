@@ -1,4 +1,5 @@
 import asyncio
+from collections import OrderedDict
 import socket
 import time
 import pickle
@@ -12,28 +13,29 @@ import ray
 from ray import serve
 from ray.exceptions import RayActorError, RayTaskError
 from ray.serve.common import EndpointInfo, EndpointTag
+from ray.serve.exceptions import BackPressureError
 from ray.serve.long_poll import LongPollNamespace
 from ray.util import metrics
 from ray.serve.utils import logger
 from ray.serve.handle import RayServeHandle
-from ray.serve.http_util import HTTPRequestWrapper, receive_http_body, Response
+from ray.serve.http_util import (HTTPRequestWrapper, receive_http_body,
+                                 Response, StreamedResponse)
 from ray.serve.long_poll import LongPollClient
 from ray.serve.handle import DEFAULT
 
 MAX_REPLICA_FAILURE_RETRIES = 10
+#: The maximum number of handles with per-request options cached by the
+#: proxy, keyed by route, method name and HTTP method.
+MAX_CACHED_HANDLE_VARIANTS = 1024
+
+_CALL_METHOD_HEADER = b"x-serve-call-method"
+_SHARD_KEY_HEADER = b"x-serve-shard-key"
+_PRIORITY_HEADER = b"x-serve-priority"
 
 
 async def _send_request_to_handle(handle, scope, receive, send):
     http_body_bytes = await receive_http_body(scope, receive, send)
 
-    headers = {k.decode(): v.decode() for k, v in scope["headers"]}
-    handle = handle.options(
-        method_name=headers.get("X-SERVE-CALL-METHOD".lower(), DEFAULT.VALUE),
-        shard_key=headers.get("X-SERVE-SHARD-KEY".lower(), DEFAULT.VALUE),
-        http_method=scope["method"].upper(),
-        http_headers=headers,
-    )
-
     # scope["router"] and scope["endpoint"] contain references to a router
     # and endpoint object, respectively, which each in turn contain a
     # reference to the Serve client, which cannot be serialized.
@@ -55,7 +57,13 @@ async def _send_request_to_handle(handle, scope, receive, send):
     retries = 0
     backoff_time_s = 0.05
     while retries < MAX_REPLICA_FAILURE_RETRIES:
-        object_ref = await handle.remote(request)
+        try:
+            object_ref = await handle.remote(request)
+        except BackPressureError as error:
+            # Fail fast, so that clients can retry or back off.
+            await Response(
+                str(error), status_code=503).send(scope, receive, send)
+            return
         try:
             result = await object_ref
             break
@@ -81,24 +89,106 @@ async def _send_request_to_handle(handle, scope, receive, send):
             error_message, status_code=500).send(scope, receive, send)
         return
 
-    if isinstance(result, starlette.responses.Response):
+    if isinstance(result, StreamedResponse):
+        await _send_streamed_response(result, scope, receive, send)
+    elif isinstance(result, starlette.responses.Response):
         await result(scope, receive, send)
     else:
         await Response(result).send(scope, receive, send)
 
 
+async def _send_streamed_response(response: StreamedResponse, scope, receive,
+                                  send):
+    """Forward the chunks of a streamed response as the replica produces them.
+
+    The next chunks are pulled while the previous ones are sent, and the
+    replica only buffers a bounded number of chunks ahead, so a slow client
+    applies backpressure to the replica. If the client disconnects, the
+    replica stops producing chunks.
+    """
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": response.raw_headers,
+    })
+
+    def pull_chunks() -> asyncio.Future:
+        return asyncio.wrap_future(
+            response.replica_handle.next_response_chunks.remote(
+                response.stream_id).future())
+
+    disconnected = asyncio.get_event_loop().create_task(
+        _wait_for_disconnect(receive))
+    next_chunks = pull_chunks()
+    try:
+        while True:
+            await asyncio.wait([next_chunks, disconnected],
+                               return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                response.replica_handle.cancel_response_stream.remote(
+                    response.stream_id)
+                return
+            chunks = next_chunks.result()
+            if chunks is None:
+                break
+            next_chunks = pull_chunks()
+            for chunk in chunks:
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                })
+    except (RayTaskError, RayActorError) as error:
+        # The status was already sent, so end the response without its final
+        # chunk, which tells the client that it's incomplete.
+        logger.error(f"Streamed response failed: {error}")
+        return
+    finally:
+        disconnected.cancel()
+
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def _wait_for_disconnect(receive):
+    # The request body was already received, so the next message is the
+    # client disconnecting.
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class _RouteTrieNode:
+    """A node in the trie of route path segments."""
+
+    __slots__ = ("children", "route", "prefix_route")
+
+    def __init__(self):
+        self.children: Dict[str, "_RouteTrieNode"] = dict()
+        # The route that ends at this node, e.g. '/a/b' for the node of
+        # the segments ['', 'a', 'b'].
+        self.route: Optional[str] = None
+        # The route that ends at this node with a trailing '/', e.g. '/a/b/'.
+        # It only matches paths with more segments after this node.
+        self.prefix_route: Optional[str] = None
+
+
 class LongestPrefixRouter:
     """Router that performs longest prefix matches on incoming routes."""
 
     def __init__(self, get_handle: Callable):
         # Function to get a handle given a name. Used to mock for testing.
         self._get_handle = get_handle
-        # Routes sorted in order of decreasing length.
-        self.sorted_routes: List[str] = list()
+        # Trie of the route path segments, for longest prefix matching.
+        self._route_trie = _RouteTrieNode()
         # Endpoints associated with the routes.
         self.route_info: Dict[str, EndpointTag] = dict()
         # Contains a ServeHandle for each endpoint.
         self.handles: Dict[str, RayServeHandle] = dict()
+        # Handles with the options of a request, keyed by (route,
+        # method_name, http_method), in LRU order.
+        self._handle_variants: ("OrderedDict[Tuple[str, str, str], "
+                                "RayServeHandle]") = OrderedDict()
 
     def endpoint_exists(self, endpoint: EndpointTag) -> bool:
         return endpoint in self.handles
@@ -108,7 +198,7 @@ class LongestPrefixRouter:
         logger.debug(f"Got updated endpoints: {endpoints}.")
 
         existing_handles = set(self.handles.keys())
-        routes = []
+        route_trie = _RouteTrieNode()
         route_info = {}
         for endpoint, info in endpoints.items():
             # Default case where the user did not specify a route prefix.
@@ -117,7 +207,7 @@ class LongestPrefixRouter:
             else:
                 route = info.route
 
-            routes.append(route)
+            _insert_route(route_trie, route)
             route_info[route] = endpoint
             if endpoint in self.handles:
                 existing_handles.remove(endpoint)
@@ -128,15 +218,24 @@ class LongestPrefixRouter:
         for endpoint in existing_handles:
             del self.handles[endpoint]
 
-        # Routes are sorted in order of decreasing length to enable longest
-        # prefix matching.
-        self.sorted_routes = sorted(routes, key=lambda x: len(x), reverse=True)
+        # Drop the handle variants of routes that were removed or now point
+        # to a different endpoint.
+        for key in list(self._handle_variants.keys()):
+            if route_info.get(key[0]) != self.route_info.get(key[0]):
+                del self._handle_variants[key]
+
+        self._route_trie = route_trie
         self.route_info = route_info
 
     def match_route(self, target_route: str
                     ) -> Tuple[Optional[str], Optional[RayServeHandle]]:
         """Return the longest prefix match among existing routes for the route.
 
+        A route matches if it's a prefix of the target route that ends at a
+        path segment boundary, i.e. '/route' matches '/route' and
+        '/route/suffix' but not '/routesuffix'. A route ending in a '/' only
+        matches target routes that continue past it.
+
         Args:
             target_route (str): route to match against.
 
@@ -144,29 +243,56 @@ class LongestPrefixRouter:
             (matched_route (str), serve_handle (RayServeHandle)) if found,
             else (None, None).
         """
-
-        for route in self.sorted_routes:
-            if target_route.startswith(route):
-                matched = False
-                # If the route we matched on ends in a '/', then so does the
-                # target route and this must be a match.
-                if route.endswith("/"):
-                    matched = True
-                # If the route we matched on doesn't end in a '/', we need to
-                # do another check to ensure that either this is an exact match
-                # or the next character in the target route is a '/'. This is
-                # to guard against the scenario where we have '/route' as a
-                # prefix and there's a request to '/routesuffix'. In this case,
-                # it should *not* be a match.
-                elif (len(target_route) == len(route)
-                      or target_route[len(route)] == "/"):
-                    matched = True
-
-                if matched:
-                    endpoint = self.route_info[route]
-                    return route, self.handles[endpoint]
-
-        return None, None
+        segments = target_route.split("/")
+        matched = None
+        node = self._route_trie
+        for i, segment in enumerate(segments):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            # At the same node, the route with the trailing '/' is longer.
+            if node.prefix_route is not None and i + 1 < len(segments):
+                matched = node.prefix_route
+            elif node.route is not None:
+                matched = node.route
+
+        if matched is None:
+            return None, None
+        return matched, self.handles[self.route_info[matched]]
+
+    def get_handle_variant(self, route: str, handle: RayServeHandle,
+                           method_name: str,
+                           http_method: str) -> RayServeHandle:
+        """Return the handle of a route with the given options, cached.
+
+        The cache is bounded, since the method name comes from a header of
+        the request.
+        """
+        key = (route, method_name, http_method)
+        variant = self._handle_variants.get(key)
+        if variant is None:
+            variant = handle.options(
+                method_name=method_name, http_method=http_method)
+            self._handle_variants[key] = variant
+            if len(self._handle_variants) > MAX_CACHED_HANDLE_VARIANTS:
+                self._handle_variants.popitem(last=False)
+        else:
+            self._handle_variants.move_to_end(key)
+        return variant
+
+
+def _insert_route(route_trie: _RouteTrieNode, route: str) -> None:
+    segments = route.split("/")
+    is_prefix_route = len(segments) > 1 and segments[-1] == ""
+    if is_prefix_route:
+        segments = segments[:-1]
+    node = route_trie
+    for segment in segments:
+        node = node.children.setdefault(segment, _RouteTrieNode())
+    if is_prefix_route:
+        node.prefix_route = route
+    else:
+        node.route = route
 
 
 class HTTPProxy:
@@ -259,6 +385,29 @@ class HTTPProxy:
             scope["path"] = scope["path"].replace(route_prefix, "", 1)
             scope["root_path"] = route_prefix
 
+        # Only look up the serve headers, rather than decoding all of them.
+        method_name = DEFAULT.VALUE
+        shard_key = DEFAULT.VALUE
+        priority = DEFAULT.VALUE
+        for key, value in scope["headers"]:
+            if key == _CALL_METHOD_HEADER:
+                method_name = value.decode()
+            elif key == _SHARD_KEY_HEADER:
+                shard_key = value.decode()
+            elif key == _PRIORITY_HEADER:
+                try:
+                    priority = int(value)
+                except ValueError:
+                    return await Response(
+                        "X-Serve-Priority must be an integer.",
+                        status_code=400).send(scope, receive, send)
+        if method_name == DEFAULT.VALUE:
+            method_name = handle.handle_options.method_name
+        handle = self.prefix_router.get_handle_variant(
+            route_prefix, handle, method_name, scope["method"].upper())
+        if shard_key != DEFAULT.VALUE or priority != DEFAULT.VALUE:
+            handle = handle.options(shard_key=shard_key, priority=priority)
+
         await _send_request_to_handle(handle, scope, receive, send)
 
 
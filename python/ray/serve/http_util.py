@@ -2,13 +2,18 @@ import asyncio
 from dataclasses import dataclass
 import inspect
 import json
-from typing import Any, Dict, List, Optional, Tuple, Type
+import logging
+from typing import (Any, AsyncIterator, Callable, Dict, Iterator, List,
+                    Optional, Tuple, Type, Union)
 
 import starlette.responses
 import starlette.requests
 
 from ray.serve.exceptions import RayServeException
 
+# Not ray.serve.utils.logger, since utils depends on http_util.
+logger = logging.getLogger("ray.serve")
+
 
 @dataclass
 class HTTPRequestWrapper:
@@ -140,6 +145,170 @@ class ASGIHTTPSender:
         return resp
 
 
+@dataclass
+class StreamedResponse:
+    """Returned by a replica in place of a streamed HTTP response.
+
+    The HTTP proxy sends the status and headers, then pulls the chunks of the
+    body from the replica, which buffers them in a ResponseStream.
+    """
+    stream_id: str
+    replica_handle: Any
+    status_code: int
+    raw_headers: List[Tuple[bytes, bytes]]
+
+
+# Marks the end of the chunks in a ResponseStream.
+_END_OF_STREAM = object()
+
+
+class ResponseStream:
+    """Buffers the chunks of a streamed HTTP response in a replica.
+
+    A background task iterates the body and buffers up to max_buffered_chunks
+    chunks ahead of the HTTP proxy pulling them with next_chunks(), which
+    applies backpressure to the body. The task stops when the proxy pulled
+    every chunk, the stream is cancelled, or the proxy makes no pull for
+    idle_timeout_s, after which on_close is called. The idle timeout doesn't
+    run while a pull waits for chunks, since bodies may go quiet for long,
+    e.g. between server-sent events.
+    """
+
+    def __init__(self, body: Union[Iterator, AsyncIterator],
+                 max_buffered_chunks: int, idle_timeout_s: float,
+                 on_close: Callable[[], None]):
+        self._queue = asyncio.Queue(max_buffered_chunks)
+        self._idle_timeout_s = idle_timeout_s
+        self._drained = asyncio.Event()
+        self._done = False
+        self._error: Optional[Exception] = None
+        self._num_pending_pulls = 0
+        self._task = asyncio.get_event_loop().create_task(
+            self._buffer_chunks(body))
+        # Not in the task's finally block, which doesn't run if the task is
+        # cancelled before it started.
+        self._task.add_done_callback(lambda _: on_close())
+        self._idle_timer = None
+        self._reset_idle_timer()
+
+    def _reset_idle_timer(self):
+        self._stop_idle_timer()
+        self._idle_timer = asyncio.get_event_loop().call_later(
+            self._idle_timeout_s, self._abandon)
+
+    def _stop_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _abandon(self):
+        if self._task.done():
+            return
+        logger.warning("Abandoning a streamed response, since no chunks "
+                       f"were pulled for {self._idle_timeout_s}s.")
+        self._stop("abandoned")
+
+    def _stop(self, reason: str):
+        """Stop iterating the body and fail the pending and later pulls."""
+        if self._task.done():
+            return
+        self._task.cancel()
+        # The buffered chunks are dropped. A pull only waits while the queue
+        # is empty, so this also wakes up the pending pulls, which would
+        # otherwise wait forever.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(
+            RayServeException(f"The streamed response was {reason}."))
+
+    async def _buffer_chunks(self, body: Union[Iterator, AsyncIterator]):
+        try:
+            try:
+                if hasattr(body, "__aiter__"):
+                    async for chunk in body:
+                        await self._queue.put(_encode_chunk(chunk))
+                else:
+                    await self._buffer_sync_chunks(iter(body))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._queue.put(e)
+            else:
+                await self._queue.put(_END_OF_STREAM)
+            # Keep the stream around until the proxy pulled every chunk.
+            await self._drained.wait()
+        finally:
+            self._stop_idle_timer()
+            try:
+                if hasattr(body, "aclose"):
+                    await body.aclose()
+                elif hasattr(body, "close"):
+                    body.close()
+            except Exception:
+                # E.g. a blocking body still running in its thread.
+                logger.debug("Failed to close the body of a streamed "
+                             "response.")
+
+    async def _buffer_sync_chunks(self, body: Iterator):
+        # Iterate in a thread, since a blocking body would otherwise block
+        # the event loop of the replica.
+        loop = asyncio.get_event_loop()
+        while True:
+            chunk = await loop.run_in_executor(None, next, body,
+                                               _END_OF_STREAM)
+            if chunk is _END_OF_STREAM:
+                break
+            await self._queue.put(_encode_chunk(chunk))
+
+    async def wait_closed(self):
+        """Wait until the stream is closed, however it ends."""
+        await asyncio.wait([self._task])
+
+    async def next_chunks(self) -> Optional[List[bytes]]:
+        """Wait for and return the buffered chunks of the body.
+
+        Returns:
+            At least one chunk, or None once the body is exhausted.
+
+        Raises:
+            The exception raised by the body, after its preceding chunks.
+        """
+        self._stop_idle_timer()
+        self._num_pending_pulls += 1
+        chunks = []
+        try:
+            while not self._done and (not chunks or not self._queue.empty()):
+                item = await self._queue.get()
+                if item is _END_OF_STREAM:
+                    self._done = True
+                elif isinstance(item, Exception):
+                    self._done = True
+                    self._error = item
+                else:
+                    chunks.append(item)
+        finally:
+            self._num_pending_pulls -= 1
+            if self._num_pending_pulls == 0 and not self._task.done():
+                self._reset_idle_timer()
+
+        if chunks:
+            return chunks
+        self._drained.set()
+        if self._error is not None:
+            raise self._error
+        return None
+
+    def cancel(self):
+        """Stop iterating the body, e.g. after the client disconnected."""
+        self._stop("cancelled")
+
+
+def _encode_chunk(chunk: Union[bytes, str]) -> bytes:
+    if isinstance(chunk, str):
+        return chunk.encode("utf-8")
+    return chunk
+
+
 def make_fastapi_class_based_view(fastapi_app, cls: Type) -> None:
     """Transform the `cls`'s methods and class annotations to FastAPI routes.
 
@@ -0,0 +1,226 @@
+import asyncio
+from collections import OrderedDict
+import contextvars
+from functools import wraps
+from inspect import iscoroutinefunction
+import os
+from typing import Any, Callable, Optional, Tuple
+
+import ray
+from ray.serve.batching import extract_self_if_method_call
+from ray.serve.exceptions import RayServeException
+from ray.util import metrics
+
+# The model ID of the request being handled, set by the replica from the
+# shard key of the request.
+_request_model_id: contextvars.ContextVar[Optional[str]] = (
+    contextvars.ContextVar("serve_multiplexed_model_id", default=None))
+
+
+def _set_request_model_id(model_id: Optional[str]) -> None:
+    _request_model_id.set(model_id)
+
+
+def get_multiplexed_model_id() -> str:
+    """Return the model ID of the request being handled by a replica.
+
+    The model ID is the shard key of the request, set with
+    `handle.options(shard_key=model_id)` or the `X-Serve-Shard-Key` HTTP
+    header. Requests with the same shard key are routed to the same replicas
+    when possible, so that they find the model already loaded.
+
+    Raises:
+        RayServeException: if the request has no shard key.
+    """
+    model_id = _request_model_id.get()
+    if model_id is None:
+        raise RayServeException(
+            "The request has no model ID, set it with "
+            "`handle.options(shard_key=model_id)` or the X-Serve-Shard-Key "
+            "HTTP header.")
+    return model_id
+
+
+class _ModelMultiplexWrapper:
+    def __init__(self, load_model_func: Callable, self_arg: Any,
+                 max_num_models_per_replica: int,
+                 max_memory_bytes: Optional[int]):
+        """Loads models by ID and keeps them in an LRU cache.
+
+        The least recently used models are evicted once more than
+        max_num_models_per_replica are loaded, or once the total size of the
+        loaded models exceeds max_memory_bytes. The size of a model is the
+        growth of the resident memory of the process while loading it, which
+        is why models are loaded one at a time. The most recently loaded
+        model is never evicted.
+
+        Arguments:
+            load_model_func (Callable): async function that loads a model
+                given its ID.
+            self_arg (Any): the object that load_model_func is a method of,
+                or None.
+            max_num_models_per_replica (int): max number of loaded models.
+            max_memory_bytes (Optional[int]): max total size of the loaded
+                models, or None for no limit.
+        """
+        self._load_model_func = load_model_func
+        self._self_arg = self_arg
+        self.max_num_models_per_replica = max_num_models_per_replica
+        self.max_memory_bytes = max_memory_bytes
+        # Model ID -> (model, size in bytes), in LRU order.
+        self.models: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._load_lock = asyncio.Lock()
+
+        self._metrics = _MultiplexMetrics() if ray.is_initialized() else None
+
+    async def load_model(self, model_id: str) -> Any:
+        """Return the model, loading it first if it isn't loaded yet."""
+        if model_id in self.models:
+            self.models.move_to_end(model_id)
+            return self.models[model_id][0]
+
+        # Concurrent requests for a model wait for the same load.
+        async with self._load_lock:
+            if model_id in self.models:
+                self.models.move_to_end(model_id)
+                return self.models[model_id][0]
+
+            memory_before = _get_process_memory_bytes()
+            if self._self_arg is None:
+                model = await self._load_model_func(model_id)
+            else:
+                model = await self._load_model_func(self._self_arg, model_id)
+            size_bytes = max(0, _get_process_memory_bytes() - memory_before)
+
+            self.models[model_id] = (model, size_bytes)
+            self._evict()
+            if self._metrics is not None:
+                self._metrics.num_loads.inc()
+                self._metrics.num_models.set(len(self.models))
+            return model
+
+    def _evict(self) -> None:
+        while len(self.models) > 1 and self._over_budget():
+            self.models.popitem(last=False)
+
+    def _over_budget(self) -> bool:
+        if len(self.models) > self.max_num_models_per_replica:
+            return True
+        return (self.max_memory_bytes is not None
+                and self.total_size_bytes > self.max_memory_bytes)
+
+    @property
+    def total_size_bytes(self) -> int:
+        return sum(size_bytes for _, size_bytes in self.models.values())
+
+
+class _MultiplexMetrics:
+    """The metrics exported by a model multiplexer, tagged by its replica."""
+
+    def __init__(self):
+        # Delayed import since api depends on the replica.
+        from ray.serve.api import _INTERNAL_REPLICA_CONTEXT as replica_context
+        tags = {"deployment": "", "replica": ""}
+        if replica_context is not None:
+            tags["deployment"] = replica_context.deployment
+            tags["replica"] = replica_context.replica_tag
+        tag_keys = tuple(tags.keys())
+
+        self.num_models = metrics.Gauge(
+            "serve_multiplexed_models",
+            description="The number of models loaded by the replica.",
+            tag_keys=tag_keys)
+        self.num_loads = metrics.Counter(
+            "serve_multiplexed_model_loads",
+            description="The number of models loaded by the replica.",
+            tag_keys=tag_keys)
+        for metric in [self.num_models, self.num_loads]:
+            metric.set_default_tags(tags)
+
+
+def _get_process_memory_bytes() -> int:
+    import psutil
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def multiplexed(_func: Optional[Callable] = None,
+                max_num_models_per_replica: int = 3,
+                max_memory_bytes: Optional[int] = None):
+    """Converts a function that loads a model into an LRU cache of models.
+
+    The function can be a standalone function or a class method, must be
+    `async def` and take a model ID as its only argument. Each replica keeps
+    the models it loaded until it has to evict the least recently used ones,
+    so that a deployment can serve many more models than it has replicas.
+    Requests carry the model ID as their shard key, which routes requests
+    for a model to the same replicas while they have free capacity.
+
+    >>> @serve.deployment
+        class Models:
+            @serve.multiplexed(max_num_models_per_replica=10)
+            async def get_model(self, model_id: str):
+                return await load_model_from_storage(model_id)
+
+            async def __call__(self, request):
+                model = await self.get_model(serve.get_multiplexed_model_id())
+                return model(request)
+
+    >>> handle.options(shard_key="customer-1").remote(data)
+
+    Arguments:
+        max_num_models_per_replica (int): the maximum number of models that
+            each replica keeps loaded.
+        max_memory_bytes (Optional[int]): the maximum total memory of the
+            models that each replica keeps loaded, measured as the growth of
+            the memory of the replica while loading each model. Defaults to
+            no limit.
+    """
+    if _func is not None:
+        if not callable(_func):
+            raise TypeError("@serve.multiplexed can only be used to "
+                            "decorate functions or methods.")
+
+        if not iscoroutinefunction(_func):
+            raise TypeError("Functions decorated with @serve.multiplexed "
+                            "must be 'async def'")
+
+    if not isinstance(max_num_models_per_replica, int):
+        raise TypeError("max_num_models_per_replica must be an integer >= 1")
+
+    if max_num_models_per_replica < 1:
+        raise ValueError("max_num_models_per_replica must be an integer >= 1")
+
+    if max_memory_bytes is not None:
+        if not isinstance(max_memory_bytes, int):
+            raise TypeError("max_memory_bytes must be an integer > 0")
+        if max_memory_bytes <= 0:
+            raise ValueError("max_memory_bytes must be an integer > 0")
+
+    def _multiplex_decorator(_func):
+        @wraps(_func)
+        async def multiplex_wrapper(*args):
+            args = list(args)
+            self = extract_self_if_method_call(args, _func)
+
+            if len(args) != 1:
+                raise ValueError("@serve.multiplexed functions can only take "
+                                 "a model ID as input")
+
+            # Like @serve.batch, lazily construct the cache of models under a
+            # custom attribute of the object or function.
+            multiplex_object = _func if self is None else self
+            multiplex_attr = f"__serve_multiplex_{_func.__name__}"
+            if not hasattr(multiplex_object, multiplex_attr):
+                setattr(multiplex_object, multiplex_attr,
+                        _ModelMultiplexWrapper(_func, self,
+                                               max_num_models_per_replica,
+                                               max_memory_bytes))
+            return await getattr(multiplex_object,
+                                 multiplex_attr).load_model(args[0])
+
+        return multiplex_wrapper
+
+    # Handles both @serve.multiplexed and @serve.multiplexed(**kwargs), see
+    # serve.batch.
+    return (_multiplex_decorator(_func)
+            if callable(_func) else _multiplex_decorator)
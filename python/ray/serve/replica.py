@@ -1,9 +1,11 @@
 import asyncio
+from collections import deque
 import logging
 import pickle
+import threading
 import traceback
 import inspect
-from typing import Any, Callable, Optional, Tuple, Dict
+from typing import Any, Callable, List, Optional, Tuple, Dict
 import time
 
 import starlette.responses
@@ -13,17 +15,24 @@ from ray import cloudpickle
 from ray.actor import ActorHandle
 from ray._private.async_compat import sync_to_async
 
-from ray.serve.autoscaling_metrics import start_metrics_pusher
+from ray.serve.autoscaling_metrics import (
+    start_metrics_pusher, LATENCY_MS_KEY_SUFFIX, QUEUED_REQUESTS_KEY_SUFFIX)
 from ray.serve.common import str, ReplicaTag
 from ray.serve.config import DeploymentConfig
-from ray.serve.http_util import ASGIHTTPSender
-from ray.serve.utils import parse_request_item, _get_logger
+from ray.serve.multiplex import _set_request_model_id
+from ray.serve.http_util import (ASGIHTTPSender, ResponseStream,
+                                 StreamedResponse)
+from ray.serve.utils import (parse_request_item, _get_logger,
+                             get_random_letters)
 from ray.serve.exceptions import RayServeException
 from ray.util import metrics
 from ray.serve.router import Query, RequestMetadata
 from ray.serve.constants import (
+    AUTOSCALING_MAX_LATENCY_SAMPLES,
     RECONFIGURE_METHOD,
     DEFAULT_LATENCY_BUCKET_MS,
+    STREAM_IDLE_TIMEOUT_S,
+    STREAM_MAX_BUFFERED_CHUNKS,
 )
 from ray.serve.version import DeploymentVersion
 from ray.exceptions import RayTaskError
@@ -126,6 +135,16 @@ def create_replica_wrapper(name: str, serialized_deployment_def: bytes):
             query = Query(request_args, request_kwargs, request_metadata)
             return await self.replica.handle_request(query)
 
+        async def next_response_chunks(
+                self, stream_id: str) -> Optional[List[bytes]]:
+            return await self.replica.next_response_chunks(stream_id)
+
+        def cancel_response_stream(self, stream_id: str):
+            self.replica.cancel_response_stream(stream_id)
+
+        async def wait_for_response_stream(self, stream_id: str):
+            await self.replica.wait_for_response_stream(stream_id)
+
         async def is_allocated(self):
             """poke the replica to check whether it's alive.
 
@@ -134,8 +153,11 @@ def create_replica_wrapper(name: str, serialized_deployment_def: bytes):
             detect when a replica has been allocated a worker slot.
             At this time, the replica can transition from PENDING_ALLOCATION
             to PENDING_INITIALIZATION startup state.
+
+            Returns:
+                The ID of the node the replica was allocated on.
             """
-            pass
+            return ray.get_runtime_context().node_id.hex()
 
         async def reconfigure(self, user_config: Optional[Any] = None
                               ) -> Tuple[DeploymentConfig, DeploymentVersion]:
@@ -190,6 +212,8 @@ class RayServeReplica:
         self.version = version
 
         self.num_ongoing_requests = 0
+        # Streamed HTTP responses whose chunks the HTTP proxy is pulling.
+        self._response_streams: Dict[str, ResponseStream] = dict()
 
         self.request_counter = metrics.Counter(
             "serve_deployment_request_counter",
@@ -245,6 +269,12 @@ class RayServeReplica:
         self._shutdown_wait_loop_s = (
             deployment_config.graceful_shutdown_wait_loop_s)
 
+        # The latest processing latencies since the autoscaling metrics were
+        # last pushed. The lock guards against the metrics pusher thread.
+        self._latency_samples_ms = deque(
+            maxlen=AUTOSCALING_MAX_LATENCY_SAMPLES)
+        self._latency_samples_lock = threading.Lock()
+
         if deployment_config.autoscaling_config:
             config = deployment_config.autoscaling_config
             start_metrics_pusher(
@@ -270,11 +300,21 @@ class RayServeReplica:
         method_stat = self._get_handle_request_stats()
 
         num_inflight_requests = 0
+        num_queued_requests = 0
         if method_stat is not None:
             num_inflight_requests = (
                 method_stat["pending"] + method_stat["running"])
+            num_queued_requests = method_stat["pending"]
+
+        with self._latency_samples_lock:
+            latency_samples_ms = list(self._latency_samples_ms)
+            self._latency_samples_ms.clear()
 
-        return {self.replica_tag: num_inflight_requests}
+        return {
+            self.replica_tag: num_inflight_requests,
+            self.replica_tag + QUEUED_REQUESTS_KEY_SUFFIX: num_queued_requests,
+            self.deployment_name + LATENCY_MS_KEY_SUFFIX: latency_samples_ms,
+        }
 
     def get_runner_method(self, request_item: Query) -> Callable:
         method_name = request_item.metadata.call_method
@@ -296,7 +336,18 @@ class RayServeReplica:
             return self.callable
         return getattr(self.callable, method_name)
 
-    async def ensure_serializable_response(self, response: Any) -> Any:
+    async def ensure_serializable_response(self, response: Any,
+                                           stream: bool = False) -> Any:
+        if stream and isinstance(response,
+                                 starlette.responses.StreamingResponse):
+            return self._stream_response(response.body_iterator,
+                                         response.status_code,
+                                         response.raw_headers,
+                                         response.background)
+        if stream and (inspect.isgenerator(response)
+                       or inspect.isasyncgen(response)):
+            return self._stream_response(
+                response, 200, [(b"content-type", b"text/plain")])
         if isinstance(response, starlette.responses.StreamingResponse):
 
             async def mock_receive():
@@ -311,6 +362,46 @@ class RayServeReplica:
             return sender.build_starlette_response()
         return response
 
+    def _stream_response(self,
+                         body: Any,
+                         status_code: int,
+                         raw_headers: List[Tuple[bytes, bytes]],
+                         background: Optional[Callable] = None
+                         ) -> StreamedResponse:
+        """Buffer the body for the HTTP proxy to pull its chunks."""
+        stream_id = get_random_letters(16)
+
+        def on_close():
+            del self._response_streams[stream_id]
+            if background is not None:
+                asyncio.get_event_loop().create_task(background())
+
+        self._response_streams[stream_id] = ResponseStream(
+            body, STREAM_MAX_BUFFERED_CHUNKS, STREAM_IDLE_TIMEOUT_S, on_close)
+        return StreamedResponse(stream_id,
+                                ray.get_runtime_context().current_actor,
+                                status_code, raw_headers)
+
+    async def next_response_chunks(self,
+                                   stream_id: str) -> Optional[List[bytes]]:
+        stream = self._response_streams.get(stream_id)
+        if stream is None:
+            raise RayServeException(
+                f"Streamed response {stream_id} doesn't exist, it may have "
+                "been abandoned.")
+        return await stream.next_chunks()
+
+    def cancel_response_stream(self, stream_id: str):
+        stream = self._response_streams.get(stream_id)
+        if stream is not None:
+            stream.cancel()
+
+    async def wait_for_response_stream(self, stream_id: str):
+        """Wait until the streamed response is closed, however it ends."""
+        stream = self._response_streams.get(stream_id)
+        if stream is not None:
+            await stream.wait_closed()
+
     async def invoke_single(self, request_item: Query) -> Any:
         logger.debug("Replica {} started executing request {}".format(
             self.replica_tag, request_item.metadata.request_id))
@@ -318,6 +409,8 @@ class RayServeReplica:
 
         start = time.time()
         method_to_call = None
+        # For serve.get_multiplexed_model_id().
+        _set_request_model_id(request_item.metadata.shard_key)
         try:
             runner_method = self.get_runner_method(request_item)
             method_to_call = sync_to_async(runner_method)
@@ -329,7 +422,9 @@ class RayServeReplica:
                 # information, so we pass nothing into it
                 result = await method_to_call()
 
-            result = await self.ensure_serializable_response(result)
+            # Only HTTP requests through the proxy can stream the response.
+            result = await self.ensure_serializable_response(
+                result, stream=request_item.metadata.http_arg_is_pickled)
             self.request_counter.inc()
         except Exception as e:
             import os
@@ -374,7 +469,23 @@ class RayServeReplica:
         logger.debug("Replica {} finished request {} in {:.2f}ms".format(
             self.replica_tag, request.metadata.request_id, request_time_ms))
 
-        # Returns a small object for router to track request status.
+        # Autoscale on the end to end latency, including the time that the
+        # request was queued for at the router and at this replica. The
+        # router's clock may be on another node, so never report less than
+        # the time spent in this replica.
+        latency_ms = request_time_ms
+        if request.metadata.tick_enter_router > 0:
+            latency_ms = max(
+                latency_ms,
+                (time.time() - request.metadata.tick_enter_router) * 1000)
+        with self._latency_samples_lock:
+            self._latency_samples_ms.append(latency_ms)
+
+        # Returns a small object for router to track request status. For
+        # streamed responses, that's the ID of the stream, which the router
+        # keeps in flight until the stream is closed.
+        if isinstance(result, StreamedResponse):
+            return result.stream_id, result
         return b"", result
 
     async def prepare_for_shutdown(self):
@@ -391,8 +502,10 @@ class RayServeReplica:
             # The handle_request method wasn't even invoked.
             if method_stat is None:
                 break
-            # The handle_request method has 0 inflight requests.
-            if method_stat["running"] + method_stat["pending"] == 0:
+            # The handle_request method has 0 inflight requests, and the
+            # HTTP proxy pulled every streamed response.
+            if (method_stat["running"] + method_stat["pending"] == 0
+                    and not self._response_streams):
                 break
             else:
                 logger.info(
@@ -1,13 +1,18 @@
-import sys
+import os
 import asyncio
+import hashlib
+import heapq
 import pickle
 import itertools
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import random
+import time
 
 from ray.actor import ActorHandle
 from ray.serve.common import str, ReplicaTag, RunningReplicaInfo
+from ray.serve.exceptions import BackPressureError
 from ray.serve.long_poll import LongPollClient, LongPollNamespace
 from ray.serve.utils import compute_iterable_delta, logger
 
@@ -30,6 +35,14 @@ class RequestMetadata:
     # and it needs to be deserialized by the replica.
     http_arg_is_pickled: bool = False
 
+    # Queries with a higher priority are assigned to replicas first, and are
+    # rejected last when the queue of the router is full.
+    priority: int = 0
+
+    # When the router received the query, so that replicas can report the
+    # latency of the query including the time that it was queued for.
+    tick_enter_router: float = 0
+
     def __post_init__(self):
         self.http_headers.setdefault("X-Serve-Call-Method", self.call_method)
         self.http_headers.setdefault("X-Serve-Shard-Key", self.shard_key)
@@ -42,6 +55,165 @@ class Query:
     metadata: RequestMetadata
 
 
+#: The replica selection policy used by routers that aren't given one, one of
+#: "round_robin", "least_loaded", "power_of_two" and "node_local".
+DEFAULT_REPLICA_SELECTION_POLICY = os.environ.get(
+    "SERVE_REPLICA_SELECTION_POLICY", "round_robin")
+#: The maximum number of shard keys whose rendezvous order over the current
+#: replicas each router caches.
+MAX_CACHED_RENDEZVOUS_ORDERS = 1024
+
+
+class ReplicaSelectionPolicy:
+    """Chooses the replica that each query is assigned to.
+
+    Policies only choose among replicas with fewer in flight queries than
+    their max_concurrent_queries.
+    """
+
+    def update_replicas(self, replicas: List[RunningReplicaInfo]):
+        """Called with the running replicas whenever they change."""
+        pass
+
+    def select_replica(self, in_flight: Dict[RunningReplicaInfo, int]
+                       ) -> Optional[RunningReplicaInfo]:
+        """Choose a replica with free capacity for a query.
+
+        Args:
+            in_flight: The number of in flight queries of each replica.
+
+        Returns:
+            The chosen replica, or None if all replicas are at capacity.
+        """
+        raise NotImplementedError
+
+
+def _available_replicas(in_flight: Dict[RunningReplicaInfo, int]
+                        ) -> List[RunningReplicaInfo]:
+    return [
+        replica for replica, num_queries in in_flight.items()
+        if num_queries < replica.max_concurrent_queries
+    ]
+
+
+def _least_loaded(replicas: List[RunningReplicaInfo],
+                  in_flight: Dict[RunningReplicaInfo, int]
+                  ) -> Optional[RunningReplicaInfo]:
+    if not replicas:
+        return None
+    # Break ties randomly to avoid synchronization across clients.
+    replicas = list(replicas)
+    random.shuffle(replicas)
+    return min(replicas, key=lambda replica: in_flight[replica])
+
+
+def _rendezvous_order(shard_key: str, replicas: List[RunningReplicaInfo]
+                      ) -> List[RunningReplicaInfo]:
+    """Order the replicas by their highest random weight for the shard key.
+
+    Every router computes the same order for a shard key, and removing a
+    replica only moves the shard keys that preferred it.
+    """
+
+    def weight(replica: RunningReplicaInfo) -> bytes:
+        # Not hash(), since it's salted differently in each process.
+        return hashlib.md5(
+            f"{shard_key}#{replica.replica_tag}".encode()).digest()
+
+    return sorted(replicas, key=weight, reverse=True)
+
+
+class RoundRobinPolicy(ReplicaSelectionPolicy):
+    """Cycles through the replicas, skipping overloaded ones."""
+
+    def __init__(self):
+        self.replica_iterator = itertools.cycle([])
+        self.num_replicas = 0
+
+    def update_replicas(self, replicas: List[RunningReplicaInfo]):
+        # Shuffle the replicas to avoid synchronization across clients.
+        replicas = list(replicas)
+        random.shuffle(replicas)
+        self.replica_iterator = itertools.cycle(replicas)
+        self.num_replicas = len(replicas)
+
+    def select_replica(self, in_flight: Dict[RunningReplicaInfo, int]
+                       ) -> Optional[RunningReplicaInfo]:
+        for _ in range(self.num_replicas):
+            replica = next(self.replica_iterator)
+            # Skip replicas that are overloaded or weren't offered.
+            if in_flight.get(replica, replica.max_concurrent_queries
+                             ) < replica.max_concurrent_queries:
+                return replica
+        return None
+
+
+class LeastLoadedPolicy(ReplicaSelectionPolicy):
+    """Picks the replica with the fewest in flight queries."""
+
+    def select_replica(self, in_flight: Dict[RunningReplicaInfo, int]
+                       ) -> Optional[RunningReplicaInfo]:
+        return _least_loaded(_available_replicas(in_flight), in_flight)
+
+
+class PowerOfTwoChoicesPolicy(ReplicaSelectionPolicy):
+    """Picks the less loaded of two random replicas.
+
+    This balances load nearly as well as picking the least loaded replica,
+    while herding less when many routers share stale load information.
+    """
+
+    def select_replica(self, in_flight: Dict[RunningReplicaInfo, int]
+                       ) -> Optional[RunningReplicaInfo]:
+        available = _available_replicas(in_flight)
+        if len(available) > 2:
+            available = random.sample(available, 2)
+        return _least_loaded(available, in_flight)
+
+
+class NodeLocalPolicy(ReplicaSelectionPolicy):
+    """Prefers replicas on the same node as the router.
+
+    Queries are assigned among the local replicas with the given fallback
+    policy, and among all replicas once the local ones are at capacity.
+    """
+
+    def __init__(self, fallback: Optional[ReplicaSelectionPolicy] = None):
+        self.fallback = fallback or PowerOfTwoChoicesPolicy()
+        self.node_id = ray.get_runtime_context().node_id.hex()
+
+    def update_replicas(self, replicas: List[RunningReplicaInfo]):
+        self.fallback.update_replicas(replicas)
+
+    def select_replica(self, in_flight: Dict[RunningReplicaInfo, int]
+                       ) -> Optional[RunningReplicaInfo]:
+        local_in_flight = {
+            replica: num_queries
+            for replica, num_queries in in_flight.items()
+            if replica.node_id == self.node_id
+        }
+        if _available_replicas(local_in_flight):
+            return self.fallback.select_replica(local_in_flight)
+        return self.fallback.select_replica(in_flight)
+
+
+_REPLICA_SELECTION_POLICIES = {
+    "round_robin": RoundRobinPolicy,
+    "least_loaded": LeastLoadedPolicy,
+    "power_of_two": PowerOfTwoChoicesPolicy,
+    "node_local": NodeLocalPolicy,
+}
+
+
+def get_replica_selection_policy(name: str) -> ReplicaSelectionPolicy:
+    """Create a replica selection policy by name."""
+    if name not in _REPLICA_SELECTION_POLICIES:
+        raise ValueError(
+            f"Unknown replica selection policy {name}, expected one of "
+            f"{list(_REPLICA_SELECTION_POLICIES)}.")
+    return _REPLICA_SELECTION_POLICIES[name]()
+
+
 class ReplicaSet:
     """Data structure representing a set of replica actor handles"""
 
@@ -49,28 +221,36 @@ class ReplicaSet:
             self,
             deployment_name,
             event_loop: asyncio.AbstractEventLoop,
+            replica_selection_policy: Optional[ReplicaSelectionPolicy] = None,
     ):
         self.deployment_name = deployment_name
-        self.in_flight_queries: Dict[ReplicaTag, set] = dict()
-        # The iterator used for load balancing among replicas. Using itertools
-        # cycle, we implements a round-robin policy, skipping overloaded
-        # replicas.
-        # NOTE(simon): We can make this more pluggable and consider different
-        # policies like: min load, pick min of two replicas, pick replicas on
-        # the same node.
-        self.replica_iterator = itertools.cycle(self.in_flight_queries.keys())
+        self.in_flight_queries: Dict[RunningReplicaInfo, set] = dict()
+        # The policy used for load balancing among replicas, round-robin by
+        # default.
+        self.replica_selection_policy = (
+            replica_selection_policy or get_replica_selection_policy(
+                DEFAULT_REPLICA_SELECTION_POLICY))
         self.replica_infos: Dict[ReplicaTag, RunningReplicaInfo] = dict()
+        # The rendezvous order of the replicas for recent shard keys, in LRU
+        # order, cleared when the replicas change.
+        self._rendezvous_orders: ("OrderedDict[str, "
+                                  "List[RunningReplicaInfo]]") = OrderedDict()
 
-        # Used to unblock this replica set waiting for free replicas. A newly
-        # added replica or updated max_concurrent_queries value means the
-        # query that waits on a free replica might be unblocked on.
-
-        # Python 3.8 has deprecated the 'loop' parameter, and Python 3.10 has
-        # removed it alltogether. Call accordingly.
-        if sys.version_info.major >= 3 and sys.version_info.minor >= 10:
-            self.config_updated_event = asyncio.Event()
-        else:
-            self.config_updated_event = asyncio.Event(loop=event_loop)
+        # The loop that assigns queries, which completion callbacks of the
+        # queries are scheduled on.
+        self._event_loop = event_loop
+        # Queries waiting for a free replica, as a heap of (-priority,
+        # sequence number, query, future) entries, so that they're assigned
+        # in priority, then FIFO order. The assigned object refs are returned
+        # through the futures. Waiting queries are assigned when a query
+        # completes, since that frees a replica, and when the replicas change.
+        self._waiting_queries: List[Tuple[int, int, Query,
+                                          asyncio.Future]] = []
+        self._waiting_query_counter = itertools.count()
+        # The limits on the waiting queries from the deployment config, 0
+        # for no limit.
+        self.max_queued_requests = 0
+        self.queue_timeout_s = 0
 
         self.num_queued_queries = 0
         self.num_queued_queries_gauge = metrics.Gauge(
@@ -82,6 +262,23 @@ class ReplicaSet:
         self.num_queued_queries_gauge.set_default_tags({
             "deployment": self.deployment_name
         })
+        self.queued_queries_counter = metrics.Counter(
+            "serve_deployment_queued_queries_total",
+            description=("The number of queries to this deployment that "
+                         "waited for a free replica."),
+            tag_keys=("deployment", "endpoint"))
+        self.queued_queries_counter.set_default_tags({
+            "deployment": self.deployment_name
+        })
+        self.shed_queries_counter = metrics.Counter(
+            "serve_deployment_shed_queries",
+            description=("The number of queries to this deployment that were "
+                         "rejected, since the queue was full or they waited "
+                         "for a free replica for too long."),
+            tag_keys=("deployment", "endpoint", "reason"))
+        self.shed_queries_counter.set_default_tags({
+            "deployment": self.deployment_name
+        })
 
     def update_running_replicas(self,
                                 running_replicas: List[RunningReplicaInfo]):
@@ -95,81 +292,203 @@ class ReplicaSet:
             # Delete it directly because shutdown is processed by controller.
             del self.in_flight_queries[removed_replica]
 
+        if running_replicas:
+            # All replicas of a deployment share its config, except during
+            # updates, in which case either config is fine.
+            self.max_queued_requests = running_replicas[0].max_queued_requests
+            self.queue_timeout_s = running_replicas[0].queue_timeout_s
+
         if len(added) > 0 or len(removed) > 0:
-            # Shuffle the keys to avoid synchronization across clients.
-            replicas = list(self.in_flight_queries.keys())
-            random.shuffle(replicas)
-            self.replica_iterator = itertools.cycle(replicas)
+            self._rendezvous_orders.clear()
+            self.replica_selection_policy.update_replicas(
+                list(self.in_flight_queries.keys()))
             logger.debug(
                 f"ReplicaSet: +{len(added)}, -{len(removed)} replicas.")
-            self.config_updated_event.set()
+            self._assign_waiting_queries()
 
     def _try_assign_replica(self, query: Query) -> Optional[ray.ObjectRef]:
         """Try to assign query to a replica, return the object ref if succeeded
         or return None if it can't assign this query to any replicas.
         """
-        for _ in range(len(self.in_flight_queries.keys())):
-            replica = next(self.replica_iterator)
-            if len(self.in_flight_queries[replica]
-                   ) >= replica.max_concurrent_queries:
-                # This replica is overloaded, try next one
+        in_flight = {
+            replica: len(queries)
+            for replica, queries in self.in_flight_queries.items()
+        }
+        replica = None
+        if query.metadata.shard_key is not None:
+            # Prefer the replicas that the shard key maps to, e.g. that have
+            # its multiplexed model loaded, while they have free capacity.
+            for candidate in self._get_rendezvous_order(
+                    query.metadata.shard_key):
+                if in_flight[candidate] < candidate.max_concurrent_queries:
+                    replica = candidate
+                    break
+        else:
+            replica = self.replica_selection_policy.select_replica(in_flight)
+        if replica is None:
+            return None
+
+        logger.debug(f"Assigned query {query.metadata.request_id} "
+                     f"to replica {replica.replica_tag}.")
+        # Directly passing args because it might contain an ObjectRef.
+        tracker_ref, user_ref = replica.actor_handle.handle_request.remote(
+            pickle.dumps(query.metadata), *query.args, **query.kwargs)
+        self.in_flight_queries[replica].add(tracker_ref)
+        # The callback runs on a Ray thread, so hop onto the loop to update
+        # the in flight queries.
+        tracker_ref._on_completed(
+            lambda tracker: self._event_loop.call_soon_threadsafe(
+                self._on_query_completed, replica, tracker_ref, tracker))
+        return user_ref
+
+    def _get_rendezvous_order(self,
+                              shard_key: str) -> List[RunningReplicaInfo]:
+        order = self._rendezvous_orders.get(shard_key)
+        if order is None:
+            order = _rendezvous_order(shard_key,
+                                      list(self.in_flight_queries))
+            self._rendezvous_orders[shard_key] = order
+            if len(self._rendezvous_orders) > MAX_CACHED_RENDEZVOUS_ORDERS:
+                self._rendezvous_orders.popitem(last=False)
+        else:
+            self._rendezvous_orders.move_to_end(shard_key)
+        return order
+
+    def _on_query_completed(self,
+                            replica: RunningReplicaInfo,
+                            tracker_ref: ray.ObjectRef,
+                            tracker: Any = None):
+        in_flight_queries = self.in_flight_queries.get(replica)
+        if in_flight_queries is None:
+            # The replica was removed while the query was in flight.
+            return
+        if isinstance(tracker, str):
+            # The query returned a streamed response with this ID, which
+            # keeps the replica busy until the stream is closed.
+            closed_ref = replica.actor_handle.wait_for_response_stream.remote(
+                tracker)
+            closed_ref._on_completed(
+                lambda _: self._event_loop.call_soon_threadsafe(
+                    self._on_query_completed, replica, tracker_ref))
+            return
+        in_flight_queries.discard(tracker_ref)
+        self._assign_waiting_queries()
+
+    def _assign_waiting_queries(self):
+        """Assign waiting queries in priority, then FIFO order until the
+        replicas are busy.
+        """
+        while self._waiting_queries:
+            _, _, query, future = self._waiting_queries[0]
+            if future.done():
+                # The caller stopped waiting, e.g., it was cancelled.
+                heapq.heappop(self._waiting_queries)
                 continue
+            try:
+                assigned_ref = self._try_assign_replica(query)
+            except Exception as e:
+                # Surface the error to the caller rather than the loop.
+                heapq.heappop(self._waiting_queries)
+                future.set_exception(e)
+                continue
+            if assigned_ref is None:
+                return
+            heapq.heappop(self._waiting_queries)
+            future.set_result(assigned_ref)
 
-            logger.debug(f"Assigned query {query.metadata.request_id} "
-                         f"to replica {replica.replica_tag}.")
-            # Directly passing args because it might contain an ObjectRef.
-            tracker_ref, user_ref = replica.actor_handle.handle_request.remote(
-                pickle.dumps(query.metadata), *query.args, **query.kwargs)
-            self.in_flight_queries[replica].add(tracker_ref)
-            return user_ref
-        return None
-
-    @property
-    def _all_query_refs(self):
-        return list(
-            itertools.chain.from_iterable(self.in_flight_queries.values()))
+    def _enqueue(self, entry: Tuple[int, int, Query, asyncio.Future]):
+        """Add a query to the waiting queries, shedding load if it's full.
 
-    def _drain_completed_object_refs(self) -> int:
-        refs = self._all_query_refs
-        done, _ = ray.wait(refs, num_returns=len(refs), timeout=0)
-        for replica_in_flight_queries in self.in_flight_queries.values():
-            replica_in_flight_queries.difference_update(done)
-        return len(done)
+        If the queue is at max_queued_requests, the query with the lowest
+        priority that arrived last is rejected, unless that's the new query.
+        """
+        if 0 < self.max_queued_requests <= len(self._waiting_queries):
+            # The largest entry has the lowest priority and arrived last.
+            lowest = max(self._waiting_queries, default=entry)
+            if lowest is entry or entry > lowest:
+                self._shed(entry, "queue_full")
+                return
+            self._shed(lowest, "queue_full")
+        heapq.heappush(self._waiting_queries, entry)
+
+    def _shed(self, entry: Tuple[int, int, Query, asyncio.Future],
+              reason: str):
+        """Reject a waiting query, removing it from the waiting queries."""
+        _, _, query, future = entry
+        self._remove_waiting(entry)
+        if future.done():
+            return
+        self.shed_queries_counter.inc(tags={
+            "endpoint": query.metadata.endpoint,
+            "reason": reason
+        })
+        if reason == "queue_full":
+            message = (f"{self.max_queued_requests} queries are already "
+                       "waiting for a free replica")
+        else:
+            message = (f"it waited {self.queue_timeout_s}s for a free "
+                       "replica")
+        future.set_exception(
+            BackPressureError(
+                f"Query {query.metadata.request_id} to deployment "
+                f"{self.deployment_name} was rejected, since {message}."))
+
+    def _remove_waiting(self, entry: Tuple[int, int, Query, asyncio.Future]):
+        try:
+            self._waiting_queries.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiting_queries)
 
     async def assign_replica(self, query: Query) -> ray.ObjectRef:
         """Given a query, submit it to a replica and return the object ref.
         This method will keep track of the in flight queries for each replicas
         and only send a query to available replicas (determined by the
         max_concurrent_quries value.)
+
+        Raises:
+            BackPressureError: if the query was rejected, since the queue is
+                at max_queued_requests or it waited queue_timeout_s.
         """
         endpoint = query.metadata.endpoint
+        query.metadata.tick_enter_router = time.time()
         self.num_queued_queries += 1
         self.num_queued_queries_gauge.set(
             self.num_queued_queries, tags={"endpoint": endpoint})
-        assigned_ref = self._try_assign_replica(query)
-        while assigned_ref is None:  # Can't assign a replica right now.
-            logger.debug("Failed to assign a replica for "
-                         f"query {query.metadata.request_id}")
-            # Maybe there exists a free replica, we just need to refresh our
-            # query tracker.
-            num_finished = self._drain_completed_object_refs()
-            # All replicas are really busy, wait for a query to complete or the
-            # config to be updated.
-            if num_finished == 0:
-                logger.debug(
-                    "All replicas are busy, waiting for a free replica.")
-                await asyncio.wait(
-                    self._all_query_refs + [self.config_updated_event.wait()],
-                    return_when=asyncio.FIRST_COMPLETED)
-                if self.config_updated_event.is_set():
-                    self.config_updated_event.clear()
-            # We are pretty sure a free replica is ready now, let's recurse and
-            # assign this query a replica.
-            assigned_ref = self._try_assign_replica(query)
-        self.num_queued_queries -= 1
-        self.num_queued_queries_gauge.set(
-            self.num_queued_queries, tags={"endpoint": endpoint})
-        return assigned_ref
+        if self._event_loop is None:
+            self._event_loop = asyncio.get_event_loop()
+        try:
+            # Queue behind the queries that are already waiting, if any.
+            if not self._waiting_queries:
+                assigned_ref = self._try_assign_replica(query)
+                if assigned_ref is not None:
+                    return assigned_ref
+            logger.debug("All replicas are busy, waiting for a free replica "
+                         f"for query {query.metadata.request_id}")
+            self.queued_queries_counter.inc(tags={"endpoint": endpoint})
+            future = self._event_loop.create_future()
+            entry = (-query.metadata.priority,
+                     next(self._waiting_query_counter), query, future)
+            self._enqueue(entry)
+            self._assign_waiting_queries()
+            timeout_handle = None
+            if self.queue_timeout_s > 0 and not future.done():
+                timeout_handle = self._event_loop.call_later(
+                    self.queue_timeout_s, self._shed, entry, "queue_timeout")
+            try:
+                return await future
+            finally:
+                if timeout_handle is not None:
+                    timeout_handle.cancel()
+                if not future.done():
+                    future.cancel()
+                if future.cancelled():
+                    # The caller stopped waiting, e.g., it was cancelled.
+                    self._remove_waiting(entry)
+        finally:
+            self.num_queued_queries -= 1
+            self.num_queued_queries_gauge.set(
+                self.num_queued_queries, tags={"endpoint": endpoint})
 
 
 class Router:
@@ -178,14 +497,19 @@ class Router:
             controller_handle: ActorHandle,
             deployment_name: str,
             event_loop: asyncio.BaseEventLoop = None,
+            replica_selection_policy: Optional[ReplicaSelectionPolicy] = None,
     ):
         """Router process incoming queries: assign a replica.
 
         Args:
             controller_handle(ActorHandle): The controller handle.
+            replica_selection_policy(ReplicaSelectionPolicy): The policy
+                used to choose replicas, defaults to the policy named by the
+                SERVE_REPLICA_SELECTION_POLICY environment variable.
         """
         self._event_loop = event_loop
-        self._replica_set = ReplicaSet(deployment_name, event_loop)
+        self._replica_set = ReplicaSet(deployment_name, event_loop,
+                                       replica_selection_policy)
 
         # -- Metrics Registration -- #
         self.num_router_requests = metrics.Counter(
@@ -85,6 +85,82 @@ def test_starlette_response(serve_instance):
     assert resp.status_code == 418
 
 
+def test_streaming_response(serve_instance):
+    @serve.deployment(name="sync_gen")
+    def sync_gen(_):
+        for number in range(1, 4):
+            yield str(number)
+
+    sync_gen.deploy()
+    resp = requests.get("http://127.0.0.1:8000/sync_gen")
+    assert resp.text == "123"
+    assert resp.headers["transfer-encoding"] == "chunked"
+
+    signal = SignalActor.remote()
+
+    @serve.deployment(name="async_gen")
+    class AsyncGen:
+        async def __call__(self, _):
+            yield b"first"
+            await signal.wait.remote()
+            yield b"second"
+
+    AsyncGen.deploy()
+    # The first chunk is sent before the generator finishes.
+    with requests.get(
+            "http://127.0.0.1:8000/async_gen", stream=True) as resp:
+        chunks = resp.iter_content(chunk_size=None)
+        assert next(chunks) == b"first"
+        ray.get(signal.send.remote())
+        assert b"".join(chunks) == b"second"
+
+    @serve.deployment(name="failing_gen")
+    def failing_gen(_):
+        yield "partial"
+        raise ValueError("oops")
+
+    failing_gen.deploy()
+    # The response is cut off, rather than ending normally.
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        requests.get("http://127.0.0.1:8000/failing_gen")
+
+
+def test_streaming_response_client_disconnect(serve_instance):
+    @ray.remote
+    class Closed:
+        def __init__(self):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+        def is_closed(self):
+            return self.closed
+
+    closed = Closed.remote()
+
+    @serve.deployment(name="endless")
+    def endless(_):
+        async def numbers():
+            try:
+                number = 0
+                while True:
+                    yield f"{number}\n"
+                    number += 1
+                    await asyncio.sleep(0.01)
+            finally:
+                await closed.close.remote()
+
+        return starlette.responses.StreamingResponse(numbers())
+
+    endless.deploy()
+    with requests.get("http://127.0.0.1:8000/endless", stream=True) as resp:
+        assert next(resp.iter_lines()) == b"0"
+
+    # The replica stops generating chunks once the client disconnects.
+    wait_for_condition(lambda: ray.get(closed.is_closed.remote()))
+
+
 def test_deploy_sync_function_no_params(serve_instance):
     @serve.deployment()
     def sync_d():
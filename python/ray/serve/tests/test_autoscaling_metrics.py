@@ -51,6 +51,54 @@ class TestInMemoryMetricsStore:
         assert s.window_average("m1", window_start_timestamp_s=0) == 1.5
         assert s.window_average("m2", window_start_timestamp_s=0) == -1.5
 
+    def test_multiple_values(self):
+        s = InMemoryMetricsStore()
+        s.add_metrics_point({"m1": [1, 2, 3], "m2": []}, timestamp=1)
+        s.add_metrics_point({"m1": [4]}, timestamp=2)
+        assert s.window_average("m1", window_start_timestamp_s=0) == 2.5
+        assert s.window_average(
+            "m1", window_start_timestamp_s=1.5, do_compact=False) == 4
+        assert s.window_average("m2", window_start_timestamp_s=0) is None
+        assert s.keys() == ["m1"]
+
+    def test_window_percentile(self):
+        s = InMemoryMetricsStore()
+        assert s.window_percentile(
+            "m1", window_start_timestamp_s=0, percentile=50) is None
+        s.add_metrics_point({"m1": 1000}, timestamp=1)
+        s.add_metrics_point({"m1": list(range(101))}, timestamp=2)
+        assert s.window_percentile(
+            "m1", window_start_timestamp_s=2, percentile=95,
+            do_compact=False) == 95
+        assert s.window_percentile(
+            "m1", window_start_timestamp_s=0, percentile=100) == 1000
+
+    def test_window_rate(self):
+        s = InMemoryMetricsStore()
+        s.add_metrics_point({"m1": 10}, timestamp=1)
+        assert s.window_rate("m1", window_start_timestamp_s=0) is None
+        s.add_metrics_point({"m1": 30}, timestamp=3)
+        s.add_metrics_point({"m1": 20}, timestamp=2)
+        assert s.window_rate("m1", window_start_timestamp_s=0) == 10
+        assert s.window_rate("m1", window_start_timestamp_s=1.5) == 10
+
+    def test_max_points_per_key(self):
+        s = InMemoryMetricsStore(max_points_per_key=4)
+        for i in range(10):
+            s.add_metrics_point({"m1": i}, timestamp=i)
+        # Only the latest points are kept.
+        assert [point.value for point in s.points("m1")] == [6, 7, 8, 9]
+        s.add_metrics_point({"m1": list(range(10, 20))}, timestamp=10)
+        assert [point.value for point in s.points("m1")] == [16, 17, 18, 19]
+
+    def test_out_of_order_compaction(self):
+        s = InMemoryMetricsStore()
+        for timestamp in [1, 3, 2, 4]:
+            s.add_metrics_point({"m1": timestamp}, timestamp=timestamp)
+        assert s.window_average("m1", window_start_timestamp_s=2.5) == 3.5
+        assert [point.timestamp for point in s.points("m1")] == [2, 3, 4]
+        assert s.window_average("m1", window_start_timestamp_s=0) == 3
+
 
 def test_e2e(serve_instance):
     @serve.deployment(
@@ -1,9 +1,11 @@
 import sys
+import time
 
 import pytest
 from unittest import mock
 
 from ray._private.test_utils import SignalActor, wait_for_condition
+from ray.serve.autoscaling_metrics import InMemoryMetricsStore
 from ray.serve.autoscaling_policy import (BasicAutoscalingPolicy,
                                           calculate_desired_num_replicas)
 from ray.serve.deployment_state import ReplicaState
@@ -293,6 +295,64 @@ def test_replicas_delayed_startup():
     assert new_num_replicas == 123
 
 
+def test_target_metrics():
+    """Unit test for scaling on the latency or the queued requests."""
+    now = time.time()
+    store = InMemoryMetricsStore()
+    for i in range(10):
+        store.add_metrics_point(
+            {
+                "A#1": 4,
+                "A#1/queued_requests": 3,
+                "A#2": 2,
+                "A#2/queued_requests": 1,
+                # 90% of the requests take 10ms, and 10% take 100ms.
+                "A/latency_ms": [10] * 9 + [100],
+            },
+            timestamp=now - i)
+    # Points before the look back period are ignored.
+    store.add_metrics_point(
+        {
+            "A#1/queued_requests": 100,
+            "A/latency_ms": [1000] * 100
+        },
+        timestamp=now - 100)
+
+    def make_policy(**kwargs):
+        return BasicAutoscalingPolicy(
+            AutoscalingConfig(
+                min_replicas=1,
+                max_replicas=100,
+                look_back_period_s=30,
+                upscale_delay_s=0,
+                downscale_delay_s=0,
+                **kwargs))
+
+    def decide(policy):
+        metrics = policy.get_current_metrics(store, "A", ["A#1", "A#2"])
+        return policy.get_decision_num_replicas(metrics, 2)
+
+    # 3 ongoing requests per replica on average.
+    assert decide(make_policy(target_num_ongoing_requests_per_replica=1)) == 6
+
+    # 2 queued requests per replica on average.
+    assert decide(
+        make_policy(target_num_queued_requests_per_replica=0.5)) == 8
+
+    # The p95 latency is 100ms, and the p50 latency is 10ms. The policy
+    # scales in proportion to the latency, as if it were a load: twice the
+    # target latency doubles the 2 replicas, and a fifth of it scales down
+    # to the min replicas.
+    assert decide(make_policy(target_latency_ms=50)) == 4
+    assert decide(
+        make_policy(target_latency_ms=50, latency_percentile=50)) == 1
+
+    # Without latencies in the look back period, the policy doesn't scale.
+    policy = make_policy(target_latency_ms=50)
+    assert policy.get_current_metrics(InMemoryMetricsStore(), "A",
+                                      ["A#1"]) == []
+
+
 if __name__ == "__main__":
     import sys
     import pytest
@@ -1,9 +1,11 @@
 import asyncio
+import time
 
 import pytest
 
 import ray
 from ray import serve
+from ray.serve.batching import _BatchQueue
 
 
 def test_batching(serve_instance):
@@ -133,6 +135,25 @@ async def test_decorator_validation():
             async def method(self, requests):
                 pass
 
+    class FloatLatencySLO:
+        @serve.batch(latency_slo_s=0.1)
+        async def method(self, requests):
+            pass
+
+    with pytest.raises(ValueError):
+
+        class ZeroLatencySLO:
+            @serve.batch(latency_slo_s=0)
+            async def method(self, requests):
+                pass
+
+    with pytest.raises(TypeError):
+
+        class NonLatencySLO:
+            @serve.batch(latency_slo_s="a")
+            async def method(self, requests):
+                pass
+
 
 @pytest.mark.asyncio
 @pytest.mark.parametrize("use_class", [True, False])
@@ -259,6 +280,57 @@ async def test_batch_size_multiple_long_timeout(use_class):
         t3.result()
 
 
+@pytest.mark.asyncio
+async def test_adaptive_batching():
+    batch_sizes = []
+
+    @serve.batch(max_batch_size=64, latency_slo_s=0.2)
+    async def handle_batch(requests):
+        batch_sizes.append(len(requests))
+        # A fixed cost per batch, which batching amortizes.
+        await asyncio.sleep(0.02 + 0.001 * len(requests))
+        return requests
+
+    async def call(arg):
+        start = time.time()
+        assert await handle_batch(arg) == arg
+        return time.time() - start
+
+    # Send requests faster than unbatched calls could handle them.
+    tasks = []
+    for i in range(200):
+        tasks.append(asyncio.get_event_loop().create_task(call(i)))
+        await asyncio.sleep(0.005)
+    latencies = sorted(await asyncio.gather(*tasks))
+
+    assert max(batch_sizes) > 1
+    assert len(batch_sizes) < len(tasks)
+    # The batch size starts out at one, so only check that the latency
+    # converges to the SLO.
+    assert latencies[len(latencies) // 2] < 0.4
+
+
+@pytest.mark.asyncio
+async def test_adaptive_batching_tuning_errors(monkeypatch):
+    # A handler too fast for the clock to measure doesn't break tuning.
+    queue = _BatchQueue(max_batch_size=8, timeout_s=0, latency_slo_s=0.1)
+    queue._oldest_batch_put_time = time.time()
+    queue._tune(batch_size=1, handler_latency_s=0)
+    assert queue.batch_size == 2
+
+    # Tuning errors don't fail the requests of a successful batch.
+    def fail_tune(self, batch_size, handler_latency_s):
+        raise RuntimeError("tuning failed")
+
+    monkeypatch.setattr(_BatchQueue, "_tune", fail_tune)
+
+    @serve.batch(max_batch_size=4, latency_slo_s=0.1)
+    async def handle_batch(requests):
+        return requests
+
+    assert await asyncio.gather(*[handle_batch(i) for i in range(8)]) == list(
+        range(8))
+
 if __name__ == "__main__":
     import sys
     sys.exit(pytest.main(["-v", "-s", __file__]))
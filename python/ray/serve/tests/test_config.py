@@ -4,6 +4,9 @@ from pydantic import ValidationError
 from ray.serve.config import (DeploymentConfig, DeploymentMode, HTTPOptions,
                               ReplicaConfig)
 from ray.serve.config import AutoscalingConfig
+from ray.serve.generated.serve_pb2 import (
+    DeploymentConfig as DeploymentConfigProto, AutoscalingConfig as
+    AutoscalingConfigProto)
 
 
 def test_deployment_config_validation():
@@ -21,6 +24,26 @@ def test_deployment_config_validation():
     # Test dynamic default for max_concurrent_queries.
     assert DeploymentConfig().max_concurrent_queries == 100
 
+    # Test max_queued_requests and queue_timeout_s validation, 0 being no
+    # limit.
+    DeploymentConfig(max_queued_requests=0, queue_timeout_s=0)
+    DeploymentConfig(max_queued_requests=1, queue_timeout_s=0.5)
+    with pytest.raises(ValidationError, match="value_error"):
+        DeploymentConfig(max_queued_requests=-1)
+    with pytest.raises(ValidationError, match="value_error"):
+        DeploymentConfig(queue_timeout_s=-1)
+
+    # Test the autoscaling target metric validation.
+    AutoscalingConfig(target_latency_ms=100, latency_percentile=99.9)
+    AutoscalingConfig(target_num_queued_requests_per_replica=2)
+    with pytest.raises(ValidationError, match="value_error"):
+        AutoscalingConfig(latency_percentile=0)
+    with pytest.raises(ValidationError, match="value_error"):
+        AutoscalingConfig(target_latency_ms=-1)
+    with pytest.raises(ValidationError, match="value_error"):
+        AutoscalingConfig(
+            target_latency_ms=100, target_num_queued_requests_per_replica=2)
+
 
 def test_deployment_config_update():
     b = DeploymentConfig(num_replicas=1, max_concurrent_queries=1)
@@ -115,6 +138,19 @@ def test_with_proto():
     config = DeploymentConfig(user_config={"python": ("native", ["objects"])})
     assert config == DeploymentConfig.from_proto_bytes(config.to_proto_bytes())
 
+    # Test the queue limits, including the defaults of 0.
+    config = DeploymentConfig(max_queued_requests=10, queue_timeout_s=0.5)
+    assert config == DeploymentConfig.from_proto_bytes(config.to_proto_bytes())
+    config = DeploymentConfig()
+    assert config == DeploymentConfig.from_proto_bytes(config.to_proto_bytes())
+
+    # Test the autoscaling target metrics.
+    config = DeploymentConfig(autoscaling_config={
+        "target_latency_ms": 50,
+        "latency_percentile": 99
+    })
+    assert config == DeploymentConfig.from_proto_bytes(config.to_proto_bytes())
+
 
 def test_zero_default_proto():
     # Test that options set to zero (protobuf default value) still retain their
@@ -135,6 +171,23 @@ def test_zero_default_proto():
     default_downscale_delay_s = AutoscalingConfig().downscale_delay_s
     assert new_delay_s != default_downscale_delay_s
 
+    # Unset queue limits, e.g. from configs built by Java, mean no limit.
+    config = DeploymentConfig.from_proto_bytes(
+        DeploymentConfigProto(num_replicas=1).SerializeToString())
+    assert config.max_queued_requests == 0
+    assert config.queue_timeout_s == 0
+
+    # Unset autoscaling target metrics are disabled, and an unset latency
+    # percentile is the default.
+    config = DeploymentConfig.from_proto_bytes(
+        DeploymentConfigProto(
+            autoscaling_config=AutoscalingConfigProto(
+                min_replicas=1, max_replicas=2)).SerializeToString())
+    autoscaling_config = config.autoscaling_config
+    assert autoscaling_config.target_latency_ms == 0
+    assert autoscaling_config.target_num_queued_requests_per_replica == 0
+    assert autoscaling_config.latency_percentile == 95
+
 
 if __name__ == "__main__":
     import sys
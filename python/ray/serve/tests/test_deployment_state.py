@@ -74,6 +74,18 @@ class MockReplicaActorWrapper:
     def max_concurrent_queries(self) -> int:
         return 100
 
+    @property
+    def max_queued_requests(self) -> int:
+        return 0
+
+    @property
+    def queue_timeout_s(self) -> float:
+        return 0
+
+    @property
+    def node_id(self) -> Optional[str]:
+        return None
+
     def set_ready(self):
         self.ready = ReplicaStartupStatus.SUCCEEDED
 
@@ -1,7 +1,10 @@
+import random
+
 import pytest
 
 from ray.serve.common import EndpointInfo
-from ray.serve.http_proxy import LongestPrefixRouter
+from ray.serve.http_proxy import (LongestPrefixRouter,
+                                  MAX_CACHED_HANDLE_VARIANTS)
 
 
 @pytest.fixture
@@ -91,6 +94,73 @@ def test_update_routes(mock_longest_prefix_router):
     assert route == "/endpoint2" and handle == "endpoint2"
 
 
+def test_matches_linear_scan(mock_longest_prefix_router):
+    router = mock_longest_prefix_router
+    segments = ["", "a", "b", "ab"]
+
+    def random_path():
+        return "/" + "/".join(
+            random.choice(segments) for _ in range(random.randint(0, 3)))
+
+    def linear_scan(routes, target):
+        # The longest route that is a prefix of the target, ending at a
+        # path segment boundary.
+        for route in sorted(routes, key=len, reverse=True):
+            if target.startswith(route) and (
+                    route.endswith("/") or len(target) == len(route)
+                    or target[len(route)] == "/"):
+                return route
+        return None
+
+    random.seed(0)
+    for _ in range(50):
+        routes = {random_path() for _ in range(5)}
+        router.update_routes({
+            f"endpoint{i}": EndpointInfo(route=route)
+            for i, route in enumerate(routes)
+        })
+        for _ in range(20):
+            target = random_path()
+            route, _ = router.match_route(target)
+            assert route == linear_scan(routes, target), (routes, target)
+
+
+def test_handle_variants(mock_longest_prefix_router):
+    class MockHandle:
+        def __init__(self, name, options=None):
+            self.name = name
+            self.options_kwargs = options or {}
+
+        def options(self, **kwargs):
+            return MockHandle(self.name, kwargs)
+
+    router = LongestPrefixRouter(MockHandle)
+    router.update_routes({"endpoint": EndpointInfo(route="/a")})
+    route, handle = router.match_route("/a")
+
+    variant = router.get_handle_variant(route, handle, "f", "GET")
+    assert variant.options_kwargs == {
+        "method_name": "f",
+        "http_method": "GET"
+    }
+    assert router.get_handle_variant(route, handle, "f", "GET") is variant
+    assert router.get_handle_variant(route, handle, "g", "GET") is not variant
+    assert router.get_handle_variant(route, handle, "f", "POST") is not variant
+
+    # The variants of a route are dropped once it points to a new endpoint.
+    router.update_routes({"endpoint2": EndpointInfo(route="/a")})
+    route, handle = router.match_route("/a")
+    new_variant = router.get_handle_variant(route, handle, "f", "GET")
+    assert new_variant is not variant and new_variant.name == "endpoint2"
+
+    # The cache is bounded.
+    for i in range(MAX_CACHED_HANDLE_VARIANTS + 1):
+        router.get_handle_variant(route, handle, f"method{i}", "GET")
+    assert len(router._handle_variants) == MAX_CACHED_HANDLE_VARIANTS
+    assert router.get_handle_variant(route, handle, "f", "GET") is not (
+        new_variant)
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(pytest.main(["-v", "-s", __file__]))
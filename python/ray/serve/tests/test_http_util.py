@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from ray.serve.exceptions import RayServeException
+from ray.serve.http_util import ResponseStream
+
+
+def make_stream(body, idle_timeout_s=10):
+    closed = asyncio.Event()
+    stream = ResponseStream(body, 2, idle_timeout_s, closed.set)
+    return stream, closed
+
+
+@pytest.mark.asyncio
+async def test_response_stream():
+    async def body():
+        for i in range(5):
+            yield str(i)
+
+    stream, closed = make_stream(body())
+    chunks = []
+    while True:
+        next_chunks = await stream.next_chunks()
+        if next_chunks is None:
+            break
+        chunks.extend(next_chunks)
+    assert chunks == [b"0", b"1", b"2", b"3", b"4"]
+    await asyncio.wait_for(closed.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_response_stream_cancel_pending_pull():
+    quiet = asyncio.Event()
+
+    async def body():
+        yield "first"
+        await quiet.wait()
+        yield "never"
+
+    stream, closed = make_stream(body())
+    assert await stream.next_chunks() == [b"first"]
+    pull = asyncio.get_event_loop().create_task(stream.next_chunks())
+    await asyncio.sleep(0.1)
+    assert not pull.done()
+
+    # Cancelling the stream fails the pending pull instead of leaving it
+    # waiting forever.
+    stream.cancel()
+    with pytest.raises(RayServeException, match="cancelled"):
+        await asyncio.wait_for(pull, 1)
+    await asyncio.wait_for(closed.wait(), 1)
+    with pytest.raises(RayServeException, match="cancelled"):
+        await stream.next_chunks()
+
+
+@pytest.mark.asyncio
+async def test_response_stream_idle_timeout():
+    async def body():
+        yield "first"
+        await asyncio.sleep(0.5)
+        yield "second"
+        await asyncio.sleep(10)
+
+    # The body going quiet during a pull doesn't abandon the stream.
+    stream, closed = make_stream(body(), idle_timeout_s=0.2)
+    assert await stream.next_chunks() == [b"first"]
+    assert await stream.next_chunks() == [b"second"]
+
+    # Making no pulls does.
+    await asyncio.wait_for(closed.wait(), 1)
+    with pytest.raises(RayServeException, match="abandoned"):
+        await stream.next_chunks()
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-v", "-s", __file__]))
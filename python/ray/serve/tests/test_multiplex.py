@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+import ray
+from ray import serve
+from ray.serve.exceptions import RayServeException
+from ray.serve.multiplex import _ModelMultiplexWrapper
+
+
+def make_wrapper(max_num_models_per_replica=2, max_memory_bytes=None):
+    loads = []
+
+    async def load_model(model_id):
+        loads.append(model_id)
+        await asyncio.sleep(0.01)
+        return f"model-{model_id}"
+
+    wrapper = _ModelMultiplexWrapper(load_model, None,
+                                     max_num_models_per_replica,
+                                     max_memory_bytes)
+    return wrapper, loads
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    wrapper, loads = make_wrapper(max_num_models_per_replica=2)
+    assert await wrapper.load_model("1") == "model-1"
+    assert await wrapper.load_model("2") == "model-2"
+    # Using model 1 makes model 2 the least recently used.
+    assert await wrapper.load_model("1") == "model-1"
+    assert await wrapper.load_model("3") == "model-3"
+    assert list(wrapper.models) == ["1", "3"]
+    assert loads == ["1", "2", "3"]
+
+    assert await wrapper.load_model("2") == "model-2"
+    assert list(wrapper.models) == ["3", "2"]
+    assert loads == ["1", "2", "3", "2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads():
+    wrapper, loads = make_wrapper(max_num_models_per_replica=2)
+    models = await asyncio.gather(
+        *[wrapper.load_model(model_id) for model_id in ["1", "2", "1", "1"]])
+    assert models == ["model-1", "model-2", "model-1", "model-1"]
+    # Concurrent requests for a model share its load.
+    assert loads == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_memory_budget(monkeypatch):
+    memory = 0
+
+    async def load_model(model_id):
+        nonlocal memory
+        memory += 100
+        return model_id
+
+    monkeypatch.setattr(ray.serve.multiplex, "_get_process_memory_bytes",
+                        lambda: memory)
+    wrapper = _ModelMultiplexWrapper(
+        load_model,
+        None,
+        max_num_models_per_replica=10,
+        max_memory_bytes=250)
+    for model_id in ["1", "2", "3"]:
+        await wrapper.load_model(model_id)
+    assert list(wrapper.models) == ["2", "3"]
+    assert wrapper.total_size_bytes == 200
+
+    # The newest model is kept even if it alone exceeds the budget.
+    wrapper.max_memory_bytes = 50
+    await wrapper.load_model("4")
+    assert list(wrapper.models) == ["4"]
+
+
+def test_decorator_validation():
+    @serve.multiplexed
+    async def function(model_id):
+        pass
+
+    class Class:
+        @serve.multiplexed(max_num_models_per_replica=1)
+        async def method(self, model_id):
+            pass
+
+    with pytest.raises(TypeError, match="async def"):
+
+        @serve.multiplexed
+        def non_async_function(model_id):
+            pass
+
+    with pytest.raises(TypeError, match="max_num_models_per_replica"):
+
+        @serve.multiplexed(max_num_models_per_replica=1.5)
+        async def integer_max_num_models(model_id):
+            pass
+
+    with pytest.raises(ValueError, match="max_num_models_per_replica"):
+
+        @serve.multiplexed(max_num_models_per_replica=0)
+        async def positive_max_num_models(model_id):
+            pass
+
+    with pytest.raises(ValueError, match="max_memory_bytes"):
+
+        @serve.multiplexed(max_memory_bytes=0)
+        async def positive_max_memory_bytes(model_id):
+            pass
+
+
+def test_multiplexed_deployment(serve_instance):
+    @serve.deployment(num_replicas=2)
+    class Models:
+        def __init__(self):
+            self.num_loads = 0
+
+        @serve.multiplexed(max_num_models_per_replica=2)
+        async def get_model(self, model_id):
+            self.num_loads += 1
+            return f"{model_id}-{serve.get_replica_context().replica_tag}"
+
+        async def __call__(self, *args):
+            model_id = serve.get_multiplexed_model_id()
+            return await self.get_model(model_id), self.num_loads
+
+    Models.deploy()
+    handle = Models.get_handle()
+
+    with pytest.raises(RayServeException, match="no model ID"):
+        ray.get(handle.remote())
+
+    # Sequential requests for a model go to the replica that loaded it.
+    results = [
+        ray.get(handle.options(shard_key="a").remote()) for _ in range(5)
+    ]
+    assert len({model for model, _ in results}) == 1
+    assert results[-1][1] == results[0][1]
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-v", "-s", __file__]))
@@ -8,7 +8,11 @@ import pytest
 
 import ray
 from ray.serve.common import RunningReplicaInfo
-from ray.serve.router import Query, ReplicaSet, RequestMetadata
+from ray.serve.exceptions import BackPressureError
+from ray.serve.router import (
+    Query, ReplicaSet, RequestMetadata, LeastLoadedPolicy,
+    PowerOfTwoChoicesPolicy, NodeLocalPolicy, RoundRobinPolicy,
+    _rendezvous_order)
 from ray._private.test_utils import SignalActor
 
 pytestmark = pytest.mark.asyncio
@@ -133,6 +137,284 @@ async def test_replica_set(ray_instance):
     assert num_queries_set == {2, 1}
 
 
+async def test_replica_set_assigns_waiting_queries_in_order(ray_instance):
+    signal = SignalActor.remote()
+
+    @ray.remote(num_cpus=0)
+    class MockWorker:
+        def __init__(self):
+            self.requests = []
+
+        @ray.method(num_returns=2)
+        async def handle_request(self, request_metadata, request):
+            self.requests.append(request)
+            if request == 0:
+                await signal.wait.remote()
+            return b"", "DONE"
+
+        async def get_requests(self):
+            return self.requests
+
+    rs = ReplicaSet("my_deployment", asyncio.get_event_loop())
+    replica = RunningReplicaInfo(
+        deployment_name="my_deployment",
+        replica_tag="0",
+        actor_handle=MockWorker.remote(),
+        max_concurrent_queries=1)
+    rs.update_running_replicas([replica])
+
+    def make_query(i):
+        return Query([i], {}, RequestMetadata(f"request-{i}", "endpoint"))
+
+    first_ref = await rs.assign_replica(make_query(0))
+    loop = asyncio.get_event_loop()
+    waiting = [
+        loop.create_task(rs.assign_replica(make_query(i)))
+        for i in range(1, 5)
+    ]
+    await asyncio.sleep(0.2)
+    assert not any(task.done() for task in waiting)
+    assert rs.num_queued_queries == 4
+
+    # Completing the first query assigns the waiting ones one at a time, in
+    # the order they arrived.
+    await signal.send.remote()
+    assert await first_ref == "DONE"
+    for task in waiting:
+        assert await (await task) == "DONE"
+    assert await replica.actor_handle.get_requests.remote() == list(range(5))
+    assert rs.num_queued_queries == 0
+
+
+async def test_replica_set_load_shedding(ray_instance):
+    signal = SignalActor.remote()
+
+    @ray.remote(num_cpus=0)
+    class MockWorker:
+        def __init__(self):
+            self.requests = []
+
+        @ray.method(num_returns=2)
+        async def handle_request(self, request_metadata, request):
+            self.requests.append(request)
+            if request == 0:
+                await signal.wait.remote()
+            return b"", "DONE"
+
+        async def get_requests(self):
+            return self.requests
+
+    def make_replica_set(max_queued_requests, queue_timeout_s):
+        rs = ReplicaSet("my_deployment", asyncio.get_event_loop())
+        replica = RunningReplicaInfo(
+            deployment_name="my_deployment",
+            replica_tag="0",
+            actor_handle=MockWorker.remote(),
+            max_concurrent_queries=1,
+            max_queued_requests=max_queued_requests,
+            queue_timeout_s=queue_timeout_s)
+        rs.update_running_replicas([replica])
+        return rs, replica
+
+    def make_query(i, priority=0):
+        return Query([i], {},
+                     RequestMetadata(
+                         f"request-{i}", "endpoint", priority=priority))
+
+    rs, replica = make_replica_set(max_queued_requests=2, queue_timeout_s=0)
+    first_ref = await rs.assign_replica(make_query(0))
+    loop = asyncio.get_event_loop()
+    waiting = [
+        loop.create_task(rs.assign_replica(make_query(i))) for i in [1, 2]
+    ]
+    await asyncio.sleep(0.1)
+
+    # The queue is full, so a query with the same priority is rejected.
+    with pytest.raises(BackPressureError):
+        await rs.assign_replica(make_query(3))
+    # A query with a higher priority is admitted instead of the last query
+    # with the lowest priority, and is assigned first.
+    high_priority = loop.create_task(
+        rs.assign_replica(make_query(4, priority=1)))
+    await asyncio.sleep(0.1)
+    with pytest.raises(BackPressureError):
+        await waiting[1]
+
+    await signal.send.remote()
+    assert await first_ref == "DONE"
+    assert await (await high_priority) == "DONE"
+    assert await (await waiting[0]) == "DONE"
+    assert await replica.actor_handle.get_requests.remote() == [0, 4, 1]
+    assert rs.num_queued_queries == 0
+    await signal.send.remote(clear=True)
+
+    # Queries that wait longer than the queue timeout are rejected.
+    rs, replica = make_replica_set(max_queued_requests=0, queue_timeout_s=0.1)
+    first_ref = await rs.assign_replica(make_query(0))
+    with pytest.raises(BackPressureError):
+        await rs.assign_replica(make_query(1))
+    assert not rs._waiting_queries
+    await signal.send.remote()
+    assert await first_ref == "DONE"
+
+
+async def test_replica_set_streamed_responses_in_flight(ray_instance):
+    signal = SignalActor.remote()
+
+    @ray.remote(num_cpus=0)
+    class MockWorker:
+        @ray.method(num_returns=2)
+        async def handle_request(self, request_metadata, request):
+            # Streamed responses return the ID of the stream as the tracker.
+            return request, "DONE"
+
+        async def wait_for_response_stream(self, stream_id):
+            await signal.wait.remote()
+
+    rs = ReplicaSet("my_deployment", asyncio.get_event_loop())
+    rs.update_running_replicas([
+        RunningReplicaInfo(
+            deployment_name="my_deployment",
+            replica_tag="0",
+            actor_handle=MockWorker.remote(),
+            max_concurrent_queries=1)
+    ])
+
+    def make_query(request):
+        return Query([request], {}, RequestMetadata("request", "endpoint"))
+
+    # The query stays in flight while its response is streamed.
+    assert await (await rs.assign_replica(make_query("stream-id"))) == "DONE"
+    pending = asyncio.get_event_loop().create_task(
+        rs.assign_replica(make_query(b"")))
+    await asyncio.sleep(0.2)
+    assert not pending.done()
+
+    # Closing the stream frees the replica.
+    await signal.send.remote()
+    assert await (await pending) == "DONE"
+
+
+async def test_replica_set_shard_key_affinity(ray_instance):
+    signal = SignalActor.remote()
+
+    @ray.remote(num_cpus=0)
+    class MockWorker:
+        def __init__(self, tag):
+            self.tag = tag
+
+        @ray.method(num_returns=2)
+        async def handle_request(self, request_metadata, request):
+            if request == "block":
+                await signal.wait.remote()
+            return b"", self.tag
+
+    rs = ReplicaSet("my_deployment", asyncio.get_event_loop())
+    rs.update_running_replicas([
+        RunningReplicaInfo(
+            deployment_name="my_deployment",
+            replica_tag=str(i),
+            actor_handle=MockWorker.remote(str(i)),
+            max_concurrent_queries=1) for i in range(4)
+    ])
+
+    def make_query(request, shard_key):
+        return Query([request], {},
+                     RequestMetadata(
+                         "request", "endpoint", shard_key=shard_key))
+
+    # Queries with the same shard key go to the same replica.
+    for shard_key in ["model-a", "model-b", "model-c"]:
+        tags = {
+            await (await rs.assign_replica(make_query("ok", shard_key)))
+            for _ in range(5)
+        }
+        assert len(tags) == 1
+
+    # While that replica is busy, they spill over to another one.
+    preferred_tag = await (await rs.assign_replica(make_query("ok",
+                                                              "model-a")))
+    blocked_ref = await rs.assign_replica(make_query("block", "model-a"))
+    spilled_ref = await rs.assign_replica(make_query("ok", "model-a"))
+    assert await spilled_ref != preferred_tag
+    await signal.send.remote()
+    assert await blocked_ref == preferred_tag
+
+    # The order of the replicas is cached per shard key until they change.
+    assert list(rs._rendezvous_orders) == ["model-b", "model-c", "model-a"]
+    rs.update_running_replicas(list(rs.in_flight_queries)[1:])
+    assert not rs._rendezvous_orders
+
+
+async def test_rendezvous_order():
+    replicas = make_replica_infos(10)
+    shard_keys = [f"model-{i}" for i in range(100)]
+    preferred = {
+        key: _rendezvous_order(key, replicas)[0]
+        for key in shard_keys
+    }
+    # The order is deterministic and spreads the shard keys.
+    assert all(
+        _rendezvous_order(key, list(reversed(replicas)))[0] == preferred[key]
+        for key in shard_keys)
+    assert len(set(preferred.values())) > 5
+
+    # Removing a replica only moves the shard keys that preferred it.
+    removed = replicas[0]
+    for key in shard_keys:
+        new_preferred = _rendezvous_order(key, replicas[1:])[0]
+        if preferred[key] != removed:
+            assert new_preferred == preferred[key]
+        else:
+            assert new_preferred == _rendezvous_order(key, replicas)[1]
+
+
+def make_replica_infos(num_replicas, max_concurrent_queries=2, node_ids=None):
+    return [
+        RunningReplicaInfo(
+            deployment_name="my_deployment",
+            replica_tag=str(i),
+            actor_handle=None,
+            max_concurrent_queries=max_concurrent_queries,
+            node_id=node_ids[i] if node_ids else None)
+        for i in range(num_replicas)
+    ]
+
+
+async def test_least_loaded_policy():
+    a, b, c = make_replica_infos(3)
+    policy = LeastLoadedPolicy()
+    policy.update_replicas([a, b, c])
+    assert policy.select_replica({a: 1, b: 0, c: 1}) == b
+    assert policy.select_replica({a: 2, b: 2, c: 1}) == c
+    assert policy.select_replica({a: 2, b: 2, c: 2}) is None
+
+
+async def test_power_of_two_choices_policy():
+    a, b, c = make_replica_infos(3, max_concurrent_queries=3)
+    policy = PowerOfTwoChoicesPolicy()
+    policy.update_replicas([a, b, c])
+    # The most loaded replica loses against either of the others.
+    chosen = {policy.select_replica({a: 0, b: 1, c: 2}) for _ in range(100)}
+    assert chosen == {a, b}
+    # Replicas at capacity are never chosen.
+    for _ in range(100):
+        assert policy.select_replica({a: 3, b: 3, c: 1}) == c
+    assert policy.select_replica({a: 3, b: 3, c: 3}) is None
+
+
+async def test_node_local_policy(ray_instance):
+    node_id = ray.get_runtime_context().node_id.hex()
+    local, remote = make_replica_infos(2, node_ids=[node_id, "remote"])
+    policy = NodeLocalPolicy(fallback=RoundRobinPolicy())
+    policy.update_replicas([local, remote])
+    for _ in range(10):
+        assert policy.select_replica({local: 1, remote: 0}) == local
+    # Fall back to remote replicas once the local ones are at capacity.
+    assert policy.select_replica({local: 2, remote: 0}) == remote
+    assert policy.select_replica({local: 2, remote: 2}) is None
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(pytest.main(["-v", "-s", __file__]))
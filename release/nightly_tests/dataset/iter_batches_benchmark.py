@@ -0,0 +1,76 @@
+"""Benchmark for ``Dataset.iter_batches()`` over Arrow blocks.
+
+Iterates over a dataset of 100k-row Arrow blocks with an increasing batch
+size, and reports the throughput in rows/s. To compare against another
+version of the batcher, run this script on a checkout of that version.
+This runs on a local Ray instance and doesn't need a cluster.
+
+    $ python iter_batches_benchmark.py --num-blocks 20
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+import ray
+from ray.data.block import BlockAccessor
+
+
+def consume(ds, batch_size: int) -> int:
+    num_rows = 0
+    for batch in ds.iter_batches(
+            batch_size=batch_size, batch_format="native"):
+        num_rows += BlockAccessor.for_block(batch).num_rows()
+    return num_rows
+
+
+def timeit(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(num_blocks: int, rows_per_block: int, batch_sizes):
+    rng = np.random.default_rng(0)
+    ds = ray.data.from_arrow([
+        pa.Table.from_arrays(
+            [rng.random(rows_per_block),
+             rng.integers(0, 2**40, size=rows_per_block)],
+            names=["x", "y"]) for _ in range(num_blocks)
+    ])
+    num_rows = num_blocks * rows_per_block
+    results = {}
+    print(f"{'batch size':>10} {'rows/s':>12}")
+    for batch_size in batch_sizes:
+        # Sanity check that the batches cover all the rows.
+        assert consume(ds, batch_size) == num_rows
+
+        rows_per_s = num_rows / timeit(consume, ds, batch_size)
+        print(f"{batch_size:>10} {rows_per_s:>12.0f}")
+        results[f"rows_per_s_batch_size_{batch_size}"] = rows_per_s
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Dataset.iter_batches() benchmark")
+    parser.add_argument("--num-blocks", type=int, default=20)
+    parser.add_argument("--rows-per-block", type=int, default=100000)
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[16, 256, 4096, 65536])
+    args = parser.parse_args()
+
+    ray.init()
+    results = run(args.num_blocks, args.rows_per_block, args.batch_sizes)
+    if "TEST_OUTPUT_JSON" in os.environ:
+        with open(os.environ["TEST_OUTPUT_JSON"], "w") as f:
+            f.write(json.dumps({**results, "success": 1}))
@@ -0,0 +1,100 @@
+"""Microbenchmark for sort boundary sampling and block partitioning.
+
+Compares the previous per-boundary implementation (one ``np.quantile`` call
+and one Arrow comparison kernel per reducer) against the vectorized
+``searchsorted``-based implementation used by ``Dataset.sort()``, for an
+increasing number of reducers. This runs locally and doesn't need a cluster.
+
+    $ python sort_partition_benchmark.py --num-rows 1000000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pac
+
+from ray.data.impl.arrow_block import _find_partition_indices
+from ray.data.impl.sort import _quantile_indices
+
+
+def legacy_boundaries(samples: np.ndarray, num_reducers: int):
+    ret = [
+        np.quantile(samples, q, interpolation="nearest")
+        for q in np.arange(0, 1, 1 / num_reducers)
+    ]
+    return ret[1:]
+
+
+def legacy_partition_indices(table: pa.Table, boundaries, col: str):
+    return [pac.sum(pac.less(table[col], b)).as_py() for b in boundaries]
+
+
+def vectorized_boundaries(samples: np.ndarray, num_reducers: int):
+    return list(samples[_quantile_indices(len(samples), num_reducers)])
+
+
+def vectorized_partition_indices(table: pa.Table, boundaries, col: str):
+    return _find_partition_indices(table, boundaries, [(col, "ascending")])
+
+
+def timeit(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(num_rows: int, reducer_counts):
+    rng = np.random.default_rng(0)
+    values = np.sort(rng.integers(0, 2**40, size=num_rows))
+    table = pa.Table.from_arrays([values], names=["key"])
+    results = {}
+    print(f"{'reducers':>10} {'legacy (s)':>12} {'vectorized (s)':>15} "
+          f"{'speedup':>9}")
+    for num_reducers in reducer_counts:
+        samples = np.sort(
+            rng.choice(values, size=num_reducers * 10, replace=True))
+
+        def legacy():
+            boundaries = legacy_boundaries(samples, num_reducers)
+            legacy_partition_indices(table, boundaries, "key")
+
+        def vectorized():
+            boundaries = vectorized_boundaries(samples, num_reducers)
+            vectorized_partition_indices(table, boundaries, "key")
+
+        # Sanity check that both partitioning implementations agree.
+        boundaries = vectorized_boundaries(samples, num_reducers)
+        expected = legacy_partition_indices(table, boundaries, "key")
+        actual = vectorized_partition_indices(table, boundaries, "key")
+        assert list(actual) == expected, (actual, expected)
+
+        legacy_time = timeit(legacy)
+        vectorized_time = timeit(vectorized)
+        speedup = legacy_time / vectorized_time
+        print(f"{num_reducers:>10} {legacy_time:>12.4f} "
+              f"{vectorized_time:>15.4f} {speedup:>8.1f}x")
+        results[f"speedup_{num_reducers}_reducers"] = speedup
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sort partitioning microbenchmark")
+    parser.add_argument("--num-rows", type=int, default=1000000)
+    parser.add_argument(
+        "--num-reducers",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 5000])
+    args = parser.parse_args()
+
+    results = run(args.num_rows, args.num_reducers)
+    if "TEST_OUTPUT_JSON" in os.environ:
+        with open(os.environ["TEST_OUTPUT_JSON"], "w") as f:
+            f.write(json.dumps({**results, "success": 1}))